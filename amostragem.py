@@ -0,0 +1,82 @@
+import numpy as np
+
+# Redução de séries longas para mais ou menos a largura do gráfico em pixels
+# antes de montar o go.Figure. O navegador não consegue mostrar mais pontos
+# do que pixels, então mandar a série inteira só aumenta o payload e o tempo
+# de renderização. No zoom, os callbacks buscam de novo a resolução total
+# apenas do trecho visível e reduzem outra vez.
+
+LARGURA_PADRAO = 1500  # pontos por série depois da redução
+
+
+def lttb(x, y, n_saida):
+    # Largest-Triangle-Three-Buckets: mantém o primeiro e o último ponto e escolhe,
+    # em cada bucket, o ponto que forma o maior triângulo com o ponto anterior
+    # escolhido e a média do próximo bucket. Preserva picos e formato visual.
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_saida >= n or n_saida < 3:
+        return np.arange(n)
+
+    # n_saida - 2 buckets entre o primeiro e o último ponto
+    bordas = np.linspace(1, n - 1, n_saida - 1).astype(np.int64)
+
+    # Médias de cada bucket calculadas de uma vez; o "próximo" do último bucket é o último ponto
+    contagem = np.diff(np.append(bordas, n))
+    media_x = np.add.reduceat(x, bordas) / contagem
+    media_y = np.add.reduceat(y, bordas) / contagem
+    media_x[-1], media_y[-1] = x[-1], y[-1]
+
+    indices = np.empty(n_saida, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_saida - 2):
+        ini, fim = bordas[i], bordas[i + 1]
+        area = np.abs(
+            (x[a] - media_x[i + 1]) * (y[ini:fim] - y[a])
+            - (x[a] - x[ini:fim]) * (media_y[i + 1] - y[a])
+        )
+        a = ini + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax(y, n_saida):
+    # Mínimo e máximo de cada bucket (totalmente vetorizado). Mais barato que o
+    # LTTB e garante que nenhum extremo some, mas o traçado fica mais "serrilhado".
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_saida >= n or n_saida < 4:
+        return np.arange(n)
+
+    n_buckets = n_saida // 2
+    tamanho = n // n_buckets
+    usados = n_buckets * tamanho
+    blocos = y[:usados].reshape(n_buckets, tamanho)
+    base = np.arange(n_buckets) * tamanho
+    indices = np.concatenate([
+        base + np.argmin(blocos, axis=1),
+        base + np.argmax(blocos, axis=1),
+        [n - 1],
+    ])
+    return np.unique(indices)  # Ordenado e sem repetição
+
+
+def reduzir(x, y, n_saida=LARGURA_PADRAO, metodo="lttb"):
+    # Devolve (x, y) com no máximo ~n_saida pontos
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if metodo == "minmax":
+        indices = minmax(y, n_saida)
+    else:
+        indices = lttb(x, y, n_saida)
+    return x[indices], y[indices]
+
+
+def recortar(x, *series, inicio=None, fim=None):
+    # Trecho [inicio, fim] de séries com eixo x ordenado, via busca binária
+    x = np.asarray(x)
+    ini = 0 if inicio is None else np.searchsorted(x, inicio, side="left")
+    fim_ = len(x) if fim is None else np.searchsorted(x, fim, side="right")
+    return (x[ini:fim_],) + tuple(np.asarray(s)[ini:fim_] for s in series)
@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+from consolidacao import listar_arquivos, identificar_arquivo, assinatura
+from ingestao import processar_arquivos
+
+# Amostras de aceleração (_data.csv) em formato binário, para a página de
+# relatórios abrir um evento × estação sem carregar o data_consolidado inteiro.
+#
+# <destino>/amostras.<geracao>.f32  blocos float32 contíguos, um por arquivo de
+#                                   origem, gravados coluna a coluna (Time, T, R, V)
+# <destino>/indice.json             geração do .f32 e, para cada arquivo: evento,
+#                                   estacao, offset (em floats) e linhas
+#
+# A leitura usa np.memmap: achar o bloco é uma consulta num dicionário e os
+# arrays devolvidos apontam direto para o arquivo, sem cópia. Só as páginas
+# tocadas entram na memória, então o RSS não cresce com o histórico.
+# Arquivos novos vão para o fim do .f32; blocos de arquivos alterados ou
+# removidos viram espaço morto, recuperado quando passa da metade do arquivo.
+# A compactação (e um store recriado) grava uma geração nova em outro arquivo
+# e só então troca o indice.json, que aponta para ela: quem lê sempre pega
+# índice e dados da mesma geração, e quem ainda mapeia a antiga não perde as
+# páginas (o arquivo antigo só é apagado depois, e nunca é truncado).
+#
+# Quem grava (o monitor do servidor, o consolidate_data.py --amostras) segura
+# <destino>/amostras.lock do começo ao fim: acréscimo, compactação e índice.
+# Dois processos nunca calculam o mesmo offset para o fim do .f32.
+
+VERSAO_AMOSTRAS = 2
+COLUNAS_AMOSTRAS = ["Time", "T", "R", "V"]
+SUFIXO_AMOSTRAS = "_data.csv"
+VALIDADE_LOCK_AMOSTRAS = 600.0  # segundos sem renovar: o dono do amostras.lock morreu
+
+
+def caminho_dados(destino, geracao):
+    return os.path.join(destino, f"amostras.{geracao}.f32")
+
+
+def caminho_indice(destino):
+    return os.path.join(destino, "indice.json")
+
+
+def store_amostras_disponivel(destino):
+    return os.path.exists(caminho_indice(destino))
+
+
+def carregar_indice(destino):
+    caminho = caminho_indice(destino)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            indice = json.load(f)
+    except Exception as e:
+        print(f"Erro ao ler índice de amostras {caminho}: {e}")
+        return None
+    if indice.get("versao") != VERSAO_AMOSTRAS or indice.get("colunas") != COLUNAS_AMOSTRAS:
+        return None
+    if not os.path.exists(caminho_dados(destino, indice["geracao"])):
+        return None
+    return indice
+
+
+def _salvar_indice(destino, geracao, arquivos):
+    indice = {"versao": VERSAO_AMOSTRAS, "colunas": COLUNAS_AMOSTRAS, "geracao": geracao, "arquivos": arquivos}
+    caminho = caminho_indice(destino)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(indice, f, indent=1)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def _nova_geracao(destino):
+    # Próxima geração livre (maior que todas as que existem na pasta)
+    geracoes = [-1]
+    for nome in os.listdir(destino):
+        partes = nome.split(".")
+        if len(partes) == 3 and partes[0] == "amostras" and partes[2] == "f32" and partes[1].isdigit():
+            geracoes.append(int(partes[1]))
+    return max(geracoes) + 1
+
+
+def _apagar_geracoes_antigas(destino, atual):
+    # Leitores que ainda mapeiam uma geração antiga continuam lendo (POSIX mantém o
+    # arquivo até o último mapeamento); no Windows o arquivo em uso fica para a próxima vez
+    for nome in os.listdir(destino):
+        partes = nome.split(".")
+        antiga = (len(partes) >= 3 and partes[0] == "amostras" and partes[1].isdigit()
+                  and int(partes[1]) != atual and nome.endswith((".f32", ".f32.tmp")))
+        if antiga or nome in ("amostras.f32", "amostras.f32.tmp"):  # formato da versão 1
+            try:
+                os.remove(os.path.join(destino, nome))
+            except OSError:
+                pass
+
+
+def ler_bloco(file_path):
+    # Matriz float32 (colunas x linhas) de um _data.csv
+    df = pd.read_csv(file_path, usecols=COLUNAS_AMOSTRAS, dtype=np.float32)
+    return np.ascontiguousarray(df[COLUNAS_AMOSTRAS].to_numpy().T)
+
+
+def _compactar(destino, geracao, arquivos):
+    # Regrava só os blocos vivos, na mesma ordem, numa geração nova.
+    # Devolve (geração nova, entradas com offsets novos); o índice é que passa a apontar para ela.
+    n_colunas = len(COLUNAS_AMOSTRAS)
+    mapa = np.memmap(caminho_dados(destino, geracao), dtype=np.float32, mode="r")
+    nova = _nova_geracao(destino)
+    temporario = caminho_dados(destino, nova) + ".tmp"
+    offset = 0
+    novos = []
+    with open(temporario, "wb") as f:
+        for entrada in arquivos:
+            tamanho = entrada["linhas"] * n_colunas
+            mapa[entrada["offset"]:entrada["offset"] + tamanho].tofile(f)
+            novos.append(dict(entrada, offset=offset))
+            offset += tamanho
+    del mapa
+    os.replace(temporario, caminho_dados(destino, nova))
+    return nova, novos
+
+
+def caminho_lock(destino):
+    return os.path.join(destino, "amostras.lock")
+
+
+def _travar(destino, esperar=True, espera=0.2):
+    # Lock entre processos (o monitor do servidor e o consolidate_data.py --amostras):
+    # só quem cria o arquivo grava no store. Devolve False se não esperar e estiver ocupado.
+    lock = caminho_lock(destino)
+    while True:
+        try:
+            descritor = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) >= VALIDADE_LOCK_AMOSTRAS:
+                    os.remove(lock)  # Lock abandonado por um processo que morreu
+                    continue
+            except OSError:
+                continue
+            if not esperar:
+                return False
+            time.sleep(espera)
+            continue
+        with os.fdopen(descritor, "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+        return True
+
+
+def _destravar(destino):
+    try:
+        os.remove(caminho_lock(destino))
+    except OSError:
+        pass
+
+
+def atualizar_amostras(base_path, destino, workers=1, verboso=True, esperar=True):
+    # Acrescenta ao store os _data.csv novos ou alterados de base_path; devolve True se algo mudou.
+    # Com esperar=False desiste (devolve False) se outro processo estiver gravando no store.
+    os.makedirs(destino, exist_ok=True)
+    if not _travar(destino, esperar):
+        return False
+    try:
+        return _atualizar_travado(base_path, destino, workers, verboso)
+    finally:
+        _destravar(destino)
+
+
+def _atualizar_travado(base_path, destino, workers, verboso):
+    # O índice é lido com o lock: o offset do fim do arquivo e o índice salvo são do mesmo processo
+    lock = caminho_lock(destino)
+    indice = carregar_indice(destino)
+    if indice is None:
+        # Store novo (ou de versão antiga): começa do zero num arquivo novo, sem
+        # truncar o que algum leitor ainda possa ter mapeado
+        geracao = _nova_geracao(destino)
+        temporario = caminho_dados(destino, geracao) + ".tmp"
+        open(temporario, "wb").close()
+        os.replace(temporario, caminho_dados(destino, geracao))
+        anteriores = {}
+    else:
+        geracao = indice["geracao"]
+        anteriores = {entrada["caminho"]: entrada for entrada in indice["arquivos"]}
+
+    atuais = {os.path.relpath(c, base_path): c for c in listar_arquivos(base_path, SUFIXO_AMOSTRAS)}
+    arquivos = []
+    a_ler = []
+    assinaturas = {}  # Tiradas antes de ler (arquivo regravado durante a leitura é relido depois)
+    for rel, caminho in sorted(atuais.items()):
+        entrada = anteriores.get(rel)
+        sig = assinatura(caminho)
+        if entrada is not None and entrada["tamanho"] == sig["tamanho"] and entrada["mtime"] == sig["mtime"]:
+            arquivos.append(entrada)
+        else:
+            a_ler.append(caminho)
+            assinaturas[caminho] = sig
+
+    removidos = len(anteriores) - len(arquivos)
+    if indice is not None and not a_ler and not removidos:
+        return False
+    if verboso:
+        print(f"Amostras: {len(a_ler)} arquivo(s) novo(s)/alterado(s), {removidos} descartado(s)")
+
+    lidos = processar_arquivos(a_ler, ler_bloco, workers=workers)
+    os.utime(lock)
+    # Só acrescenta ao fim: os offsets que o índice atual publica continuam válidos
+    offset = os.path.getsize(caminho_dados(destino, geracao)) // 4
+    with open(caminho_dados(destino, geracao), "ab") as f:
+        for caminho, bloco in lidos:
+            bloco.tofile(f)
+            evento, estacao = identificar_arquivo(caminho, SUFIXO_AMOSTRAS)
+            entrada = {
+                "caminho": os.path.relpath(caminho, base_path),
+                "evento": evento,
+                "estacao": estacao,
+                "offset": offset,
+                "linhas": bloco.shape[1],
+            }
+            entrada.update(assinaturas[caminho])
+            arquivos.append(entrada)
+            offset += bloco.size
+            os.utime(lock)  # Renova o lock durante cargas longas
+
+    vivos = sum(entrada["linhas"] for entrada in arquivos) * len(COLUNAS_AMOSTRAS)
+    if offset > 2 * vivos:
+        try:
+            geracao, arquivos = _compactar(destino, geracao, arquivos)
+        except OSError as e:
+            print(f"Compactação de {caminho_dados(destino, geracao)} adiada: {e}")
+
+    _salvar_indice(destino, geracao, arquivos)
+    _apagar_geracoes_antigas(destino, geracao)
+    return True
+
+
+def assinatura_evento(caminho_json):
+    # JSON do evento e os _data.csv ao lado dele: muda quando chegam, somem ou são
+    # regravadas as amostras de alguma estação (e o store binário vem delas)
+    evento = os.path.basename(caminho_json).replace(".json", "")
+    pasta = os.path.dirname(caminho_json)
+    nomes = [os.path.basename(caminho_json)] + sorted(
+        nome for nome in os.listdir(pasta) if nome.startswith(evento + "_") and nome.endswith(SUFIXO_AMOSTRAS)
+    )
+    return tuple((nome, tuple(sorted(assinatura(os.path.join(pasta, nome)).items()))) for nome in nomes)
+
+
+def ler_evento(caminho_json, leitor=None):
+    # Amostras de todas as estações de um evento, com o que é preciso para alinhá-las no tempo:
+    # [{"serial", "estacao", "inicio" (Timestamp do startEvent, Time=0), "taxa", "unidade" (sensorUnit),
+    #   "amostras" (colunas x linhas)}].
+    # Usa o store binário quando há um LeitorAmostras com o evento; senão lê os _data.csv ao lado do JSON.
+    with open(caminho_json, encoding="utf-8") as f:
+        metadados = json.load(f)
+    evento = os.path.basename(caminho_json).replace(".json", "")
+    pasta = os.path.dirname(caminho_json)
+
+    estacoes = []
+    for serial, estacao in sorted(metadados.get("eventFiles", {}).items()):
+        colunas = leitor.ler(evento, serial) if leitor is not None else None
+        if colunas is not None:
+            matriz = np.stack([colunas[coluna] for coluna in COLUNAS_AMOSTRAS])
+        else:
+            arquivo = estacao.get("df", {}).get("data", {}).get("relObjName") or f"{evento}_{serial}{SUFIXO_AMOSTRAS}"
+            caminho = os.path.join(pasta, arquivo)
+            if not os.path.exists(caminho):
+                continue
+            matriz = ler_bloco(caminho)
+        estacoes.append({
+            "serial": serial,
+            "estacao": estacao.get("recorderName", "Desconhecida"),
+            "inicio": pd.to_datetime(estacao.get("startEvent") or estacao.get("triggerStart")),
+            "taxa": float(estacao.get("acquisRate") or 0),
+            "unidade": estacao.get("sensorUnit"),
+            "amostras": matriz,
+        })
+    return estacoes
+
+
+class LeitorAmostras:
+    # Mantém o .f32 mapeado e o dicionário (evento, estacao) -> blocos.
+    # Se o índice em disco mudou (store atualizado), remapeia na próxima leitura.
+    def __init__(self, destino):
+        self.destino = destino
+        self._assinatura = None
+        self._mapa = None
+        self._blocos = {}
+
+    def _recarregar(self):
+        try:
+            sig = os.stat(caminho_indice(self.destino)).st_mtime_ns
+        except OSError:
+            self._assinatura, self._mapa, self._blocos = None, None, {}
+            return
+        if sig == self._assinatura:
+            return
+
+        indice = carregar_indice(self.destino)
+        blocos = {}
+        for entrada in (indice or {}).get("arquivos", []):
+            chave = (entrada["evento"], str(entrada["estacao"]))
+            blocos.setdefault(chave, []).append((entrada["offset"], entrada["linhas"]))
+
+        mapa = None
+        if blocos:
+            # O .f32 vem do próprio índice lido: mesmo que uma compactação troque
+            # a geração agora, estes offsets valem para este arquivo
+            try:
+                mapa = np.memmap(caminho_dados(self.destino, indice["geracao"]), dtype=np.float32, mode="r")
+            except (OSError, ValueError) as e:
+                print(f"Erro ao mapear amostras de {self.destino}: {e}")
+                blocos = {}
+        self._assinatura, self._mapa, self._blocos = sig, mapa, blocos
+
+    def ler(self, evento, estacao):
+        # {coluna: array float32} do evento/estação, ou None se não estiver no store.
+        # Com um só arquivo de origem (o caso normal) os arrays são vistas do mapa, sem cópia.
+        self._recarregar()
+        blocos = self._blocos.get((evento, str(estacao)))
+        if not blocos or self._mapa is None:
+            return None
+
+        n_colunas = len(COLUNAS_AMOSTRAS)
+        matrizes = [
+            self._mapa[offset:offset + linhas * n_colunas].reshape(n_colunas, linhas)
+            for offset, linhas in blocos
+        ]
+        matriz = matrizes[0] if len(matrizes) == 1 else np.concatenate(matrizes, axis=1)
+        return dict(zip(COLUNAS_AMOSTRAS, matriz))
@@ -0,0 +1,189 @@
+import os
+import re
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+# Armazenamento colunar (Parquet) particionado por evento/estação.
+# Cada arquivo de origem vira um arquivo Parquet dentro de
+# <destino>/evento=<evento>/estacao=<estacao>/, então uma leitura que precisa
+# de um evento só abre as pastas daquele evento (predicate pushdown).
+# O pyarrow é opcional: sem ele os scripts continuam gravando CSV.
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+COLUNAS_PARTICAO = ["evento", "estacao"]
+
+
+def otimizar_tipos(df):
+    # evento/estacao como categoria e amostras em float32.
+    # A primeira coluna (Time ou Freq.) é o eixo e continua em float64.
+    df = df.copy()
+    for coluna in df.columns[1:]:
+        if coluna in COLUNAS_PARTICAO:
+            df[coluna] = df[coluna].astype("category")
+        elif pd.api.types.is_float_dtype(df[coluna]):
+            df[coluna] = df[coluna].astype("float32")
+    return df
+
+
+def _nome_seguro(texto):
+    return re.sub(r"[^0-9A-Za-z_.-]", "_", texto)
+
+
+def caminho_particao(destino, evento, estacao):
+    return os.path.join(destino, f"evento={evento}", f"estacao={estacao}")
+
+
+def gravar_parte(df, destino, nome_parte):
+    # Grava as linhas de um arquivo de origem (que tem um único evento/estação)
+    evento = str(df["evento"].iloc[0])
+    estacao = str(df["estacao"].iloc[0])
+    pasta = caminho_particao(destino, evento, estacao)
+    os.makedirs(pasta, exist_ok=True)
+
+    dados = otimizar_tipos(df.drop(columns=COLUNAS_PARTICAO))
+    caminho = os.path.join(pasta, _nome_seguro(nome_parte) + ".parquet")
+    pq.write_table(pa.Table.from_pandas(dados, preserve_index=False), caminho)
+    return os.path.relpath(caminho, destino)
+
+
+def gravar_parte_em_blocos(blocos, destino, nome_parte):
+    # Igual a gravar_parte, mas recebe os dados em blocos e grava um row group por bloco.
+    # Devolve (parte, linhas, colunas).
+    escritor = None
+    caminho = None
+    linhas = 0
+    colunas = None
+    try:
+        for bloco in blocos:
+            if escritor is None:
+                colunas = bloco.columns.tolist()
+                pasta = caminho_particao(destino, str(bloco["evento"].iloc[0]), str(bloco["estacao"].iloc[0]))
+                os.makedirs(pasta, exist_ok=True)
+                caminho = os.path.join(pasta, _nome_seguro(nome_parte) + ".parquet")
+                tabela = pa.Table.from_pandas(otimizar_tipos(bloco.drop(columns=COLUNAS_PARTICAO)), preserve_index=False)
+                escritor = pq.ParquetWriter(caminho, tabela.schema)
+            else:
+                tabela = pa.Table.from_pandas(otimizar_tipos(bloco.drop(columns=COLUNAS_PARTICAO)),
+                                              schema=escritor.schema, preserve_index=False)
+            escritor.write_table(tabela)
+            linhas += len(bloco)
+    except Exception:
+        if escritor is not None:
+            escritor.close()
+            remover_parte(destino, os.path.relpath(caminho, destino))
+        raise
+    if escritor is None:
+        raise ValueError(f"arquivo vazio: {nome_parte}")
+    escritor.close()
+    return os.path.relpath(caminho, destino), linhas, colunas
+
+
+def remover_parte(destino, parte):
+    caminho = os.path.join(destino, parte)
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+    # Remove as pastas de partição que ficaram vazias
+    pasta = os.path.dirname(caminho)
+    while os.path.abspath(pasta) != os.path.abspath(destino) and not os.listdir(pasta):
+        os.rmdir(pasta)
+        pasta = os.path.dirname(pasta)
+
+
+def limpar_destino(destino):
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    os.makedirs(destino, exist_ok=True)
+
+
+def store_disponivel(destino):
+    return PARQUET_DISPONIVEL and os.path.isdir(destino)
+
+
+def ler_store(destino, colunas=None, eventos=None, estacoes=None):
+    # Lê só as colunas e partições pedidas; evento/estacao voltam como categoria
+    particionamento = ds.partitioning(
+        pa.schema([("evento", pa.string()), ("estacao", pa.string())]),
+        flavor="hive"
+    )
+    dataset = ds.dataset(destino, format="parquet", partitioning=particionamento)
+
+    filtro = None
+    if eventos is not None:
+        filtro = ds.field("evento").isin(list(eventos))
+    if estacoes is not None:
+        filtro_estacoes = ds.field("estacao").isin([str(e) for e in estacoes])
+        filtro = filtro_estacoes if filtro is None else filtro & filtro_estacoes
+
+    tabela = dataset.to_table(columns=colunas, filter=filtro)
+    df = tabela.to_pandas()
+    for coluna in COLUNAS_PARTICAO:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype("category")
+    return df
+
+
+# CSV consolidado (sem o store Parquet): lido inteiro uma vez por processo e
+# guardado com a assinatura do arquivo (mtime, tamanho). Cada arquivo de origem
+# ocupa linhas contíguas no consolidado, então as faixas (evento, estacao) ->
+# [(inicio, fim)] dão as linhas de um evento sem comparar a coluna inteira.
+_csv_em_memoria = {}  # caminho do CSV -> (assinatura, frame, faixas)
+_lock_csv = threading.Lock()
+
+
+def _faixas(df):
+    evento = df["evento"].cat.codes.to_numpy()
+    estacao = df["estacao"].cat.codes.to_numpy()
+    mudancas = np.flatnonzero((evento[1:] != evento[:-1]) | (estacao[1:] != estacao[:-1])) + 1
+    inicios = np.concatenate([[0], mudancas]) if len(df) else np.empty(0, dtype=np.int64)
+    fins = np.concatenate([mudancas, [len(df)]]) if len(df) else np.empty(0, dtype=np.int64)
+    eventos, estacoes = df["evento"].cat.categories, df["estacao"].cat.categories
+    faixas = {}
+    for inicio, fim in zip(inicios, fins):
+        chave = (eventos[evento[inicio]], estacoes[estacao[inicio]])
+        faixas.setdefault(chave, []).append((int(inicio), int(fim)))
+    return faixas
+
+
+def _csv_consolidado(caminho):
+    info = os.stat(caminho)
+    sig = (info.st_mtime_ns, info.st_size)
+    salvo = _csv_em_memoria.get(caminho)
+    if salvo is None or salvo[0] != sig:
+        with _lock_csv:
+            salvo = _csv_em_memoria.get(caminho)
+            if salvo is None or salvo[0] != sig:
+                # Lidos direto como categoria: evento/estacao não viram uma string por linha
+                df = pd.read_csv(caminho, dtype={"evento": "category", "estacao": "category"})
+                salvo = _csv_em_memoria[caminho] = (sig, df, _faixas(df))
+    return salvo[1], salvo[2]
+
+
+def ler_consolidado(base_path, nome, colunas=None, eventos=None, estacoes=None):
+    # Usa o store Parquet <nome>/ quando existe; senão cai no CSV <nome>.csv (em memória, ver acima)
+    destino = os.path.join(base_path, nome)
+    if store_disponivel(destino):
+        return ler_store(destino, colunas=colunas, eventos=eventos, estacoes=estacoes)
+
+    df, faixas = _csv_consolidado(destino + ".csv")
+    if eventos is not None or estacoes is not None:
+        eventos = None if eventos is None else set(eventos)
+        estacoes = None if estacoes is None else {str(e) for e in estacoes}
+        blocos = sorted(
+            faixa for (evento, estacao), lista in faixas.items()
+            if (eventos is None or evento in eventos) and (estacoes is None or estacao in estacoes)
+            for faixa in lista
+        )
+        linhas = np.concatenate([np.arange(inicio, fim) for inicio, fim in blocos]) if blocos else []
+        df = df.take(linhas)
+    if colunas is not None:
+        df = df[list(colunas)]
+    return df.reset_index(drop=True)
@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+# Suíte de benchmarks: gera árvores sintéticas em várias escalas (ver
+# gerar_arvore.py) e mede os caminhos quentes do app e dos scripts de
+# consolidação. O resultado vai para um JSON (um registro por escala x caso);
+# com --comparar, cada caso é confrontado com uma rodada anterior e a saída
+# termina com código 1 se algum ficou mais lento que a tolerância.
+#
+# Exemplo:
+#   python benchmarks/executar.py --escalas 10x6 100x6 --saida resultados.json
+#   python benchmarks/executar.py --escalas 10x6 100x6 --comparar resultados.json
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from gerar_arvore import gerar_arvore
+
+
+def medir(funcao, repeticoes, preparar=None):
+    # Tempos (s) de cada repetição; preparar() roda antes de cada uma, fora da medição
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def _importar_app():
+    # main.py lê assets/ relativo à pasta do repositório
+    atual = os.getcwd()
+    os.chdir(RAIZ)
+    try:
+        import main
+        import home
+    finally:
+        os.chdir(atual)
+    return main, home
+
+
+def casos(base, repeticoes):
+    # Gera (nome, tempos, itens) de cada caso para a árvore em <base>/events
+    import consolidate_events
+    import armazenamento
+    import indice_eventos
+    from consolidacao import consolidar
+
+    eventos_dir = os.path.join(base, "events")
+    pasta = os.path.join(eventos_dir, "2025", "2025")
+    n_jsons = len(consolidate_events.listar_jsons(pasta))
+
+    yield "consolidate_events.carregar_eventos", medir(lambda: consolidate_events.carregar_eventos(pasta), repeticoes), n_jsons
+    yield "consolidate_events.carregar_eventos_streaming", medir(
+        lambda: consolidate_events.carregar_eventos_streaming(pasta), repeticoes), n_jsons
+
+    formatos = ["csv"] + (["parquet"] if armazenamento.PARQUET_DISPONIVEL else [])
+    for sufixo, nome in (("_data.csv", "data_consolidado"), ("_freq.csv", "freq_consolidado")):
+        for formato in formatos:
+            saida = os.path.join(base, nome + (".csv" if formato == "csv" else ""))
+
+            def limpar():
+                for caminho in (saida, saida + ".manifest.json"):
+                    if os.path.isdir(caminho):
+                        shutil.rmtree(caminho)
+                    elif os.path.exists(caminho):
+                        os.remove(caminho)
+
+            tempos = medir(lambda: consolidar(eventos_dir, sufixo, saida, formato=formato, verboso=False),
+                           repeticoes, preparar=limpar)
+            yield f"consolidar{sufixo[:-4]}.{formato}", tempos, _contar(eventos_dir, sufixo)
+
+    yield "indice_eventos.montagem", medir(lambda: indice_eventos.IndiceEventos(pasta).atualizar(forcar=True), repeticoes), n_jsons
+
+    main, home = _importar_app()
+    main.dados.configurar(base)
+    eventos = list(main.dados.eventos_unicos())
+
+    yield "main.classificar_evento", medir(lambda: [main.classificar_evento(e) for e in eventos], repeticoes), len(eventos)
+
+    # Picos: uma chamada por espectro (estação x canal) dos primeiros eventos
+    amostra = eventos[:20]
+    series = []
+    for evento in amostra:
+        df = main.dados.espectro(evento, colunas=["Freq.", "T", "R", "V", "estacao"])
+        for _, grupo in df.groupby("estacao", observed=True):
+            grupo = grupo.sort_values("Freq.")
+            for canal in ["T", "R", "V"]:
+                series.append((grupo["Freq."].to_numpy(), grupo[canal].to_numpy()))
+    yield "main.encontrar_picos", medir(lambda: [main.encontrar_picos(f, a) for f, a in series], repeticoes), len(series)
+    yield "main.encontrar_picos_evento", medir(lambda: [main.encontrar_picos_evento(e) for e in amostra], repeticoes), len(amostra)
+
+    # Prévia da página inicial chamada direto: sem cache (frio) e repetindo a mesma consulta (quente)
+    filtros = (["todos"], "2025-01-01", "2025-12-31")
+    yield "home.montar_previa.frio", medir(lambda: home.montar_previa(*filtros), repeticoes,
+                                           preparar=home.cache_previa.limpar), len(eventos)
+    home.montar_previa(*filtros)
+    yield "home.montar_previa.quente", medir(lambda: home.montar_previa(*filtros), repeticoes), len(eventos)
+
+
+def _contar(eventos_dir, sufixo):
+    return sum(1 for _, _, arquivos in os.walk(eventos_dir) for a in arquivos if a.endswith(sufixo))
+
+
+def ambiente():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    import numpy
+    return {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": numpy.__version__,
+    }
+
+
+def executar(escalas, taxa, duracao, repeticoes, pasta=None, manter=False):
+    resultados = []
+    for escala in escalas:
+        n_eventos, n_estacoes = (int(x) for x in escala.lower().split("x"))
+        base = tempfile.mkdtemp(prefix=f"bench_{escala}_", dir=pasta)
+        try:
+            inicio = time.perf_counter()
+            gerar_arvore(base, n_eventos, n_estacoes, taxa, duracao)
+            print(f"[{escala}] árvore gerada em {time.perf_counter() - inicio:.1f} s ({base})", file=sys.stderr)
+
+            for caso, tempos, itens in casos(base, repeticoes):
+                mediana = statistics.median(tempos)
+                registro = {
+                    "escala": escala,
+                    "eventos": n_eventos,
+                    "estacoes": n_estacoes,
+                    "taxa": taxa,
+                    "duracao": duracao,
+                    "caso": caso,
+                    "itens": itens,
+                    "tempos": tempos,
+                    "mediana": mediana,
+                    "minimo": min(tempos),
+                    "itens_por_segundo": itens / mediana if mediana > 0 else None,
+                }
+                resultados.append(registro)
+                print(f"[{escala}] {caso}: {mediana * 1000:.1f} ms (mediana de {len(tempos)})", file=sys.stderr)
+        finally:
+            if not manter:
+                shutil.rmtree(base, ignore_errors=True)
+    return {"ambiente": ambiente(), "resultados": resultados}
+
+
+def comparar(atual, anterior, tolerancia):
+    # Lista os casos cuja mediana piorou mais que `tolerancia` (fração) em relação à rodada anterior
+    antes = {(r["escala"], r["caso"]): r["mediana"] for r in anterior["resultados"]}
+    regressoes = []
+    for r in atual["resultados"]:
+        referencia = antes.get((r["escala"], r["caso"]))
+        if referencia and r["mediana"] > referencia * (1 + tolerancia):
+            regressoes.append((r["escala"], r["caso"], referencia, r["mediana"]))
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do app e da consolidação sobre árvores sintéticas")
+    parser.add_argument("--escalas", nargs="+", default=["10x6", "50x6"],
+                        help="Escalas no formato <eventos>x<estações>")
+    parser.add_argument("--taxa", type=int, default=400, help="Amostras por segundo das séries geradas")
+    parser.add_argument("--duracao", type=float, default=95.0, help="Segundos de série por estação")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados (padrão: stdout)")
+    parser.add_argument("--pasta", default=None, help="Onde criar as árvores temporárias")
+    parser.add_argument("--manter", action="store_true", help="Não apaga as árvores geradas")
+    parser.add_argument("--comparar", default=None, help="JSON de uma rodada anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.20,
+                        help="Piora relativa aceita antes de acusar regressão (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    resultado = executar(args.escalas, args.taxa, args.duracao, args.repeticoes, args.pasta, args.manter)
+
+    if args.comparar:
+        # Lê antes de gravar, caso --saida aponte para o mesmo arquivo
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    texto = json.dumps(resultado, indent=1)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        regressoes = comparar(resultado, anterior, args.tolerancia)
+        for escala, caso, antes, depois in regressoes:
+            print(f"REGRESSÃO [{escala}] {caso}: {antes * 1000:.1f} ms -> {depois * 1000:.1f} ms", file=sys.stderr)
+        sys.exit(1 if regressoes else 0)
@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+# Gera uma árvore events/ sintética no mesmo formato da exportada pelos
+# gravadores: events/<ano>/<ano>/<mês>/<dia>/<HHhMMmSSs>.json com os
+# metadados ("eventFiles") e, para cada estação, <evento>_<serial>_data.csv
+# (Time,T,R,V) e <evento>_<serial>_freq.csv (Freq.,T,R,V).
+#
+# As séries são ruído + uma oscilação amortecida com amplitude sorteada por
+# evento, então os eventos caem nas três classificações (ruído, local e
+# global). O espectro é o módulo da rfft da própria série entre f_min e f_max,
+# e os picos do JSON (dfFft.peak) são os 5 maiores bins de cada canal.
+
+# Estações reais (nome do gravador -> serial); acima de 6 estações os nomes são inventados
+ESTACOES = [
+    ("S-01-1", "20160005"),
+    ("S-06-1", "20160004"),
+    ("S-01-2", "20160008"),
+    ("S-07-1", "20160003"),
+    ("S-09-1", "20160007"),
+    ("S-10-1", "20160006"),
+]
+CANAIS = ["T", "R", "V"]
+
+
+def estacoes_sinteticas(n):
+    estacoes = list(ESTACOES[:n])
+    for i in range(len(estacoes), n):
+        estacoes.append((f"S-{i + 1:02d}-9", str(20170000 + i)))
+    return estacoes
+
+
+def _horarios(n_eventos, inicio, rng):
+    # Um instante por evento, com nomes HHhMMmSSs distintos (o app identifica o evento pelo nome)
+    segundos = rng.choice(86400, size=n_eventos, replace=n_eventos > 86400)
+    dias = np.arange(n_eventos) // max(1, -(-n_eventos // 28))  # Espalha por ~4 semanas
+    return sorted(inicio + timedelta(days=int(d), seconds=int(s)) for d, s in zip(dias, segundos))
+
+
+def _serie(n_amostras, taxa, intensidade, rng):
+    tempo = np.arange(n_amostras) / taxa
+    inicio = n_amostras // 3
+    envelope = np.zeros(n_amostras)
+    envelope[inicio:] = np.exp(-(tempo[inicio:] - tempo[inicio]) / 5.0)
+    canais = {}
+    for canal in CANAIS:
+        frequencia = rng.uniform(3.0, 18.0)
+        canais[canal] = (
+            rng.normal(0.0, 0.02, n_amostras)
+            + intensidade * envelope * np.sin(2 * np.pi * frequencia * tempo + rng.uniform(0, 2 * np.pi))
+        )
+    return tempo, canais
+
+
+def _espectro(canais, taxa, f_min, f_max):
+    n = len(next(iter(canais.values())))
+    frequencias = np.fft.rfftfreq(n, 1.0 / taxa)
+    faixa = (frequencias >= f_min) & (frequencias <= f_max)
+    amplitudes = {canal: np.abs(np.fft.rfft(valores))[faixa] for canal, valores in canais.items()}
+    return frequencias[faixa], amplitudes
+
+
+def gerar_evento(pasta, nome_evento, instante, estacoes, taxa, duracao, f_min, f_max, rng):
+    n_amostras = int(taxa * duracao)
+    # Intensidade do evento e quanto ela cai de uma estação para outra: define a classificação
+    intensidade = rng.choice([0.05, 0.5, 2.0], p=[0.4, 0.4, 0.2])
+    arquivos = {}
+    for posicao, (nome, serial) in enumerate(estacoes):
+        atenuacao = rng.uniform(0.2, 1.0) if posicao else 1.0
+        tempo, canais = _serie(n_amostras, taxa, intensidade * atenuacao, rng)
+        frequencias, amplitudes = _espectro(canais, taxa, f_min, f_max)
+
+        base = f"{nome_evento}_{serial}"
+        pd.DataFrame({"Time": tempo, **canais}).to_csv(os.path.join(pasta, base + "_data.csv"), index=False)
+        pd.DataFrame({"Freq.": frequencias, **amplitudes}).to_csv(os.path.join(pasta, base + "_freq.csv"), index=False)
+
+        disparo = instante + timedelta(microseconds=int(rng.integers(0, 2000)))
+        cf, picos = [], []
+        for canal in CANAIS:
+            valores = canais[canal]
+            pico = float(np.max(np.abs(valores)))
+            cf.append({"chName": canal, "peak": pico, "rms": float(np.sqrt(np.mean(valores ** 2))),
+                       "value": pico * 9.80665})  # valor em mg: passa do limiar de acionamento (10) acima de ~1 m/s²
+            maiores = np.argsort(amplitudes[canal])[::-1][:5]
+            picos.append({"chName": canal, "value": [
+                {"freq": float(frequencias[i]), "ampl": float(amplitudes[canal][i])} for i in maiores
+            ]})
+
+        arquivos[serial] = {
+            "recorderUid": serial,
+            "recorderName": nome,
+            "sensorUnit": "mg",
+            "triggerStart": disparo.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "startEvent": (disparo - timedelta(seconds=duracao / 3)).strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "acquisRate": taxa,
+            "fCutMin": f_min,
+            "fCutMax": f_max,
+            "df": {"data": {"indexName": "Time", "column": CANAIS, "relObjName": base + "_data.csv"}, "cf": cf},
+            "dfFft": {"data": {"indexName": "Freq.", "column": CANAIS, "relObjName": base + "_freq.csv"}, "peak": picos},
+        }
+
+    with open(os.path.join(pasta, nome_evento + ".json"), "w", encoding="utf-8") as f:
+        json.dump({"triggerTs": instante.isoformat(), "eventFiles": arquivos}, f)
+
+
+def gerar_arvore(destino, n_eventos, n_estacoes=6, taxa=400, duracao=95.0, f_min=2, f_max=20,
+                 inicio=datetime(2025, 1, 1), semente=0):
+    # Cria <destino>/events/... e devolve a pasta dos eventos (a que o app varre: events/<ano>/<ano>)
+    rng = np.random.default_rng(semente)
+    estacoes = estacoes_sinteticas(n_estacoes)
+    raiz = os.path.join(destino, "events", str(inicio.year), str(inicio.year))
+    for instante in _horarios(n_eventos, inicio, rng):
+        pasta = os.path.join(raiz, f"{instante:%m}", f"{instante:%d}")
+        os.makedirs(pasta, exist_ok=True)
+        gerar_evento(pasta, f"{instante:%Hh%Mm%Ss}", instante, estacoes, taxa, duracao, f_min, f_max, rng)
+    return raiz
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera uma árvore events/ sintética para os benchmarks")
+    parser.add_argument("destino", help="Pasta onde events/ será criada")
+    parser.add_argument("--eventos", type=int, default=20)
+    parser.add_argument("--estacoes", type=int, default=6)
+    parser.add_argument("--taxa", type=int, default=400, help="Amostras por segundo (acquisRate)")
+    parser.add_argument("--duracao", type=float, default=95.0, help="Segundos de série por estação")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    pasta = gerar_arvore(args.destino, args.eventos, args.estacoes, args.taxa, args.duracao, semente=args.semente)
+    print(f"{args.eventos} evento(s) x {args.estacoes} estação(ões) gerados em {pasta}", file=sys.stderr)
@@ -0,0 +1,203 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+import instrumentacao
+
+# Cache de resultados, limitado por quantidade (LRU) e por idade (TTL).
+# Cada entrada é gravada junto com a versão dos dados que a gerou: quando a
+# versão muda (chegaram eventos novos), as entradas antigas deixam de valer.
+#
+# Dois backends com a mesma interface (obter/limpar/estatisticas):
+#   CacheLRU   - dicionário em memória, um por processo
+#   CacheDisco - um arquivo pickle por entrada numa pasta, compartilhado por
+#                todos os processos (ex.: workers do gunicorn) que apontam para ela
+# Cache escolhe entre os dois conforme configurar_backend(); é o que os módulos usam.
+
+# Pasta do cache em disco; None = cada processo usa a própria memória
+_pasta_compartilhada = None
+
+
+class CacheLRU:
+    def __init__(self, max_itens=64, ttl=300.0):
+        self.max_itens = max_itens
+        self.ttl = ttl  # segundos; None = sem expiração
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self._itens = OrderedDict()  # chave -> (instante, valor)
+        self._versao = None
+        self._lock = threading.Lock()
+
+    def obter(self, chave, calcular, versao=None):
+        # Devolve o valor guardado em `chave` ou calcula, guarda e devolve
+        agora = time.monotonic()
+        with self._lock:
+            if versao != self._versao:
+                self._descartar_tudo()
+                self._versao = versao
+            item = self._itens.get(chave)
+            if item is not None and (self.ttl is None or agora - item[0] <= self.ttl):
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[1]
+            self.falhas += 1
+
+        # Calcula fora do lock para não travar outras consultas
+        valor = calcular()
+
+        with self._lock:
+            if versao == self._versao:
+                self._itens[chave] = (agora, valor)
+                self._itens.move_to_end(chave)
+                while len(self._itens) > self.max_itens:
+                    self._itens.popitem(last=False)
+                    self.descartes += 1
+        return valor
+
+    def _descartar_tudo(self):
+        self.descartes += len(self._itens)
+        self._itens.clear()
+
+    def limpar(self):
+        with self._lock:
+            self._descartar_tudo()
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "descartes": self.descartes,
+                "taxa_acerto": self.acertos / total if total else 0.0,
+            }
+
+
+class CacheDisco:
+    # As chaves e versões precisam ter repr() estável entre processos (tuplas, strings, datas)
+    def __init__(self, pasta, max_itens=64, ttl=300.0):
+        self.pasta = pasta
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.acertos = 0  # Contadores deste processo
+        self.falhas = 0
+        self.descartes = 0
+        os.makedirs(pasta, exist_ok=True)
+
+    def _arquivo(self, chave, versao):
+        nome = hashlib.sha1(repr((chave, versao)).encode("utf-8")).hexdigest()
+        return os.path.join(self.pasta, nome + ".pkl")
+
+    def obter(self, chave, calcular, versao=None):
+        arquivo = self._arquivo(chave, versao)
+        try:
+            if self.ttl is None or time.time() - os.path.getmtime(arquivo) <= self.ttl:
+                with open(arquivo, "rb") as f:
+                    valor = pickle.load(f)
+                self.acertos += 1
+                os.utime(arquivo)  # Marca como usado recentemente
+                return valor
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+        self.falhas += 1
+
+        valor = calcular()
+        try:
+            # Grava num temporário do próprio processo e troca de uma vez: ninguém lê arquivo pela metade
+            temporario = f"{arquivo}.{os.getpid()}.tmp"
+            with open(temporario, "wb") as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, arquivo)
+            self._podar()
+        except Exception as erro:
+            print(f"Erro ao gravar cache em {self.pasta}: {erro}")
+        return valor
+
+    def _entradas(self):
+        entradas = []
+        for nome in os.listdir(self.pasta):
+            if nome.endswith(".pkl"):
+                caminho = os.path.join(self.pasta, nome)
+                try:
+                    entradas.append((os.path.getmtime(caminho), caminho))
+                except OSError:
+                    continue
+        return sorted(entradas)
+
+    def _podar(self):
+        # Remove as entradas usadas há mais tempo (inclui as de versões antigas, que não são mais lidas)
+        entradas = self._entradas()
+        for _, caminho in entradas[:max(0, len(entradas) - self.max_itens)]:
+            try:
+                os.remove(caminho)
+                self.descartes += 1
+            except OSError:
+                pass
+
+    def limpar(self):
+        for _, caminho in self._entradas():
+            try:
+                os.remove(caminho)
+                self.descartes += 1
+            except OSError:
+                pass
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            "itens": len(self._entradas()),
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "descartes": self.descartes,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+        }
+
+
+def configurar_backend(pasta=None):
+    # pasta: diretório compartilhado pelos processos; None volta ao cache em memória
+    global _pasta_compartilhada
+    _pasta_compartilhada = pasta
+
+
+class Cache:
+    # Cache com nome, criado na importação do módulo que o usa. O backend só é
+    # escolhido no primeiro uso, depois de configurar_backend() já ter sido chamado.
+    def __init__(self, nome, max_itens=64, ttl=300.0):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._backend = None
+        self._pasta = None
+
+    def backend(self):
+        if self._backend is None or self._pasta != _pasta_compartilhada:
+            self._pasta = _pasta_compartilhada
+            if self._pasta is None:
+                self._backend = CacheLRU(self.max_itens, self.ttl)
+            else:
+                self._backend = CacheDisco(os.path.join(self._pasta, self.nome), self.max_itens, self.ttl)
+        return self._backend
+
+    def obter(self, chave, calcular, versao=None):
+        if not instrumentacao.medindo():
+            return self.backend().obter(chave, calcular, versao)
+        # Dentro de um callback instrumentado: calcular() só roda quando é falha
+        calculou = []
+
+        def calcular_e_marcar():
+            calculou.append(True)
+            return calcular()
+
+        valor = self.backend().obter(chave, calcular_e_marcar, versao)
+        instrumentacao.contar_cache(acerto=not calculou)
+        return valor
+
+    def limpar(self):
+        self.backend().limpar()
+
+    def estatisticas(self):
+        return self.backend().estatisticas()
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Classificação de eventos em Ruído / Evento Local / Evento Global a partir da
+# proporção de estações acionadas (estações com algum canal acima do limiar
+# de acionamento). Usada por main.py, home.py e pelo índice de eventos.
+
+# Limites padrão
+LIMIAR_ACIONAMENTO = 10   # valor mínimo para considerar a estação acionada
+LIMIAR_RUIDO = 0.10       # proporção abaixo disso é ruído
+LIMIAR_GLOBAL = 0.75      # proporção acima disso é evento global
+
+RUIDO = "Ruído"
+LOCAL = "Evento Local"
+GLOBAL = "Evento Global"
+SEM_DADOS = "Sem dados"
+
+# Valores dos filtros de tipo (home e gerar_relatorios.py) -> classificação
+TIPOS_FILTRO = {
+    'global': GLOBAL,
+    'local': LOCAL,
+    'ruido': RUIDO
+}
+
+
+def classificacoes_do_filtro(tipos_evento):
+    # Classificações aceitas por um filtro de tipos; None quando o filtro inclui 'todos'
+    if 'todos' in tipos_evento:
+        return None
+    return [TIPOS_FILTRO[t] for t in tipos_evento if t in TIPOS_FILTRO]
+
+
+def classificar_proporcao(estacoes_acionadas, total_estacoes,
+                          limiar_ruido=LIMIAR_RUIDO, limiar_global=LIMIAR_GLOBAL):
+    # Versão escalar, para quem já tem as contagens de um evento
+    if total_estacoes == 0:
+        return SEM_DADOS
+
+    proporcao = estacoes_acionadas / total_estacoes
+
+    if proporcao < limiar_ruido:
+        return RUIDO
+    elif proporcao <= limiar_global:
+        return LOCAL
+    return GLOBAL
+
+
+def classificar_eventos(df, coluna_evento="evento", coluna_estacao="estacao", coluna_valor="valor",
+                        limiar_acionamento=LIMIAR_ACIONAMENTO, limiar_ruido=LIMIAR_RUIDO,
+                        limiar_global=LIMIAR_GLOBAL):
+    # Classifica todos os eventos de df de uma vez. Devolve um DataFrame indexado
+    # pelo evento com estacoes_acionadas, total_estacoes, proporcao e classificacao.
+    colunas = ["estacoes_acionadas", "total_estacoes", "proporcao", "classificacao"]
+    if df.empty:
+        return pd.DataFrame(columns=colunas, index=pd.Index([], name=coluna_evento))
+
+    # Maior valor de cada estação em cada evento (uma estação está acionada se algum canal passou do limiar)
+    maximos = df.groupby([coluna_evento, coluna_estacao], sort=False, observed=True)[coluna_valor].max()
+    acionada = (maximos > limiar_acionamento).to_numpy()
+
+    # Contagens por evento direto sobre os códigos do primeiro nível
+    codigos, eventos = pd.factorize(maximos.index.get_level_values(0))
+    total = np.bincount(codigos, minlength=len(eventos))
+    acionadas = np.bincount(codigos, weights=acionada, minlength=len(eventos)).astype(np.int64)
+    proporcao = acionadas / total
+
+    classificacao = np.select(
+        [proporcao < limiar_ruido, proporcao <= limiar_global],
+        [RUIDO, LOCAL],
+        default=GLOBAL
+    )
+
+    return pd.DataFrame({
+        "estacoes_acionadas": acionadas,
+        "total_estacoes": total,
+        "proporcao": proporcao,
+        "classificacao": classificacao,
+    }, index=pd.Index(eventos, name=coluna_evento))
@@ -0,0 +1,386 @@
+import os
+import json
+from functools import partial
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+import armazenamento
+from ingestao import processar_arquivos
+
+# Funções compartilhadas por consolidate_data.py e consolidate_freq.py.
+# O manifesto guarda, para cada arquivo de origem já consolidado, o tamanho,
+# a data de modificação e quantas linhas ele ocupa na saída (na ordem em que
+# aparecem). Com isso o modo incremental lê apenas arquivos novos ou alterados
+# e remenda a saída sem reprocessar o histórico inteiro.
+#
+# Há dois formatos de saída: "csv" (um único arquivo, como antes) e "parquet"
+# (pasta particionada por evento/estação, ver armazenamento.py). No formato
+# parquet cada arquivo de origem vira uma parte própria, então o modo
+# incremental só grava ou apaga as partes envolvidas.
+#
+# Com memoria_mb definido, cada arquivo é lido em blocos de linhas que cabem
+# nesse orçamento e escrito direto na saída, sem juntar tudo em memória. O
+# CSV gerado assim é idêntico, byte a byte, ao da consolidação em memória;
+# arquivos com colunas diferentes entre si param a consolidação CSV em blocos
+# com ValueError (em memória eles viram a união das colunas).
+
+VERSAO_MANIFESTO = 1
+
+
+def formato_padrao():
+    return "parquet" if armazenamento.PARQUET_DISPONIVEL else "csv"
+
+
+def caminho_manifesto(saida, formato="csv"):
+    # No CSV o manifesto fica ao lado do arquivo consolidado; no parquet, dentro da pasta
+    # (o prefixo "_" faz o pyarrow ignorá-lo ao ler o dataset)
+    if formato == "parquet":
+        return os.path.join(saida, "_manifesto.json")
+    return saida + ".manifest.json"
+
+
+def listar_arquivos(base_path, sufixo):
+    # Varre os diretórios recursivamente e devolve os arquivos com o sufixo pedido
+    caminhos = []
+    for root, dirs, files in os.walk(base_path):
+        for file in files:
+            if file.endswith(sufixo):
+                caminhos.append(os.path.join(root, file))
+    return caminhos
+
+
+def identificar_arquivo(file_path, sufixo):
+    # Extrai nome do evento e estação do nome do arquivo
+    nome_arquivo = os.path.basename(file_path)
+    partes = nome_arquivo.split("_")
+    nome_evento = partes[0]  # Ex: 12h03m42s
+    estacao = partes[1].replace(sufixo, "")  # Ex: 20160003
+    return nome_evento, estacao
+
+
+def marcar_origem(df, nome_evento, estacao):
+    # evento/estacao como categoria de um valor só: um código de 1 byte por linha em vez de uma string
+    for coluna, valor in (("evento", nome_evento), ("estacao", estacao)):
+        df[coluna] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=[valor])
+    return df
+
+
+def concatenar(frames):
+    # pd.concat que mantém evento/estacao como categoria (categorias diferentes viram a união)
+    frames = list(frames)
+    categoricas = [c for c in armazenamento.COLUNAS_PARTICAO
+                   if all(isinstance(df[c].dtype, pd.CategoricalDtype) for df in frames)]
+    df = pd.concat([df.drop(columns=categoricas) for df in frames], ignore_index=True)
+    for coluna in categoricas:
+        df[coluna] = union_categoricals([df_[coluna] for df_ in frames])
+    return df
+
+
+def ler_arquivo(file_path, sufixo):
+    # Lê o CSV
+    df = pd.read_csv(file_path)
+
+    # Adiciona colunas extras
+    return marcar_origem(df, *identificar_arquivo(file_path, sufixo))
+
+
+def linhas_por_bloco(file_path, sufixo, memoria_mb):
+    # Estima quantas linhas cabem no orçamento a partir de uma amostra do arquivo.
+    # O divisor deixa margem para as cópias temporárias que o pandas faz ao ler e escrever.
+    amostra = marcar_origem(pd.read_csv(file_path, nrows=1000), *identificar_arquivo(file_path, sufixo))
+    bytes_por_linha = max(1.0, amostra.memory_usage(deep=True).sum() / max(len(amostra), 1))
+    return max(1000, int(memoria_mb * 1024 * 1024 / (bytes_por_linha * 4)))
+
+
+def ler_em_blocos(file_path, sufixo, linhas_bloco):
+    # Mesmo conteúdo de ler_arquivo, entregue em pedaços de até linhas_bloco linhas
+    nome_evento, estacao = identificar_arquivo(file_path, sufixo)
+    with pd.read_csv(file_path, chunksize=linhas_bloco) as leitor:
+        for bloco in leitor:
+            yield marcar_origem(bloco, nome_evento, estacao)
+
+
+def assinatura(file_path):
+    # Tamanho e data de modificação identificam se o arquivo mudou
+    info = os.stat(file_path)
+    return {"tamanho": info.st_size, "mtime": info.st_mtime_ns}
+
+
+def carregar_manifesto(saida, formato="csv"):
+    caminho = caminho_manifesto(saida, formato)
+    if not os.path.exists(caminho) or not os.path.exists(saida):
+        return None
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except Exception as e:
+        print(f"Erro ao ler manifesto {caminho}: {e}")
+        return None
+
+    # Se a saída foi mexida por fora, o manifesto não vale mais
+    if manifesto.get("versao") != VERSAO_MANIFESTO or manifesto.get("formato", "csv") != formato:
+        return None
+    if formato == "csv" and manifesto.get("tamanho_saida") != os.path.getsize(saida):
+        print(f"Manifesto desatualizado para {saida}, refazendo consolidação completa.")
+        return None
+    return manifesto
+
+
+def salvar_manifesto(saida, colunas, arquivos, formato="csv"):
+    manifesto = {
+        "versao": VERSAO_MANIFESTO,
+        "formato": formato,
+        "colunas": colunas,
+        "arquivos": arquivos,  # Lista na mesma ordem das linhas da saída
+    }
+    if formato == "csv":
+        manifesto["tamanho_saida"] = os.path.getsize(saida)
+    caminho = caminho_manifesto(saida, formato)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=1)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def _ler_varios(caminhos, sufixo, workers=1):
+    # Lê cada arquivo (em paralelo se workers > 1) mantendo o relatório de erro por arquivo
+    return processar_arquivos(caminhos, partial(ler_arquivo, sufixo=sufixo), workers=workers)
+
+
+def _assinaturas(caminhos):
+    # Tiradas antes de ler: se o arquivo ainda estiver sendo gravado, o manifesto
+    # fica com a assinatura velha e a próxima consolidação incremental lê de novo
+    assinaturas = {}
+    for file_path in caminhos:
+        try:
+            assinaturas[file_path] = assinatura(file_path)
+        except OSError:
+            continue
+    return assinaturas
+
+
+def _colunas_arquivo(file_path):
+    # Colunas que o arquivo terá na saída, lendo só o cabeçalho.
+    # None se não der para ler: o erro aparece depois, na escrita.
+    try:
+        return pd.read_csv(file_path, nrows=0).columns.tolist() + armazenamento.COLUNAS_PARTICAO
+    except Exception:
+        return None
+
+
+def _entrada(base_path, file_path, linhas, sig):
+    entrada = {"caminho": os.path.relpath(file_path, base_path), "linhas": linhas}
+    # Sem assinatura (arquivo sumiu antes da leitura) nunca é considerado mantido
+    entrada.update(sig or {"tamanho": -1, "mtime": -1})
+    return entrada
+
+
+def _gravar_partes(base_path, saida, lidos, arquivos, assinaturas):
+    # Formato parquet: uma parte por arquivo de origem
+    for file_path, df in lidos:
+        entrada = _entrada(base_path, file_path, len(df), assinaturas.get(file_path))
+        entrada["parte"] = armazenamento.gravar_parte(df, saida, entrada["caminho"])
+        arquivos.append(entrada)
+
+
+def _anexar_csv_em_blocos(destino, file_path, sufixo, memoria_mb, colunas):
+    # Escreve um arquivo de origem no fim do CSV aberto, bloco a bloco.
+    # Se falhar no meio, a saída volta ao tamanho anterior.
+    posicao = destino.tell()
+    linhas = 0
+    try:
+        for bloco in ler_em_blocos(file_path, sufixo, linhas_por_bloco(file_path, sufixo, memoria_mb)):
+            if colunas is None:
+                colunas = bloco.columns.tolist()
+            elif bloco.columns.tolist() != colunas:
+                raise ValueError(f"colunas {bloco.columns.tolist()} diferentes de {colunas}")
+            # Cabeçalho só quando a saída ainda está vazia
+            bloco.to_csv(destino, header=(posicao == 0 and linhas == 0), index=False)
+            linhas += len(bloco)
+    except Exception:
+        destino.seek(posicao)
+        destino.truncate()
+        raise
+    return linhas, colunas
+
+
+def _gravar_parte_em_blocos(base_path, saida, file_path, sufixo, memoria_mb):
+    sig = assinatura(file_path)
+    blocos = ler_em_blocos(file_path, sufixo, linhas_por_bloco(file_path, sufixo, memoria_mb))
+    nome_parte = os.path.relpath(file_path, base_path)
+    parte, linhas, colunas = armazenamento.gravar_parte_em_blocos(blocos, saida, nome_parte)
+    entrada = _entrada(base_path, file_path, linhas, sig)
+    entrada["parte"] = parte
+    return entrada, colunas
+
+
+def _escrever_em_blocos(base_path, sufixo, saida, formato, caminhos, memoria_mb, arquivos, colunas):
+    # Acrescenta cada arquivo à saída com memória limitada; devolve as colunas vistas
+    if formato == "parquet":
+        for file_path in caminhos:
+            try:
+                entrada, colunas_arquivo = _gravar_parte_em_blocos(base_path, saida, file_path, sufixo, memoria_mb)
+            except Exception as e:
+                print(f"Erro ao processar {file_path}: {e}")
+                continue
+            colunas = colunas or colunas_arquivo
+            arquivos.append(entrada)
+        return colunas
+
+    modo = "a" if os.path.exists(saida) else "w"
+    with open(saida, modo, newline="", encoding="utf-8") as destino:
+        for file_path in caminhos:
+            try:
+                sig = assinatura(file_path)
+                linhas, colunas = _anexar_csv_em_blocos(destino, file_path, sufixo, memoria_mb, colunas)
+            except Exception as e:
+                print(f"Erro ao processar {file_path}: {e}")
+                continue
+            arquivos.append(_entrada(base_path, file_path, linhas, sig))
+    return colunas
+
+
+def consolidacao_em_blocos(base_path, sufixo, saida, formato="csv", memoria_mb=256):
+    caminhos = listar_arquivos(base_path, sufixo)
+    if not caminhos:
+        print(f"Nenhum arquivo '{sufixo}' encontrado.")
+        return None
+
+    # Em memória, colunas diferentes entre arquivos viram a união (com NaN) no CSV.
+    # Em blocos isso não dá para reproduzir sem ler tudo antes: melhor parar aqui,
+    # antes de apagar a saída, do que gravar um CSV diferente do outro modo.
+    if formato == "csv":
+        cabecalhos = {tuple(c) for c in map(_colunas_arquivo, caminhos) if c is not None}
+        if len(cabecalhos) > 1:
+            raise ValueError(f"Arquivos '{sufixo}' com colunas diferentes: a consolidação CSV em blocos "
+                             f"exige as mesmas colunas em todos (rode sem --memoria-mb)")
+
+    if formato == "parquet":
+        armazenamento.limpar_destino(saida)
+    elif os.path.exists(saida):
+        os.remove(saida)
+
+    arquivos = []
+    colunas = _escrever_em_blocos(base_path, sufixo, saida, formato, caminhos, memoria_mb, arquivos, None)
+    if not arquivos:
+        print(f"Nenhum arquivo '{sufixo}' pôde ser lido.")
+        return None
+    salvar_manifesto(saida, colunas, arquivos, formato)
+    return None
+
+
+def consolidacao_completa(base_path, sufixo, saida, formato="csv", workers=1, memoria_mb=None):
+    if memoria_mb:
+        return consolidacao_em_blocos(base_path, sufixo, saida, formato, memoria_mb)
+
+    caminhos = listar_arquivos(base_path, sufixo)
+    assinaturas = _assinaturas(caminhos)
+    lidos = _ler_varios(caminhos, sufixo, workers)
+
+    if not lidos:
+        print(f"Nenhum arquivo '{sufixo}' encontrado.")
+        return None
+
+    if formato == "parquet":
+        armazenamento.limpar_destino(saida)
+        arquivos = []
+        _gravar_partes(base_path, saida, lidos, arquivos, assinaturas)
+        salvar_manifesto(saida, lidos[0][1].columns.tolist(), arquivos, formato)
+        return None
+
+    # Junta tudo em um único DataFrame
+    df_geral = concatenar(df for _, df in lidos)
+    df_geral.to_csv(saida, index=False)
+
+    arquivos = [_entrada(base_path, file_path, len(df), assinaturas.get(file_path)) for file_path, df in lidos]
+    salvar_manifesto(saida, df_geral.columns.tolist(), arquivos)
+    return df_geral
+
+
+def consolidacao_incremental(base_path, sufixo, saida, formato="csv", workers=1, memoria_mb=None, verboso=True):
+    manifesto = carregar_manifesto(saida, formato)
+    if manifesto is None:
+        return consolidacao_completa(base_path, sufixo, saida, formato, workers, memoria_mb)
+
+    atuais = {os.path.relpath(p, base_path): p for p in listar_arquivos(base_path, sufixo)}
+    anteriores = {entrada["caminho"]: entrada for entrada in manifesto["arquivos"]}
+
+    # Classifica cada arquivo em mantido, alterado, removido ou novo
+    mantidos = set()
+    for caminho, entrada in anteriores.items():
+        if caminho in atuais:
+            try:
+                sig = assinatura(atuais[caminho])
+            except OSError:
+                continue
+            if sig["tamanho"] == entrada["tamanho"] and sig["mtime"] == entrada["mtime"]:
+                mantidos.add(caminho)
+    a_ler = [p for caminho, p in atuais.items() if caminho not in mantidos]
+    houve_remocao = len(mantidos) < len(anteriores)
+
+    if not a_ler and not houve_remocao:
+        if verboso:
+            print(f"Nenhum arquivo novo ou alterado para {saida}.")
+        return None
+
+    colunas = manifesto["colunas"]
+    # Com orçamento de memória os arquivos são lidos em blocos na hora de escrever
+    assinaturas = {} if memoria_mb else _assinaturas(a_ler)
+    lidos = [] if memoria_mb else _ler_varios(a_ler, sufixo, workers)
+    if memoria_mb:
+        # Só o cabeçalho: os blocos são lidos depois, na hora de escrever
+        diferentes = any(_colunas_arquivo(p) not in (None, colunas) for p in a_ler)
+    else:
+        diferentes = any(df.columns.tolist() != colunas for _, df in lidos)
+    if diferentes:
+        print(f"Colunas diferentes do manifesto em {saida}, refazendo consolidação completa.")
+        return consolidacao_completa(base_path, sufixo, saida, formato, workers, memoria_mb)
+
+    arquivos = [entrada for entrada in manifesto["arquivos"] if entrada["caminho"] in mantidos]
+
+    if formato == "parquet":
+        # Apaga as partes de arquivos alterados ou removidos e grava as novas
+        for entrada in manifesto["arquivos"]:
+            if entrada["caminho"] not in mantidos:
+                armazenamento.remover_parte(saida, entrada["parte"])
+        if memoria_mb:
+            _escrever_em_blocos(base_path, sufixo, saida, formato, a_ler, memoria_mb, arquivos, colunas)
+        _gravar_partes(base_path, saida, lidos, arquivos, assinaturas)
+        salvar_manifesto(saida, colunas, arquivos, formato)
+        if verboso:
+            print(f"{len(a_ler)} arquivo(s) novo(s) ou alterado(s) em {saida}.")
+        return None
+
+    if houve_remocao:
+        # Reescreve a saída copiando apenas os blocos de linhas dos arquivos mantidos
+        saida_tmp = saida + ".tmp"
+        with open(saida, "rb") as origem, open(saida_tmp, "wb") as destino:
+            destino.write(origem.readline())  # Cabeçalho
+            for entrada in manifesto["arquivos"]:
+                manter = entrada["caminho"] in mantidos
+                for _ in range(entrada["linhas"]):
+                    linha = origem.readline()
+                    if manter:
+                        destino.write(linha)
+        os.replace(saida_tmp, saida)
+
+    # Arquivos novos ou alterados entram no final da saída
+    if memoria_mb:
+        _escrever_em_blocos(base_path, sufixo, saida, formato, a_ler, memoria_mb, arquivos, colunas)
+    else:
+        with open(saida, "a", newline="", encoding="utf-8") as destino:
+            for file_path, df in lidos:
+                df.to_csv(destino, header=False, index=False)
+                arquivos.append(_entrada(base_path, file_path, len(df), assinaturas.get(file_path)))
+
+    salvar_manifesto(saida, colunas, arquivos)
+    if verboso:
+        print(f"{len(a_ler)} arquivo(s) novo(s) ou alterado(s) em {saida}.")
+    return None
+
+
+def consolidar(base_path, sufixo, saida, incremental=False, formato="csv", workers=1, memoria_mb=None,
+               verboso=True):
+    # memoria_mb: lê e escreve cada arquivo em blocos que cabem nesse orçamento (ignora workers)
+    if incremental:
+        return consolidacao_incremental(base_path, sufixo, saida, formato, workers, memoria_mb, verboso)
+    return consolidacao_completa(base_path, sufixo, saida, formato, workers, memoria_mb)
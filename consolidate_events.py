@@ -1,69 +1,298 @@
-import os
-import json
-import pandas as pd
-
-# Função que carrega os eventos a partir dos arquivos JSON dentro da pasta fornecida
-def carregar_eventos(pasta_raiz):
-    registros = []  # Lista onde vamos guardar todos os dados coletados dos arquivos
-
-    # Percorre todas as pastas e subpastas dentro da pasta raiz
-    for root, _, files in os.walk(pasta_raiz):
-        for file in files:
-            # Verifica se o arquivo termina com ".json" (ou seja, se é um arquivo JSON)
-            if file.lower().endswith(".json"):
-                caminho_json = os.path.join(root, file)  # Junta o caminho da pasta atual com o nome do arquivo
-
-                try:
-                    # Abre o arquivo JSON com codificação UTF-8
-                    with open(caminho_json, encoding='utf-8') as f:
-                        dados = json.load(f)  # Lê os dados do arquivo e transforma em um dicionário Python
-                except Exception as e:
-                    # Se der erro ao abrir ou ler o JSON, mostra a mensagem e pula para o próximo arquivo
-                    print(f"[ERRO] Não foi possível abrir {file}: {e}")
-                    continue
-
-                # Verifica se o arquivo contém a chave "eventFiles"
-                if "eventFiles" not in dados:
-                    print(f"[AVISO] Ignorando JSON sem 'eventFiles': {file}")
-                    continue  # Pula esse arquivo se não tiver a chave esperada
-
-                evento_id = file.replace(".json", "")  # Usa o nome do arquivo (sem ".json") como identificador do evento
-
-                # Percorre cada estação presente no JSON
-                for estacao_id, estacao_data in dados["eventFiles"].items():
-                    # Pega o nome do gravador, ou "Desconhecida" se não existir
-                    nome = estacao_data.get("recorderName", "Desconhecida")
-                    
-                    # Pega o timestamp de início do gatilho (trigger), ou None se não existir
-                    trigger_ts = estacao_data.get("triggerStart", None)
-                    
-                    # Pega os dados dos canais (se existirem). df = dados físicos, cf = canais físicos
-                    amostras = estacao_data.get("df", {}).get("cf", [])
-
-                    # Para cada canal, coleta os dados de interesse
-                    for canal in amostras:
-                        registros.append({
-                            "evento": evento_id,                # Nome do arquivo = ID do evento
-                            "estacao": nome,                    # Nome da estação (gravador)
-                            "direcao": canal["chName"],         # Direção do canal (ex: T, R, V)
-                            "peak": canal["peak"],              # Valor de pico da onda
-                            "rms": canal["rms"],                # Valor RMS (média quadrática)
-                            "valor": canal["value"],            # Valor geral da medição
-                            "trigger": trigger_ts               # Momento em que o evento foi detectado
-                        })
-
-    # Converte a lista de dicionários para um DataFrame do pandas
-    df = pd.DataFrame(registros)
-
-    return df  # Retorna o DataFrame com todos os dados processados
-
-# Roda a função se o script for executado diretamente
-if __name__ == "__main__":
-    # Caminho da pasta contendo os arquivos de eventos
-    caminho = r"C:\Users\mathe\Desktop\Estágio\Final\events\2025\2025"
-
-    # Executa a função e armazena o resultado no DataFrame df
-    df = carregar_eventos(caminho)
-
-    # Exibe as primeiras linhas do DataFrame resultante
-    print(df.head())  # Você pode trocar para df.info(), df.shape, etc., se quiser visualizar de outras formas
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from ingestao import processar_arquivos
+
+# Backends opcionais para o modo streaming: ijson lê o JSON por partes
+# (uma estação por vez); orjson acelera o parse quando o arquivo é lido inteiro
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Lê um único arquivo JSON de evento e devolve a lista de registros por canal
+# (ou None se o arquivo não tiver a chave "eventFiles").
+# Com incluir_serial=True cada registro leva também o código do gravador (chave em "eventFiles").
+# Com incluir_picos=True devolve (registros, picos): picos são os picos espectrais que o
+# gravador já calculou (dfFft.peak), um registro por estação/canal/pico.
+def ler_registros_evento(caminho_json, incluir_serial=False, incluir_picos=False):
+    # Abre o arquivo JSON com codificação UTF-8
+    with open(caminho_json, encoding='utf-8') as f:
+        dados = json.load(f)  # Lê os dados do arquivo e transforma em um dicionário Python
+
+    # Verifica se o arquivo contém a chave "eventFiles"
+    if "eventFiles" not in dados:
+        return None
+
+    file = os.path.basename(caminho_json)
+    evento_id = file.replace(".json", "")  # Usa o nome do arquivo (sem ".json") como identificador do evento
+
+    registros = []
+    picos = []
+    # Percorre cada estação presente no JSON
+    for estacao_id, estacao_data in dados["eventFiles"].items():
+        # Pega o nome do gravador, ou "Desconhecida" se não existir
+        nome = estacao_data.get("recorderName", "Desconhecida")
+
+        # Pega o timestamp de início do gatilho (trigger), ou None se não existir
+        trigger_ts = estacao_data.get("triggerStart", None)
+
+        # Pega os dados dos canais (se existirem). df = dados físicos, cf = canais físicos
+        amostras = estacao_data.get("df", {}).get("cf", [])
+
+        # Para cada canal, coleta os dados de interesse
+        for canal in amostras:
+            registros.append({
+                "evento": evento_id,                # Nome do arquivo = ID do evento
+                "estacao": nome,                    # Nome da estação (gravador)
+                "direcao": canal["chName"],         # Direção do canal (ex: T, R, V)
+                "peak": canal["peak"],              # Valor de pico da onda
+                "rms": canal["rms"],                # Valor RMS (média quadrática)
+                "valor": canal["value"],            # Valor geral da medição
+                "trigger": trigger_ts               # Momento em que o evento foi detectado
+            })
+            if incluir_serial:
+                registros[-1]["serial"] = estacao_id
+
+        if incluir_picos:
+            for canal in estacao_data.get("dfFft", {}).get("peak", []):
+                for pico in canal.get("value", []):
+                    picos.append({
+                        "evento": evento_id,
+                        "estacao": nome,
+                        "serial": estacao_id,
+                        "direcao": canal["chName"],
+                        "frequencia": pico["freq"],
+                        "amplitude": pico["ampl"]
+                    })
+
+    if incluir_picos:
+        return registros, picos
+    return registros
+
+# Lista os arquivos JSON dentro da pasta raiz e de todas as subpastas
+def listar_jsons(pasta_raiz):
+    caminhos = []
+    for root, _, files in os.walk(pasta_raiz):
+        for file in files:
+            # Verifica se o arquivo termina com ".json" (ou seja, se é um arquivo JSON)
+            if file.lower().endswith(".json"):
+                caminhos.append(os.path.join(root, file))  # Junta o caminho da pasta atual com o nome do arquivo
+    return caminhos
+
+# Função que carrega os eventos a partir dos arquivos JSON dentro da pasta fornecida.
+# Com workers > 1 os arquivos são lidos em paralelo, mantendo a ordem do resultado.
+def carregar_eventos(pasta_raiz, workers=1):
+    lidos = processar_arquivos(
+        listar_jsons(pasta_raiz),
+        ler_registros_evento,
+        workers=workers,
+        # Se der erro ao abrir ou ler o JSON, mostra a mensagem e pula para o próximo arquivo
+        mensagem_erro=lambda caminho, e: f"[ERRO] Não foi possível abrir {os.path.basename(caminho)}: {e}"
+    )
+
+    registros = []  # Lista onde vamos guardar todos os dados coletados dos arquivos
+    for caminho_json, registros_arquivo in lidos:
+        if registros_arquivo is None:
+            print(f"[AVISO] Ignorando JSON sem 'eventFiles': {os.path.basename(caminho_json)}")
+            continue  # Pula esse arquivo se não tiver a chave esperada
+        registros.extend(registros_arquivo)
+
+    # Converte a lista de dicionários para um DataFrame do pandas
+    df = compactar_eventos(pd.DataFrame(registros))
+
+    return df  # Retorna o DataFrame com todos os dados processados
+
+# Colunas de texto repetidas em todo canal: guardadas como categoria (código inteiro + tabela)
+COLUNAS_CATEGORICAS = ["evento", "estacao", "direcao", "serial", "arquivo"]
+
+# Converte os textos de uma tabela de categorias em datas, parseando cada valor distinto uma vez só
+def datas_de_categorias(codigos, categorias):
+    datas = pd.to_datetime(pd.Index(categorias, dtype=object), errors="coerce", format="ISO8601").to_numpy(dtype="datetime64[ns]")
+    resultado = np.full(len(codigos), np.datetime64("NaT"), dtype="datetime64[ns]")
+    validos = codigos >= 0
+    resultado[validos] = datas[codigos[validos]]
+    return resultado
+
+# evento/estacao/direcao (e serial/arquivo, se existirem) como categoria e trigger como datetime64.
+# Filtros e groupby passam a comparar inteiros em vez de strings.
+def compactar_eventos(df):
+    df = df.copy()
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype("category")
+    if "trigger" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["trigger"]):
+        trigger = df["trigger"].astype("category")
+        df["trigger"] = datas_de_categorias(trigger.cat.codes.to_numpy(), trigger.cat.categories)
+    return df
+
+# Colunas do DataFrame de eventos montadas direto em arrays, sem um dict por canal.
+# evento/estacao/direcao viram códigos inteiros + tabela de categorias, trigger
+# vira datetime64 (cada texto distinto é convertido uma vez);
+# peak/rms/valor ficam em float64. A capacidade dobra quando enche.
+class ColunasCanais:
+    CATEGORICAS = ["evento", "estacao", "direcao", "trigger"]
+    NUMERICAS = ["peak", "rms", "valor"]
+
+    def __init__(self, capacidade=1024):
+        self.tamanho = 0
+        self.codigos = {coluna: np.empty(capacidade, dtype=np.int32) for coluna in self.CATEGORICAS}
+        self.valores = {coluna: np.empty(capacidade, dtype=np.float64) for coluna in self.NUMERICAS}
+        self.categorias = {coluna: {} for coluna in self.CATEGORICAS}
+
+    def _codigo(self, coluna, valor):
+        if valor is None:
+            return -1  # Vira NaN na categoria
+        categorias = self.categorias[coluna]
+        codigo = categorias.get(valor)
+        if codigo is None:
+            codigo = categorias[valor] = len(categorias)
+        return codigo
+
+    def _crescer(self):
+        for arrays in (self.codigos, self.valores):
+            for coluna, array in arrays.items():
+                novo = np.empty(len(array) * 2, dtype=array.dtype)
+                novo[:self.tamanho] = array[:self.tamanho]
+                arrays[coluna] = novo
+
+    def adicionar_estacao(self, evento_id, estacao_data):
+        # Mesmos campos de ler_registros_evento
+        nome = estacao_data.get("recorderName", "Desconhecida")
+        trigger_ts = estacao_data.get("triggerStart", None)
+        cod_evento = self._codigo("evento", evento_id)
+        cod_estacao = self._codigo("estacao", nome)
+        cod_trigger = self._codigo("trigger", trigger_ts)
+
+        for canal in estacao_data.get("df", {}).get("cf", []):
+            if self.tamanho == len(self.codigos["evento"]):
+                self._crescer()
+            i = self.tamanho
+            self.codigos["evento"][i] = cod_evento
+            self.codigos["estacao"][i] = cod_estacao
+            self.codigos["direcao"][i] = self._codigo("direcao", canal["chName"])
+            self.codigos["trigger"][i] = cod_trigger
+            self.valores["peak"][i] = canal["peak"]
+            self.valores["rms"][i] = canal["rms"]
+            self.valores["valor"][i] = canal["value"]
+            self.tamanho += 1
+
+    def marca(self):
+        # Ponto de retorno para desfazer_ate: linhas e categorias que existem agora
+        return self.tamanho, {coluna: len(categorias) for coluna, categorias in self.categorias.items()}
+
+    def desfazer_ate(self, marca):
+        # Descarta as linhas de um arquivo que falhou no meio da leitura, e as categorias
+        # que só ele trouxe (o dict guarda a ordem de inserção: as novas estão no fim)
+        self.tamanho, tamanhos = marca
+        for coluna, categorias in self.categorias.items():
+            while len(categorias) > tamanhos[coluna]:
+                categorias.popitem()
+
+    def para_dataframe(self):
+        n = self.tamanho
+        colunas = {}
+        for coluna in ["evento", "estacao", "direcao", "peak", "rms", "valor", "trigger"]:
+            if coluna == "trigger":
+                colunas[coluna] = datas_de_categorias(self.codigos[coluna][:n], list(self.categorias[coluna]))
+            elif coluna in self.codigos:
+                # Categorias em ordem alfabética, como o astype("category") de carregar_eventos
+                categorias = list(self.categorias[coluna])
+                colunas[coluna] = pd.Categorical.from_codes(
+                    self.codigos[coluna][:n], categories=categorias
+                ).reorder_categories(sorted(categorias))
+            else:
+                colunas[coluna] = self.valores[coluna][:n]
+        return pd.DataFrame(colunas)
+
+# Percorre as estações de um JSON sem montar o dicionário inteiro quando o ijson existe.
+# Sem o ijson o arquivo é lido inteiro (orjson ou json) e estado["eventFiles"] diz se a
+# chave existia, para quem chama não precisar ler o arquivo de novo.
+def _estacoes_do_json(caminho_json, estado=None):
+    if ijson is not None:
+        with open(caminho_json, "rb") as f:
+            # use_float devolve float em vez de Decimal
+            yield from ijson.kvitems(f, "eventFiles", use_float=True)
+        return
+
+    with open(caminho_json, "rb") as f:
+        conteudo = f.read()
+    lido = orjson.loads(conteudo) if orjson is not None else json.loads(conteudo.decode("utf-8"))
+    if estado is not None:
+        estado["eventFiles"] = "eventFiles" in lido
+    if "eventFiles" not in lido:
+        return
+    yield from lido["eventFiles"].items()
+
+def _tem_event_files(caminho_json):
+    # Só as chaves do primeiro nível, parando na "eventFiles": o kvitems não diferencia
+    # "eventFiles" vazio de ausente, e isso só é perguntado de JSONs sem estação nenhuma
+    try:
+        with open(caminho_json, "rb") as f:
+            for prefixo, tipo, valor in ijson.parse(f):
+                if prefixo == "" and tipo == "map_key" and valor == "eventFiles":
+                    return True
+    except Exception:
+        pass
+    return False
+
+# Versão streaming de carregar_eventos: as linhas de cada canal vão direto para
+# arrays preenchidos aos poucos, então o pico de memória fica perto do tamanho do resultado.
+# Só é streaming de verdade com o ijson; sem ele cada JSON é lido inteiro (um por vez).
+def carregar_eventos_streaming(pasta_raiz):
+    if ijson is None:
+        print("[AVISO] ijson não instalado: cada JSON será lido inteiro, sem streaming")
+    caminhos = listar_jsons(pasta_raiz)
+    # Estimativa inicial: 6 estações x 3 canais por evento
+    colunas = ColunasCanais(capacidade=max(1024, len(caminhos) * 18))
+
+    for caminho_json in caminhos:
+        file = os.path.basename(caminho_json)
+        evento_id = file.replace(".json", "")
+        marca = colunas.marca()
+        estado = {}
+        encontrou = False
+        try:
+            for _, estacao_data in _estacoes_do_json(caminho_json, estado):
+                encontrou = True
+                colunas.adicionar_estacao(evento_id, estacao_data)
+        except Exception as e:
+            colunas.desfazer_ate(marca)
+            print(f"[ERRO] Não foi possível abrir {file}: {e}")
+            continue
+
+        # Sem nenhuma estação: só avisa se a chave não existe, como carregar_eventos
+        if not encontrou:
+            tem_chave = estado["eventFiles"] if ijson is None else _tem_event_files(caminho_json)
+            if not tem_chave:
+                print(f"[AVISO] Ignorando JSON sem 'eventFiles': {file}")
+
+    return colunas.para_dataframe()
+
+# Roda a função se o script for executado diretamente
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carrega os eventos a partir dos arquivos JSON")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Número de processos para ler os arquivos em paralelo")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Lê os JSONs por partes direto em colunas (menos memória, um processo só; precisa do ijson)")
+    args = parser.parse_args()
+
+    # Caminho da pasta contendo os arquivos de eventos
+    caminho = r"C:\Users\mathe\Desktop\Estágio\Final\events\2025\2025"
+
+    # Executa a função e armazena o resultado no DataFrame df
+    if args.streaming:
+        df = carregar_eventos_streaming(caminho)
+    else:
+        df = carregar_eventos(caminho, workers=args.workers)
+
+    # Exibe as primeiras linhas do DataFrame resultante
+    print(df.head())  # Você pode trocar para df.info(), df.shape, etc., se quiser visualizar de outras formas
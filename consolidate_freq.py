@@ -1,43 +1,23 @@
-import os
-import pandas as pd
-
-# Caminho base onde estão os arquivos
-base_path = "events"
-
-# Lista para guardar todos os DataFrames
-dfs = []
-
-# Varre os diretórios recursivamente
-for root, dirs, files in os.walk(base_path):
-    for file in files:
-        if file.endswith("_freq.csv"):
-            file_path = os.path.join(root, file)
-
-            try:
-                # Lê o CSV
-                df = pd.read_csv(file_path)
-
-                # Extrai nome do evento e estação do nome do arquivo
-                nome_arquivo = os.path.basename(file)
-                partes = nome_arquivo.split("_")
-                nome_evento = partes[0]  # Ex: 12h03m42s
-                estacao = partes[1].replace("_freq.csv", "")  # Ex: 20160003
-
-                # Adiciona colunas extras
-                df["evento"] = nome_evento
-                df["estacao"] = estacao
-
-                # Guarda no conjunto de dataframes
-                dfs.append(df)
-            except Exception as e:
-                print(f"Erro ao processar {file_path}: {e}")
-
-# Junta tudo em um único DataFrame
-if dfs:
-    df_geral_freq = pd.concat(dfs, ignore_index=True)
-    #print(f"Total de linhas consolidadas: {len(df_geral_freq)}")
-
-    # Salvar como CSV, se quiser
-    df_geral_freq.to_csv("freq_consolidado.csv", index=False)
-else:
-    print("Nenhum arquivo '_freq.csv' encontrado.")
+import argparse
+from consolidacao import consolidar, formato_padrao
+
+# Caminho base onde estão os arquivos
+base_path = "events"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consolida os arquivos '_freq.csv' em freq_consolidado")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Lê apenas arquivos novos ou alterados, usando o manifesto ao lado da saída")
+    parser.add_argument("--formato", choices=["parquet", "csv"], default=formato_padrao(),
+                        help="parquet grava a pasta particionada por evento/estação; csv grava o arquivo único")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Número de processos para ler os arquivos em paralelo")
+    parser.add_argument("--memoria-mb", type=int, default=None,
+                        help="Lê cada arquivo em blocos que cabem nesse orçamento de memória (MB)")
+    args = parser.parse_args()
+
+    saida = "freq_consolidado" if args.formato == "parquet" else "freq_consolidado.csv"
+
+    df_geral_freq = consolidar(base_path, "_freq.csv", saida, incremental=args.incremental,
+                               formato=args.formato, workers=args.workers,
+                               memoria_mb=args.memoria_mb)
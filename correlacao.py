@@ -0,0 +1,249 @@
+import os
+import time
+import pickle
+import hashlib
+import argparse
+from datetime import timedelta
+from functools import partial
+import numpy as np
+import pandas as pd
+import dados
+from amostras import LeitorAmostras, ler_evento, assinatura_evento, store_amostras_disponivel, COLUNAS_AMOSTRAS
+from ingestao import processar_arquivos
+
+# Correlação cruzada entre as estações de um evento e atraso de chegada da
+# onda em cada uma, para separar Evento Local de Evento Global pela
+# propagação e não só por quantas estações passaram do limiar.
+#
+# Para um evento, as séries de todas as estações e canais vão para uma
+# matriz (estações x canais x amostras) e a correlação de todos os pares sai
+# de uma rfft só: X_i * conj(X_j) para os pares i < j e uma irfft em lote.
+# O atraso de cada par é o máximo da correlação normalizada dentro de
+# ±max_atraso (com interpolação parabólica abaixo de uma amostra), corrigido
+# pela diferença entre os startEvent das estações. Os atrasos dos pares viram
+# um tempo de chegada por estação por mínimos quadrados, ponderados pela
+# correlação.
+#
+# correlacoes_periodo() processa todos os eventos de um período em paralelo
+# (ingestao.processar_arquivos) e guarda o resultado de cada evento em
+# <base_path>/correlacoes, indexado pelo evento e pelos parâmetros e
+# validado pelas assinaturas (tamanho, mtime) do JSON e dos _data.csv do
+# evento: rodar de novo só calcula os eventos novos ou alterados, inclusive
+# os que ganharam ou trocaram amostras depois do primeiro cálculo.
+
+VERSAO_CORRELACAO = 1
+CANAIS = COLUNAS_AMOSTRAS[1:]  # T, R, V
+MAX_ATRASO = 2.0  # segundos: maior atraso procurado entre duas estações
+TODOS = "todos"   # canal das linhas que combinam os três canais
+
+COLUNAS_PARES = ["estacao_a", "estacao_b", "serial_a", "serial_b", "canal", "atraso", "correlacao"]
+COLUNAS_CHEGADAS = ["estacao", "serial", "chegada"]
+
+
+def _matriz_estacoes(estacoes):
+    # (estações, canais, amostras) numa taxa comum, sem a média, e o startEvent (s) de cada estação
+    taxas = []
+    for estacao in estacoes:
+        taxa = estacao["taxa"]
+        if not taxa:
+            tempo = estacao["amostras"][0]
+            taxa = 1.0 / float(np.median(np.diff(tempo))) if len(tempo) > 1 else 1.0
+        taxas.append(taxa)
+    taxa = max(taxas)
+
+    series = []
+    for estacao, taxa_estacao in zip(estacoes, taxas):
+        canais = estacao["amostras"][1:].astype(np.float64)
+        if taxa_estacao != taxa:
+            # Gravadores com taxas diferentes: interpola para a maior
+            n = int(canais.shape[1] * taxa / taxa_estacao)
+            tempo = np.arange(canais.shape[1]) / taxa_estacao
+            novo = np.arange(n) / taxa
+            canais = np.stack([np.interp(novo, tempo, canal) for canal in canais])
+        series.append(canais - canais.mean(axis=1, keepdims=True))
+
+    n = max(serie.shape[1] for serie in series)
+    matriz = np.zeros((len(series), len(CANAIS), n))
+    for i, serie in enumerate(series):
+        matriz[i, :, :serie.shape[1]] = serie
+    inicio = min(estacao["inicio"] for estacao in estacoes)
+    inicios = np.array([(estacao["inicio"] - inicio).total_seconds() for estacao in estacoes])
+    return matriz, taxa, inicios
+
+
+def correlacionar(matriz, taxa, inicios=None, max_atraso=MAX_ATRASO):
+    # matriz: (S, C, N) sem média; devolve (i, j, atrasos (P, C+1), correlacoes (P, C+1)) para os
+    # pares i < j. A última coluna combina os canais (média das correlações normalizadas).
+    # atraso > 0: a onda chega em i depois de j.
+    n_estacoes, _, n = matriz.shape
+    i, j = np.triu_indices(n_estacoes, 1)
+    if len(i) == 0:
+        return i, j, np.empty((0, matriz.shape[1] + 1)), np.empty((0, matriz.shape[1] + 1))
+
+    # Tamanho potência de 2 >= 2N-1: correlação linear, sem dar a volta
+    n_fft = 1 << (2 * n - 2).bit_length()
+    espectros = np.fft.rfft(matriz, n_fft, axis=-1)
+    correlacoes = np.fft.irfft(espectros[i] * np.conj(espectros[j]), n_fft, axis=-1)
+
+    energia = np.sqrt(np.einsum("scn,scn->sc", matriz, matriz))
+    norma = energia[i] * energia[j]
+    correlacoes /= np.where(norma > 0, norma, np.inf)[..., None]
+
+    # Só os atrasos -K..K (índices negativos estão no fim da irfft)
+    k = max(1, min(int(round(max_atraso * taxa)), n - 1))
+    janela = np.concatenate([correlacoes[..., n_fft - k:], correlacoes[..., :k + 1]], axis=-1)
+    janela = np.concatenate([janela, janela.mean(axis=1, keepdims=True)], axis=1)
+
+    melhor = np.argmax(janela, axis=-1)
+    pico = np.take_along_axis(janela, melhor[..., None], axis=-1)[..., 0]
+    # Interpolação parabólica em torno do máximo (não nas bordas da janela)
+    interno = (melhor > 0) & (melhor < 2 * k)
+    anterior = np.take_along_axis(janela, np.clip(melhor - 1, 0, 2 * k)[..., None], axis=-1)[..., 0]
+    seguinte = np.take_along_axis(janela, np.clip(melhor + 1, 0, 2 * k)[..., None], axis=-1)[..., 0]
+    curvatura = anterior - 2 * pico + seguinte
+    fracao = np.where(interno & (curvatura < 0), 0.5 * (anterior - seguinte) / np.where(curvatura < 0, curvatura, -1.0), 0.0)
+
+    atrasos = (melhor - k + fracao) / taxa
+    if inicios is not None:
+        atrasos += (inicios[i] - inicios[j])[:, None]
+    return i, j, atrasos, pico
+
+
+def tempos_chegada(n_estacoes, i, j, atrasos, pesos):
+    # t_i - t_j = atraso por mínimos quadrados ponderados; devolve os tempos relativos à primeira chegada
+    if n_estacoes == 0:
+        return np.empty(0)
+    pesos = np.sqrt(np.clip(pesos, 0.0, None))
+    a = np.zeros((len(i) + 1, n_estacoes))
+    a[np.arange(len(i)), i] = pesos
+    a[np.arange(len(i)), j] = -pesos
+    a[-1] = 1.0  # Fixa a média em zero (a solução só é definida a menos de uma constante)
+    b = np.append(atrasos * pesos, 0.0)
+    tempos = np.linalg.lstsq(a, b, rcond=None)[0]
+    return tempos - tempos.min()
+
+
+def correlacionar_evento(caminho_json, leitor=None, max_atraso=MAX_ATRASO):
+    # Pares (todas as combinações de estações, por canal e combinados) e chegadas de um evento
+    evento = os.path.basename(caminho_json).replace(".json", "")
+    estacoes = [e for e in ler_evento(caminho_json, leitor) if e["amostras"].shape[1] > 1]
+    if not estacoes:
+        return {"evento": evento, "pares": pd.DataFrame(columns=COLUNAS_PARES),
+                "chegadas": pd.DataFrame(columns=COLUNAS_CHEGADAS)}
+
+    matriz, taxa, inicios = _matriz_estacoes(estacoes)
+    i, j, atrasos, correlacoes = correlacionar(matriz, taxa, inicios, max_atraso)
+
+    nomes = np.array([e["estacao"] for e in estacoes])
+    seriais = np.array([e["serial"] for e in estacoes])
+    canais = CANAIS + [TODOS]
+    pares = pd.DataFrame({
+        "estacao_a": np.repeat(nomes[i], len(canais)),
+        "estacao_b": np.repeat(nomes[j], len(canais)),
+        "serial_a": np.repeat(seriais[i], len(canais)),
+        "serial_b": np.repeat(seriais[j], len(canais)),
+        "canal": np.tile(canais, len(i)),
+        "atraso": atrasos.ravel(),
+        "correlacao": correlacoes.ravel(),
+    })
+    chegadas = pd.DataFrame({
+        "estacao": nomes,
+        "serial": seriais,
+        "chegada": tempos_chegada(len(estacoes), i, j, atrasos[:, -1], correlacoes[:, -1]),
+    }).sort_values("chegada", kind="stable", ignore_index=True)
+    return {"evento": evento, "pares": pares, "chegadas": chegadas}
+
+
+_leitores = {}  # pasta do store -> LeitorAmostras deste processo
+
+
+def _correlacionar_em_cache(caminho_json, pasta_cache, pasta_amostras=None, max_atraso=MAX_ATRASO):
+    # Roda nos processos do pool: devolve o resultado guardado ou calcula e guarda
+    chave = repr((VERSAO_CORRELACAO, os.path.abspath(caminho_json), max_atraso))
+    arquivo = os.path.join(pasta_cache, hashlib.sha1(chave.encode("utf-8")).hexdigest()[:20] + ".pkl")
+    sig = assinatura_evento(caminho_json)
+    try:
+        with open(arquivo, "rb") as f:
+            salvo = pickle.load(f)
+        if salvo["assinatura"] == sig:
+            return salvo["resultado"]
+    except (OSError, EOFError, KeyError, pickle.UnpicklingError):
+        pass
+
+    leitor = None
+    if pasta_amostras:
+        leitor = _leitores.get(pasta_amostras)
+        if leitor is None:
+            leitor = _leitores[pasta_amostras] = LeitorAmostras(pasta_amostras)
+    resultado = correlacionar_evento(caminho_json, leitor, max_atraso)
+
+    # JSON ou amostras alterados gravam por cima do resultado antigo do mesmo evento
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, "wb") as f:
+            pickle.dump({"assinatura": sig, "resultado": resultado}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, arquivo)
+    except OSError as e:
+        print(f"Erro ao gravar correlação em {pasta_cache}: {e}")
+    return resultado
+
+
+def pasta_cache():
+    return os.path.join(dados.base_path, "correlacoes")
+
+
+def correlacoes_periodo(data_inicio=None, data_fim=None, workers=1, max_atraso=MAX_ATRASO):
+    # Correlações de todos os eventos com o primeiro disparo no período (data_fim inclusiva).
+    # Devolve (pares, chegadas), cada um com a coluna evento.
+    indice = dados.indice()
+    inicio = None if data_inicio is None else pd.to_datetime(data_inicio)
+    fim = None if data_fim is None else pd.to_datetime(data_fim) + timedelta(days=1)
+    eventos = set(indice.resumo(inicio, fim).index)
+    estacoes = indice.estacoes()
+    arquivos = estacoes.loc[estacoes["evento"].isin(eventos), "arquivo"].astype(str).unique()
+    caminhos = [os.path.join(indice.pasta, rel) for rel in sorted(arquivos)]
+
+    os.makedirs(pasta_cache(), exist_ok=True)
+    amostras = dados.pasta_amostras() if store_amostras_disponivel(dados.pasta_amostras()) else None
+    lidos = processar_arquivos(
+        caminhos,
+        partial(_correlacionar_em_cache, pasta_cache=pasta_cache(), pasta_amostras=amostras, max_atraso=max_atraso),
+        workers=workers,
+        mensagem_erro=lambda caminho, e: f"Erro ao correlacionar {os.path.basename(caminho)}: {e}",
+    )
+
+    pares = [r["pares"].assign(evento=r["evento"]) for _, r in lidos if not r["pares"].empty]
+    chegadas = [r["chegadas"].assign(evento=r["evento"]) for _, r in lidos if not r["chegadas"].empty]
+    pares = pd.concat(pares, ignore_index=True) if pares else pd.DataFrame(columns=COLUNAS_PARES + ["evento"])
+    chegadas = pd.concat(chegadas, ignore_index=True) if chegadas else pd.DataFrame(columns=COLUNAS_CHEGADAS + ["evento"])
+    return pares, chegadas
+
+
+def correlacao_evento(evento, max_atraso=MAX_ATRASO):
+    # Resultado de um evento só (mesmo cache do lote), ou None se o evento não está no índice
+    caminho = dados.caminho_evento(evento)
+    if caminho is None:
+        return None
+    os.makedirs(pasta_cache(), exist_ok=True)
+    amostras = dados.pasta_amostras() if store_amostras_disponivel(dados.pasta_amostras()) else None
+    return _correlacionar_em_cache(caminho, pasta_cache(), amostras, max_atraso)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Correlação entre estações e tempos de chegada dos eventos de um período")
+    parser.add_argument("--inicio", default=None, help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument("--fim", default=None, help="Data final, inclusiva (AAAA-MM-DD)")
+    parser.add_argument("--max-atraso", type=float, default=MAX_ATRASO, help="Maior atraso procurado, em segundos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--saida", default="correlacoes", help="Prefixo dos CSVs gerados (_pares.csv e _chegadas.csv)")
+    parser.add_argument("--base", default=dados.base_path, help="Pasta com events/ e os consolidados")
+    args = parser.parse_args()
+
+    dados.configurar(args.base)
+    inicio = time.perf_counter()
+    pares, chegadas = correlacoes_periodo(args.inicio, args.fim, workers=args.workers, max_atraso=args.max_atraso)
+    duracao = time.perf_counter() - inicio
+    pares.to_csv(args.saida + "_pares.csv", index=False)
+    chegadas.to_csv(args.saida + "_chegadas.csv", index=False)
+    n_eventos = chegadas["evento"].nunique()
+    print(f"{n_eventos} evento(s) em {duracao:.1f} s ({n_eventos / duracao if duracao > 0 else 0:.2f} eventos/s)")
@@ -0,0 +1,271 @@
+import os
+import time
+import atexit
+import threading
+import cache
+import indice_eventos
+import armazenamento
+from armazenamento import ler_consolidado
+from amostras import LeitorAmostras, atualizar_amostras, store_amostras_disponivel
+from consolidacao import consolidar, caminho_manifesto
+
+# Camada de acesso aos dados do app. Nada é lido na importação: cada conjunto
+# é carregado no primeiro uso (ou por aquecer(), numa thread em segundo plano)
+# e fica guardado. O tempo de cada carga vai para `tempos`, usado no
+# relatório de inicialização do main.py.
+#
+# iniciar_monitoramento() liga uma thread que procura arquivos novos em
+# events/ de tempos em tempos e troca os conjuntos em memória. Só um processo
+# por pasta base (o dono de <base_path>/monitoramento.lock) varre a pasta e
+# grava o índice, os consolidados e o store de amostras; os outros workers só
+# recarregam o índice salvo por ele quando o arquivo muda.
+#
+# Os consolidados nunca ficam inteiros em memória: espectro() e serie() leem
+# do store Parquet só as partições do evento pedido, então vários workers do
+# gunicorn não multiplicam a memória. Com configurar(..., compartilhado=True)
+# os caches de resultados vão para <base_path>/cache, visíveis a todos os workers.
+
+# Pasta com os consolidados e a pasta events/
+base_path = r'C:\Users\mathe\Desktop\Estágio\Final'
+
+compartilhado = False
+tempos = {}  # nome do conjunto -> segundos gastos na primeira carga
+_dados = {}
+_lock = threading.RLock()
+_leitor_amostras = None
+_manifestos = {}   # nome do consolidado -> mtime do manifesto da última olhada
+_monitor = None    # (pid, Event) da thread de monitoramento deste processo
+
+VALIDADE_LOCK_MONITOR = 120.0  # segundos sem renovar: o dono do lock morreu e outro assume
+
+
+def pasta_eventos():
+    return os.path.join(base_path, "events", "2025", "2025")
+
+
+def pasta_amostras():
+    return os.path.join(base_path, "amostras")
+
+
+def configurar(caminho_base, compartilhado_entre_processos=False):
+    # Troca a pasta base e descarta o que já estava carregado
+    global base_path, compartilhado, _leitor_amostras
+    with _lock:
+        base_path = caminho_base
+        compartilhado = compartilhado_entre_processos
+        _leitor_amostras = None
+        _dados.clear()
+        tempos.clear()
+        indice_eventos.definir_padrao(pasta_eventos(), os.path.join(base_path, "indice_eventos.pkl"))
+        cache.configurar_backend(os.path.join(base_path, "cache") if compartilhado else None)
+        if compartilhado:
+            # Sem o store Parquet cada worker guarda a própria cópia do CSV inteiro
+            for nome in ("freq_consolidado", "data_consolidado"):
+                destino = os.path.join(base_path, nome)
+                if not armazenamento.store_disponivel(destino) and os.path.exists(destino + ".csv"):
+                    print(f"[AVISO] {nome} está só em CSV: cada worker vai ler o arquivo inteiro para a memória. "
+                          f"Gere o store com --formato parquet.")
+
+
+def _carregar(nome, funcao, padrao):
+    if nome in _dados:
+        return _dados[nome]
+    with _lock:
+        if nome not in _dados:
+            inicio = time.perf_counter()
+            try:
+                _dados[nome] = funcao()
+            except Exception as error:
+                print(f"Erro ao carregar {nome}: {error}")
+                _dados[nome] = padrao()
+            tempos[nome] = time.perf_counter() - inicio
+    return _dados[nome]
+
+
+def indice():
+    # O índice é criado uma vez (tempo medido aqui) e depois só se atualiza sozinho
+    _carregar("indice_eventos", indice_eventos.obter_indice, lambda: None)
+    return indice_eventos.obter_indice()
+
+
+def eventos():
+    # Mesmo formato de consolidate_events.carregar_eventos; refeito só quando o índice muda
+    atual = indice().instantaneo()
+    salvo = _dados.get("eventos")
+    if salvo is None or salvo[0] != atual.versao:
+        salvo = (atual.versao, atual.canais[indice_eventos.COLUNAS_EVENTOS].copy())
+        _dados["eventos"] = salvo
+    return salvo[1]
+
+
+def estacoes_unicas():
+    df = eventos()
+    return df["estacao"].unique() if not df.empty else []
+
+
+def eventos_unicos():
+    df = eventos()
+    return df["evento"].unique() if not df.empty else []
+
+
+# Leitura de um único evento (e estação, se dada): só as partições e colunas necessárias saem do disco
+def espectro(evento, estacao=None, colunas=None):
+    estacoes = None if estacao is None else [estacao]
+    return ler_consolidado(base_path, 'freq_consolidado', colunas=colunas, eventos=[evento], estacoes=estacoes)
+
+
+def serie(evento, estacao=None, colunas=None):
+    estacoes = None if estacao is None else [estacao]
+    return ler_consolidado(base_path, 'data_consolidado', colunas=colunas, eventos=[evento], estacoes=estacoes)
+
+
+def leitor_amostras():
+    global _leitor_amostras
+    if _leitor_amostras is None:
+        _leitor_amostras = LeitorAmostras(pasta_amostras())
+    return _leitor_amostras
+
+
+def amostras(evento, estacao):
+    # {coluna: array float32} via np.memmap (ver amostras.py), ou None sem o store binário.
+    # Abrir um evento é uma consulta no dicionário do índice, sem tocar nos outros.
+    return leitor_amostras().ler(evento, estacao)
+
+
+def caminho_evento(evento):
+    # JSON do evento (metadados das estações), ou None se o evento não está no índice
+    estacoes = indice().estacoes()
+    if estacoes.empty:
+        return None
+    arquivos = estacoes.loc[estacoes["evento"] == evento, "arquivo"]
+    if arquivos.empty:
+        return None
+    return os.path.join(indice().pasta, str(arquivos.iloc[0]))
+
+
+def _atualizar_consolidado(nome, sufixo, gravar=True):
+    # Com gravar, incorpora ao consolidado só os arquivos novos/alterados.
+    # Devolve True se o consolidado em disco mudou desde a última olhada deste processo.
+    # Só atualiza o que já existe em disco (store Parquet ou CSV com manifesto).
+    destino = os.path.join(base_path, nome)
+    if armazenamento.store_disponivel(destino):
+        formato = "parquet"
+    elif os.path.exists(caminho_manifesto(destino + ".csv")):
+        formato, destino = "csv", destino + ".csv"
+    else:
+        return False
+
+    if gravar:
+        consolidar(os.path.join(base_path, "events"), sufixo, destino, incremental=True, formato=formato, verboso=False)
+    manifesto = caminho_manifesto(destino, formato)
+    atual = os.path.getmtime(manifesto) if os.path.exists(manifesto) else None
+    anterior = _manifestos.setdefault(nome, atual)
+    _manifestos[nome] = atual
+    return atual != anterior
+
+
+def atualizar_agora(gravar=True):
+    # Incorpora o que chegou em events/. Com gravar=False (outro processo é o dono
+    # do monitoramento) não varre a pasta nem grava nada: só adota o índice que o
+    # dono salvou e olha os manifestos, então o custo por worker não cresce com o histórico.
+    mudou = indice().atualizar(forcar=True) if gravar else indice().recarregar()
+    for nome, sufixo in (("freq_consolidado", "_freq.csv"), ("data_consolidado", "_data.csv")):
+        # As leituras vão ao disco a cada chamada (o CSV em memória é refeito pelo mtime)
+        if _atualizar_consolidado(nome, sufixo, gravar):
+            mudou = True
+    # O leitor das amostras percebe sozinho que o índice em disco mudou
+    if gravar and store_amostras_disponivel(pasta_amostras()):
+        # Sem esperar: se o consolidate_data.py --amostras estiver gravando, fica para a próxima volta
+        if atualizar_amostras(os.path.join(base_path, "events"), pasta_amostras(), verboso=False, esperar=False):
+            mudou = True
+    return mudou
+
+
+def _caminho_lock_monitor():
+    return os.path.join(base_path, "monitoramento.lock")
+
+
+def _assumir_monitoramento(lock):
+    # True se este processo é (ou acabou de virar) o dono do lock; renova o lock a cada chamada
+    try:
+        with open(lock, encoding="utf-8") as f:
+            dono = f.read().strip()
+    except OSError:
+        dono = None
+    if dono == str(os.getpid()):
+        os.utime(lock)
+        return True
+    try:
+        descritor = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(lock) < VALIDADE_LOCK_MONITOR:
+                return False
+            os.remove(lock)  # Lock abandonado: o próximo a chegar assume
+        except OSError:
+            pass
+        return False
+    with os.fdopen(descritor, "w", encoding="utf-8") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def _liberar_monitoramento(lock):
+    try:
+        with open(lock, encoding="utf-8") as f:
+            if f.read().strip() == str(os.getpid()):
+                os.remove(lock)
+    except OSError:
+        pass
+
+
+def iniciar_monitoramento(intervalo=5.0):
+    # Thread que chama atualizar_agora() a cada `intervalo` segundos. Devolve um Event para parar.
+    # Uma thread por processo, mesmo chamado várias vezes; só o dono do lock grava em disco.
+    global _monitor
+    with _lock:
+        if _monitor is not None and _monitor[0] == os.getpid():
+            return _monitor[1]
+        parar = threading.Event()
+        _monitor = (os.getpid(), parar)
+    lock = _caminho_lock_monitor()
+
+    def _monitorar():
+        while not parar.wait(intervalo):
+            try:
+                dono = _assumir_monitoramento(lock)
+                atualizar_agora(gravar=dono)
+                if dono:
+                    os.utime(lock)
+            except Exception as error:
+                print(f"Erro ao procurar eventos novos: {error}")
+        _liberar_monitoramento(lock)
+
+    atexit.register(_liberar_monitoramento, lock)
+    threading.Thread(target=_monitorar, name="monitoramento-eventos", daemon=True).start()
+    return parar
+
+
+def aquecer(nomes=("indice_eventos",)):
+    # Carrega os conjuntos pedidos numa thread, sem segurar a subida do servidor
+    carregadores = {
+        "indice_eventos": indice,
+    }
+
+    def _aquecer():
+        for nome in nomes:
+            carregadores[nome]()
+        print("Dados aquecidos:")
+        print(relatorio_tempos())
+
+    thread = threading.Thread(target=_aquecer, name="aquecimento-dados", daemon=True)
+    thread.start()
+    return thread
+
+
+def relatorio_tempos():
+    linhas = [f"  {nome}: {segundos * 1000:.1f} ms" for nome, segundos in tempos.items()]
+    return "\n".join(linhas) if linhas else "  (nenhum conjunto carregado ainda)"
+
+
+indice_eventos.definir_padrao(pasta_eventos(), os.path.join(base_path, "indice_eventos.pkl"))
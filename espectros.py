@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+import dados
+from amostras import ler_evento, assinatura_evento, COLUNAS_AMOSTRAS
+from cache import Cache
+
+# Espectros calculados a partir das amostras (_data.csv), em vez dos
+# _freq.csv exportados pelos gravadores, que vêm com resolução e janela
+# fixas. Todas as estações e canais de um evento são calculados de uma vez:
+# as séries de mesmo tamanho viram uma matriz e passam por uma rfft só
+# (Welch: segmentos via sliding_window_view, sem laço em Python).
+#
+# Parâmetros (ver parametros()):
+#   metodo       - "welch" (PSD média dos segmentos) ou "rfft" (amplitude da série inteira)
+#   janela       - "hann", "hamming", "blackman" ou "retangular"
+#   resolucao    - Hz entre bins; no Welch define o tamanho do segmento, na
+#                  rfft completa a série com zeros quando pede mais que 1/duração
+#   sobreposicao - fração de sobreposição dos segmentos do Welch
+#   f_min/f_max  - faixa devolvida (None = tudo até Nyquist)
+#
+# O resultado de cada (evento, estação, parâmetros) fica num Cache com número
+# máximo de itens (LRU): o mais antigo sai quando enche. A chave inclui as
+# assinaturas do JSON e dos _data.csv do evento, então dados regravados geram
+# espectros novos. O cálculo é determinístico (float64, janelas fixas): os
+# mesmos parâmetros sempre dão o mesmo espectro.
+#
+# A unidade das amostras (sensorUnit do JSON, ex.: mg) vai em df.attrs["unidade"]:
+# a PSD do Welch sai em unidade²/Hz e a amplitude da rfft na própria unidade.
+
+CANAIS = COLUNAS_AMOSTRAS[1:]  # T, R, V
+METODOS = ("welch", "rfft")
+JANELAS = {
+    # Versões periódicas (a usual em análise espectral)
+    "hann": lambda n: np.hanning(n + 1)[:-1],
+    "hamming": lambda n: np.hamming(n + 1)[:-1],
+    "blackman": lambda n: np.blackman(n + 1)[:-1],
+    "retangular": np.ones,
+}
+
+cache_espectros = Cache("espectros", max_itens=256, ttl=None)
+
+
+def parametros(metodo="welch", janela="hann", resolucao=0.1, sobreposicao=0.5, f_min=None, f_max=None):
+    # Valida e devolve os parâmetros numa tupla ordenada (serve de chave do cache)
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconhecido: {metodo} (use {', '.join(METODOS)})")
+    if janela not in JANELAS:
+        raise ValueError(f"Janela desconhecida: {janela} (use {', '.join(JANELAS)})")
+    if resolucao <= 0:
+        raise ValueError("A resolução precisa ser positiva")
+    if not 0 <= sobreposicao < 1:
+        raise ValueError("A sobreposição precisa estar em [0, 1)")
+    return (("f_max", f_max), ("f_min", f_min), ("janela", janela), ("metodo", metodo),
+            ("resolucao", float(resolucao)), ("sobreposicao", float(sobreposicao)))
+
+
+def welch(series, taxa, janela="hann", resolucao=0.1, sobreposicao=0.5):
+    # series: (n_series, n_amostras). PSD unilateral média dos segmentos, ((unidade)²/Hz).
+    # Devolve (frequencias, psd (n_series, n_bins)).
+    series = np.atleast_2d(np.asarray(series, dtype=np.float64))
+    n = series.shape[1]
+    segmento = min(n, max(2, int(round(taxa / resolucao))))
+    passo = max(1, int(round(segmento * (1 - sobreposicao))))
+    w = JANELAS[janela](segmento)
+
+    # (n_series, n_segmentos, segmento) como vista, sem copiar a série
+    segmentos = sliding_window_view(series, segmento, axis=1)[:, ::passo]
+    segmentos = segmentos - segmentos.mean(axis=2, keepdims=True)
+    espectros = np.fft.rfft(segmentos * w, axis=2)
+    psd = (np.abs(espectros) ** 2).mean(axis=1) / (taxa * np.sum(w ** 2))
+    # Unilateral: dobra tudo menos DC (e Nyquist, quando o segmento é par)
+    psd[:, 1:segmento // 2 + (segmento % 2)] *= 2
+    return np.fft.rfftfreq(segmento, 1.0 / taxa), psd
+
+
+def amplitude_rfft(series, taxa, janela="hann", resolucao=0.1):
+    # Amplitude unilateral da série inteira (mesma unidade das amostras).
+    # Devolve (frequencias, amplitudes (n_series, n_bins)).
+    series = np.atleast_2d(np.asarray(series, dtype=np.float64))
+    n = series.shape[1]
+    w = JANELAS[janela](n)
+    n_fft = max(n, int(round(taxa / resolucao)))
+    espectros = np.fft.rfft((series - series.mean(axis=1, keepdims=True)) * w, n_fft, axis=1)
+    amplitudes = np.abs(espectros) / np.sum(w)
+    amplitudes[:, 1:n_fft // 2 + (n_fft % 2)] *= 2
+    return np.fft.rfftfreq(n_fft, 1.0 / taxa), amplitudes
+
+
+def calcular_lote(estacoes, params):
+    # estacoes: saída de amostras.ler_evento. Devolve {serial: DataFrame Freq., T, R, V}.
+    # Estações com a mesma taxa e o mesmo número de amostras vão juntas numa chamada só.
+    opcoes = dict(params)
+    grupos = {}
+    for estacao in estacoes:
+        taxa = estacao["taxa"]
+        if not taxa:
+            tempo = estacao["amostras"][0]
+            taxa = 1.0 / float(np.median(np.diff(tempo))) if len(tempo) > 1 else 1.0
+        grupos.setdefault((taxa, estacao["amostras"].shape[1]), []).append(estacao)
+
+    resultado = {}
+    for (taxa, n), membros in grupos.items():
+        if n < 2:
+            continue
+        matriz = np.concatenate([m["amostras"][1:] for m in membros])  # (estações * canais, n)
+        if opcoes["metodo"] == "welch":
+            freqs, valores = welch(matriz, taxa, opcoes["janela"], opcoes["resolucao"], opcoes["sobreposicao"])
+        else:
+            freqs, valores = amplitude_rfft(matriz, taxa, opcoes["janela"], opcoes["resolucao"])
+
+        faixa = np.ones(len(freqs), dtype=bool)
+        if opcoes["f_min"] is not None:
+            faixa &= freqs >= opcoes["f_min"]
+        if opcoes["f_max"] is not None:
+            faixa &= freqs <= opcoes["f_max"]
+        valores = valores[:, faixa].reshape(len(membros), len(CANAIS), -1)
+        for estacao, canais in zip(membros, valores):
+            df = pd.DataFrame({"Freq.": freqs[faixa], **dict(zip(CANAIS, canais))})
+            df.attrs["unidade"] = estacao.get("unidade")
+            resultado[estacao["serial"]] = df
+    return resultado
+
+
+def espectro_calculado(evento, estacao=None, **opcoes):
+    # Mesmo formato de dados.espectro (Freq., T, R, V, evento, estacao) calculado das amostras,
+    # com a unidade das amostras em attrs["unidade"] (None se as estações divergem ou não informam).
+    # Sem estacao, devolve todas as estações do evento. Vazio se o evento não está no índice.
+    params = parametros(**opcoes)
+    caminho = dados.caminho_evento(evento)
+    if caminho is None:
+        return pd.DataFrame(columns=["Freq."] + CANAIS + ["evento", "estacao"])
+    sig = assinatura_evento(caminho)
+
+    # Na primeira falha calcula o evento inteiro (todas as estações numa passada);
+    # as outras estações pegam o resultado daí em vez de ler as amostras de novo
+    lote = {}
+
+    def calcular(serial):
+        if not lote:
+            lote.update(calcular_lote(ler_evento(caminho, dados.leitor_amostras()), params))
+            lote.setdefault(None, None)  # Marca como calculado mesmo se nenhuma estação tiver amostras
+        return lote.get(serial)
+
+    if estacao is None:
+        estacoes = dados.indice().estacoes()
+        seriais = [str(s) for s in estacoes.loc[estacoes["evento"] == evento, "serial"].unique()]
+    else:
+        seriais = [str(estacao)]
+
+    partes = []
+    for serial in sorted(seriais):
+        df = cache_espectros.obter((evento, serial, params, sig), lambda serial=serial: calcular(serial))
+        if df is not None:
+            partes.append(df.assign(evento=evento, estacao=serial))
+    if not partes:
+        return pd.DataFrame(columns=["Freq."] + CANAIS + ["evento", "estacao"])
+    unidades = {parte.attrs.get("unidade") for parte in partes}
+    resultado = pd.concat(partes, ignore_index=True)
+    resultado.attrs["unidade"] = unidades.pop() if len(unidades) == 1 else None
+    return resultado
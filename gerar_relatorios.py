@@ -0,0 +1,93 @@
+import os
+import time
+import shutil
+import argparse
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import dados
+from classificacao import classificacoes_do_filtro
+from relatorios_pdf import gerar_relatorio, identificador
+
+# Geração em lote dos relatórios de um período, sem abrir o app. Os eventos
+# são escolhidos como no botão "Buscar Eventos" da página inicial (período
+# de datas inclusivo + tipos), e cada um vira um PDF (ou HTML) com séries,
+# espectros, picos e classificação. Relatórios já gerados com os mesmos
+# dados (pelo app ou por uma rodada anterior) são reaproveitados do cache
+# em <base_path>/relatorios. O id de cada um (relatorios_pdf.identificador)
+# só depende dos arquivos do próprio evento: rodar de novo depois que
+# chegaram eventos novos só gera os novos e os que tiveram arquivos alterados.
+
+# Pasta com os consolidados e a pasta events/ (a mesma do main.py)
+base_path = r'C:\Users\mathe\Desktop\Estágio\Final'
+
+
+def selecionar_eventos(tipos_evento, data_inicio, data_fim):
+    # Eventos com o primeiro disparo no período (data_fim inclusiva) e tipo pedido, em ordem cronológica.
+    # Devolve [(evento, data do primeiro disparo)].
+    eventos = dados.indice().resumo(pd.to_datetime(data_inicio), pd.to_datetime(data_fim) + timedelta(days=1))
+    tipos = classificacoes_do_filtro(tipos_evento)
+    if tipos is not None:
+        eventos = eventos[eventos['classificacao'].isin(tipos)]
+    return list(eventos['data_hora'].items())
+
+
+def gerar_lote(tipos_evento, data_inicio, data_fim, saida, formato="pdf", workers=1):
+    inicio = time.perf_counter()
+    eventos = selecionar_eventos(tipos_evento, data_inicio, data_fim)
+    pasta_cache = os.path.join(dados.base_path, "relatorios")
+    os.makedirs(pasta_cache, exist_ok=True)
+    os.makedirs(saida, exist_ok=True)
+
+    # Destino final de cada evento e, quando ainda não existe, o arquivo do cache a gerar.
+    # A versão antiga de um evento alterado sai do cache quando a nova é gravada.
+    pendentes = []
+    reaproveitados = 0
+    for evento, data_hora in eventos:
+        cache = os.path.join(pasta_cache, f"{identificador(evento)}.{formato}")
+        destino = os.path.join(saida, f"{data_hora:%Y-%m-%d}_{evento}.{formato}")
+        if os.path.exists(cache):
+            shutil.copyfile(cache, destino)
+            reaproveitados += 1
+        else:
+            pendentes.append((evento, cache, destino))
+
+    gerados = erros = 0
+    if pendentes:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            futuros = {
+                executor.submit(gerar_relatorio, dados.base_path, evento, [], cache, formato): (evento, destino)
+                for evento, cache, destino in pendentes
+            }
+            for futuro in as_completed(futuros):
+                evento, destino = futuros[futuro]
+                try:
+                    shutil.copyfile(futuro.result(), destino)
+                    gerados += 1
+                except Exception as e:
+                    print(f"Erro ao gerar relatório de {evento}: {e}")
+                    erros += 1
+
+    duracao = time.perf_counter() - inicio
+    taxa = len(eventos) / duracao if duracao > 0 else 0.0
+    print(f"{len(eventos)} evento(s): {gerados} gerado(s), {reaproveitados} reaproveitado(s) do cache, {erros} erro(s)")
+    print(f"Tempo total: {duracao:.1f} s ({taxa:.2f} eventos/s)")
+    return {"eventos": len(eventos), "gerados": gerados, "reaproveitados": reaproveitados,
+            "erros": erros, "segundos": duracao, "eventos_por_segundo": taxa}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os relatórios de todos os eventos de um período")
+    parser.add_argument("--inicio", required=True, help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument("--fim", required=True, help="Data final, inclusiva (AAAA-MM-DD)")
+    parser.add_argument("--tipos", nargs="+", default=["todos"], choices=["todos", "global", "local", "ruido"],
+                        help="Tipos de evento, como no filtro da página inicial")
+    parser.add_argument("--formato", choices=["pdf", "html"], default="pdf")
+    parser.add_argument("--saida", default="relatorios_lote", help="Pasta onde os relatórios são gravados")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Número de processos gerando relatórios em paralelo")
+    parser.add_argument("--base", default=base_path, help="Pasta com events/ e os consolidados")
+    args = parser.parse_args()
+
+    dados.configurar(args.base)
+    gerar_lote(args.tipos, args.inicio, args.fim, args.saida, formato=args.formato, workers=args.workers)
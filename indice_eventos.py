@@ -0,0 +1,450 @@
+import os
+import copy
+import time
+import pickle
+import hashlib
+import threading
+from collections import namedtuple
+from datetime import timedelta
+from functools import partial
+import numpy as np
+import pandas as pd
+from consolidate_events import listar_jsons, ler_registros_evento, compactar_eventos
+from consolidacao import assinatura
+from ingestao import processar_arquivos
+from classificacao import classificar_eventos, SEM_DADOS
+
+# Índice persistente dos metadados de eventos (um registro por canal de cada
+# estação), compartilhado por main.py e home.py. É montado uma vez, salvo em
+# disco e depois só lê os JSONs novos ou alterados. As consultas dos callbacks
+# não tocam no disco: as varreduras ficam com quem chama atualizar() (a thread
+# de monitoramento do dados.py), com pelo menos `intervalo_atualizacao`
+# segundos entre duas delas.
+#
+# A cada atualização também é montado o resumo por evento (primeiro disparo,
+# estações, acionadas, proporção, classificação, máximos e picos espectrais),
+# que é o que as listas da interface consultam, e as estatísticas por estação
+# do painel do mapa. Estas últimas são acumuladas: quando a varredura só
+# encontra JSONs novos, os números de cada estação são somados aos que já
+# existiam, sem revisitar os eventos antigos.
+#
+# Tudo que as consultas leem é publicado junto num Instantaneo imutável, com
+# uma única atribuição. Quem consulta pega uma referência só (instantaneo())
+# e nunca vê o resumo de uma atualização com as datas ou estatísticas de outra,
+# mesmo sem passar pelo lock da varredura.
+#
+# Com vários processos só um varre a pasta (o dono do lock de monitoramento,
+# ver dados.py). O Instantaneo vai junto no arquivo salvo, e os outros
+# chamam recarregar(): olham só a data do arquivo e, quando ele muda, adotam o
+# instantâneo pronto, sem listar os JSONs nem refazer as tabelas.
+
+# Pasta padrão dos eventos (a mesma usada por main.py) e arquivo onde o índice é salvo
+PASTA_EVENTOS = r'C:\Users\mathe\Desktop\Estágio\Final\events\2025\2025'
+ARQUIVO_INDICE = None
+
+VERSAO_INDICE = 3
+
+# Picos espectrais por evento guardados no resumo (os mais altos entre todas as estações e canais)
+NUM_PICOS_RESUMO = 5
+
+# Colunas no mesmo formato devolvido por consolidate_events.carregar_eventos
+COLUNAS_EVENTOS = ["evento", "estacao", "direcao", "peak", "rms", "valor", "trigger"]
+COLUNAS_PICOS = ["evento", "estacao", "serial", "direcao", "frequencia", "amplitude"]
+
+# Dias de atividade recente (eventos por dia) guardados para o gráfico de cada estação
+DIAS_ATIVIDADE = 30
+
+# Colunas do resumo por evento (IndiceEventos.resumo)
+COLUNAS_RESUMO = [
+    "data_hora", "trigger", "estacoes", "seriais", "estacoes_acionadas", "total_estacoes",
+    "proporcao", "classificacao", "peak_max", "rms_max", "valor_max", "picos",
+]
+
+
+class Instantaneo(namedtuple("Instantaneo", [
+    "versao", "assinatura", "canais", "estacoes", "classificacao",
+    "resumo", "datas_resumo", "por_estacao", "seriais",
+])):
+    # Estado do índice numa atualização. Os frames e dicionários não são alterados
+    # depois de publicados: a próxima atualização monta outros.
+    __slots__ = ()
+
+    def periodo(self, inicio=None, fim=None):
+        # Eventos do resumo cujo primeiro disparo está em [inicio, fim], via busca binária
+        datas = self.datas_resumo
+        ini = 0 if inicio is None else np.searchsorted(datas, np.datetime64(pd.Timestamp(inicio), "ns"), side="left")
+        fim_ = len(datas) if fim is None else np.searchsorted(datas, np.datetime64(pd.Timestamp(fim), "ns"), side="right")
+        return self.resumo.iloc[ini:fim_]
+
+
+class IndiceEventos:
+    # limiares: argumentos repassados a classificacao.classificar_eventos
+    # (limiar_acionamento, limiar_ruido, limiar_global)
+    def __init__(self, pasta, arquivo_indice=None, intervalo_atualizacao=5.0, limiares=None):
+        self.pasta = pasta
+        self.limiares = limiares or {}
+        self.arquivo_indice = arquivo_indice
+        self.intervalo_atualizacao = intervalo_atualizacao
+        # Estado da varredura: só muda com o lock, e as consultas não o leem
+        self._arquivos = {}  # caminho relativo -> assinatura (tamanho, mtime)
+        self._canais = pd.DataFrame(columns=COLUNAS_EVENTOS + ["serial", "arquivo"])
+        self._picos = pd.DataFrame(columns=COLUNAS_PICOS + ["arquivo"])
+        self._atual = None  # Instantaneo publicado (ver _recalcular)
+        self._ultima_varredura = 0.0
+        self._assinatura_disco = None  # (tamanho, mtime) do arquivo salvo na última leitura/gravação
+        self._lock = threading.Lock()
+
+        if arquivo_indice and os.path.exists(arquivo_indice):
+            self._carregar_do_disco()
+        if self._atual is None:
+            self._recalcular()
+
+    def _carregar_do_disco(self):
+        # True se o arquivo salvo foi adotado
+        try:
+            sig = assinatura(self.arquivo_indice)
+            with open(self.arquivo_indice, "rb") as f:
+                salvo = pickle.load(f)
+        except Exception as e:
+            print(f"Erro ao ler índice de eventos {self.arquivo_indice}: {e}")
+            return False
+        self._assinatura_disco = sig
+        if salvo.get("versao") != VERSAO_INDICE or salvo.get("pasta") != self.pasta:
+            return False
+        self._arquivos = salvo["arquivos"]
+        self._canais = salvo["canais"]
+        self._picos = salvo["picos"]
+        # O instantâneo salvo só serve se foi montado com os mesmos limiares de classificação
+        instantaneo = salvo.get("instantaneo")
+        if instantaneo is not None and salvo.get("limiares") == self.limiares:
+            # versao é um contador deste processo: continua crescendo a partir do atual
+            versao = self._atual.versao + 1 if self._atual is not None else 1
+            self._atual = instantaneo._replace(versao=versao)
+        else:
+            self._recalcular()
+        return True
+
+    def _salvar_no_disco(self):
+        if not self.arquivo_indice:
+            return
+        salvo = {
+            "versao": VERSAO_INDICE,
+            "pasta": self.pasta,
+            "arquivos": self._arquivos,
+            "canais": self._canais,
+            "picos": self._picos,
+            "limiares": self.limiares,
+            "instantaneo": self._atual,
+        }
+        try:
+            # Temporário por processo: vários workers podem salvar o mesmo índice ao mesmo tempo
+            temporario = f"{self.arquivo_indice}.{os.getpid()}.tmp"
+            with open(temporario, "wb") as f:
+                pickle.dump(salvo, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, self.arquivo_indice)
+            self._assinatura_disco = assinatura(self.arquivo_indice)
+        except Exception as e:
+            print(f"Erro ao salvar índice de eventos {self.arquivo_indice}: {e}")
+
+    def atualizar(self, forcar=False, workers=1):
+        # Varre a pasta e incorpora só os JSONs novos ou alterados
+        if not forcar and time.monotonic() - self._ultima_varredura < self.intervalo_atualizacao:
+            return False
+
+        with self._lock:
+            self._ultima_varredura = time.monotonic()
+
+            atuais = {}
+            for caminho in listar_jsons(self.pasta):
+                try:
+                    atuais[os.path.relpath(caminho, self.pasta)] = (caminho, assinatura(caminho))
+                except OSError:
+                    continue
+
+            a_ler = [caminho for rel, (caminho, sig) in atuais.items() if self._arquivos.get(rel) != sig]
+            removidos = [rel for rel in self._arquivos if rel not in atuais]
+            if not a_ler and not removidos:
+                return False
+
+            lidos = processar_arquivos(
+                a_ler,
+                partial(ler_registros_evento, incluir_serial=True, incluir_picos=True),
+                workers=workers,
+                mensagem_erro=lambda caminho, e: f"[ERRO] Não foi possível abrir {os.path.basename(caminho)}: {e}"
+            )
+
+            arquivos = {rel: item for rel, item in self._arquivos.items() if rel in atuais}
+            descartar = set(removidos)
+            # Só JSONs inéditos: as estatísticas por estação podem ser somadas em vez de refeitas
+            so_acrescimos = not removidos and not any(
+                os.path.relpath(caminho, self.pasta) in self._arquivos for caminho, _ in lidos
+            )
+            novos, novos_picos = [], []
+            for caminho, lido in lidos:
+                rel = os.path.relpath(caminho, self.pasta)
+                descartar.add(rel)
+                arquivos[rel] = atuais[rel][1]
+                if lido is None:
+                    print(f"[AVISO] Ignorando JSON sem 'eventFiles': {os.path.basename(caminho)}")
+                    continue
+                registros, picos = lido
+                df = pd.DataFrame(registros, columns=COLUNAS_EVENTOS + ["serial"])
+                df["arquivo"] = rel
+                novos.append(compactar_eventos(df))
+                df = pd.DataFrame(picos, columns=COLUNAS_PICOS)
+                df["arquivo"] = rel
+                novos_picos.append(compactar_eventos(df))
+
+            self._arquivos = arquivos
+            # Categorias diferentes entre arquivos viram object no concat: compacta de novo
+            self._canais = compactar_eventos(_substituir(self._canais, descartar, novos))
+            self._picos = compactar_eventos(_substituir(self._picos, descartar, novos_picos))
+            self._recalcular(novos if so_acrescimos else None)
+            self._salvar_no_disco()
+            return True
+
+    def recarregar(self):
+        # Para os processos que não varrem a pasta: adota o índice que outro processo
+        # salvou, se o arquivo mudou desde a última leitura. Custa um stat quando nada mudou.
+        if not self.arquivo_indice:
+            return False
+        try:
+            sig = assinatura(self.arquivo_indice)
+        except OSError:
+            return False
+        if sig == self._assinatura_disco:
+            return False
+        with self._lock:
+            if sig == self._assinatura_disco:
+                return False
+            assinatura_anterior = self._atual.assinatura
+            if not self._carregar_do_disco():
+                return False
+            return self._atual.assinatura != assinatura_anterior
+
+    @property
+    def versao(self):
+        # Muda sempre que o conteúdo do índice muda
+        return self._atual.versao
+
+    @property
+    def assinatura(self):
+        # Hash dos arquivos indexados: igual em todos os processos com os mesmos dados
+        return self._atual.assinatura
+
+    def instantaneo(self):
+        return self._atual
+
+    def _recalcular(self, acrescimos=None):
+        # Monta as tabelas derivadas consultadas pelos callbacks e publica todas de uma vez.
+        # acrescimos: frames por canal só dos JSONs inéditos (as estatísticas por
+        # estação são somadas a partir deles)
+        anterior = self._atual
+        canais = self._canais
+        versao = anterior.versao + 1 if anterior is not None else 1
+        assinatura = hashlib.sha1(repr(sorted(self._arquivos.items())).encode("utf-8")).hexdigest()
+        if canais.empty:
+            self._atual = Instantaneo(
+                versao=versao, assinatura=assinatura, canais=canais,
+                estacoes=pd.DataFrame(columns=["evento", "estacao", "serial", "data_hora", "valor", "trigger", "classificacao"]),
+                classificacao=classificar_eventos(canais),
+                resumo=pd.DataFrame(columns=COLUNAS_RESUMO),
+                datas_resumo=np.array([], dtype="datetime64[ns]"),
+                por_estacao={}, seriais={},
+            )
+            return
+
+        # Uma linha por estação de cada evento, com o maior valor entre os canais
+        estacoes = canais.groupby(["arquivo", "serial"], sort=False, observed=True).agg(
+            evento=("evento", "first"),
+            estacao=("estacao", "first"),
+            valor=("valor", "max"),
+            trigger=("trigger", "first"),
+        ).reset_index()
+        estacoes["data_hora"] = estacoes["trigger"]  # Já é datetime64 (ver compactar_eventos)
+
+        # Classificação de todos os eventos numa passada só
+        classificacao = classificar_eventos(canais, **self.limiares)
+        estacoes["classificacao"] = estacoes["evento"].map(classificacao["classificacao"])
+
+        # Ordenado por data de disparo para as consultas por período usarem busca binária.
+        # Linhas sem data válida nunca entram num filtro de período, então ficam de fora.
+        estacoes = estacoes.dropna(subset=["data_hora"]).sort_values("data_hora", kind="stable")
+        estacoes = estacoes.reset_index(drop=True)
+        resumo = self._montar_resumo(canais, estacoes, classificacao)
+        if acrescimos is None or anterior is None:
+            por_estacao = _acumular_estacoes({}, canais)
+        else:
+            # Cópia: o instantâneo anterior continua em uso por quem já o pegou
+            por_estacao = copy.deepcopy(anterior.por_estacao)
+            if acrescimos:
+                por_estacao = _acumular_estacoes(por_estacao, pd.concat(acrescimos, ignore_index=True))
+        _atualizar_atividade(por_estacao)
+
+        self._atual = Instantaneo(
+            versao=versao, assinatura=assinatura, canais=canais, estacoes=estacoes,
+            classificacao=classificacao, resumo=resumo,
+            datas_resumo=resumo["data_hora"].to_numpy(dtype="datetime64[ns]"),
+            por_estacao=por_estacao,
+            seriais={dados["estacao"]: serial for serial, dados in por_estacao.items()},
+        )
+
+    def _montar_resumo(self, canais, estacoes, classificacao):
+        # Uma linha por evento com tudo que as listas da interface mostram, para
+        # nenhuma consulta de lista precisar voltar às linhas por canal
+        por_evento = canais.groupby("evento", sort=False, observed=True)
+        maximos = pd.DataFrame({
+            "peak_max": por_evento["peak"].max(),
+            "rms_max": por_evento["rms"].max(),
+            "valor_max": por_evento["valor"].max(),
+        })
+
+        # estacoes já está ordenado por data_hora: o primeiro disparo é o primeiro da lista
+        por_evento = estacoes.groupby("evento", sort=False, observed=True)
+        resumo = pd.DataFrame({
+            "data_hora": por_evento["data_hora"].first(),
+            "trigger": por_evento["trigger"].first(),
+            "estacoes": por_evento["estacao"].agg(lambda x: ", ".join(sorted(set(x)))),
+            "seriais": por_evento["serial"].agg(lambda x: ", ".join(sorted(set(x)))),
+        })
+        resumo = resumo.join(maximos).join(classificacao)
+
+        # N picos espectrais mais altos de cada evento: (estacao, direcao, frequencia, amplitude)
+        picos = self._picos.sort_values("amplitude", ascending=False, kind="stable")
+        picos = picos.groupby("evento", sort=False, observed=True).head(NUM_PICOS_RESUMO)
+        listas = {}
+        for pico in picos.itertuples(index=False):
+            listas.setdefault(pico.evento, []).append((pico.estacao, pico.direcao, pico.frequencia, pico.amplitude))
+        resumo["picos"] = [listas.get(evento, []) for evento in resumo.index]
+
+        resumo = resumo.sort_values("data_hora", kind="stable")
+        resumo.index.name = "evento"
+        return resumo[COLUNAS_RESUMO]
+
+    def canais(self):
+        # Mesmo formato de consolidate_events.carregar_eventos
+        return self._atual.canais[COLUNAS_EVENTOS].copy()
+
+    def estacoes(self):
+        return self._atual.estacoes
+
+    def resumo(self, inicio=None, fim=None):
+        # Resumo por evento (ver COLUNAS_RESUMO), indexado pelo evento e ordenado pelo primeiro disparo.
+        # Com inicio/fim devolve só os eventos cujo primeiro disparo está em [inicio, fim].
+        return self._atual.periodo(inicio, fim)
+
+    def estatisticas_estacao(self, estacao):
+        # Estatísticas de uma estação pelo nome (S-01-1, S-10-01...) ou pelo serial; None se não há eventos dela
+        atual = self._atual
+        serial = atual.seriais.get(normalizar_estacao(estacao), estacao)
+        return atual.por_estacao.get(str(serial))
+
+    def estatisticas_estacoes(self):
+        # serial -> estatísticas (ver _acumular_estacoes)
+        return self._atual.por_estacao
+
+    def classificacoes(self):
+        # Tabela por evento: estacoes_acionadas, total_estacoes, proporcao, classificacao
+        return self._atual.classificacao
+
+    def classificacao(self, evento):
+        classificacao = self._atual.classificacao
+        if evento not in classificacao.index:
+            return SEM_DADOS
+        return classificacao.at[evento, "classificacao"]
+
+
+def _substituir(frame, descartar, novos):
+    # Tira as linhas dos arquivos em `descartar` e acrescenta os frames novos
+    frame = frame[~frame["arquivo"].isin(descartar)]
+    if novos:
+        # O frame vazio inicial não entra no concat para não transformar tudo em object
+        frame = pd.concat(([frame] if not frame.empty else []) + novos, ignore_index=True)
+    return frame.reset_index(drop=True)
+
+
+def normalizar_estacao(nome):
+    # O mapa usa S-01-02/S-10-01, os gravadores S-01-2/S-10-1
+    partes = str(nome).split("-")
+    if len(partes) == 3 and partes[2].isdigit():
+        partes[2] = str(int(partes[2]))
+    return "-".join(partes)
+
+
+def _acumular_estacoes(estatisticas, canais):
+    # Soma as linhas por canal de `canais` às estatísticas por estação (serial -> dict):
+    #   estacao, serial, eventos, ultimo_disparo, peak_max/rms_max {direcao: valor},
+    #   por_dia {data: eventos} e, depois de _atualizar_atividade, dias/atividade.
+    # Supõe que os eventos de `canais` ainda não foram contados (JSONs inéditos).
+    if canais.empty:
+        return estatisticas
+    maximos = canais.groupby(["serial", "direcao"], observed=True)[["peak", "rms"]].max()
+    # Uma linha por estação de cada evento (o mesmo disparo para todos os canais)
+    estacoes = canais.drop_duplicates(["arquivo", "serial"])
+    por_estacao = estacoes.groupby("serial", observed=True).agg(
+        estacao=("estacao", "first"),
+        eventos=("arquivo", "size"),
+        ultimo_disparo=("trigger", "max"),
+    )
+    por_dia = estacoes.groupby(["serial", estacoes["trigger"].dt.normalize()], observed=True).size()
+
+    for serial, linha in por_estacao.iterrows():
+        atual = estatisticas.get(str(serial))
+        if atual is None:
+            atual = estatisticas[str(serial)] = {
+                "estacao": str(linha["estacao"]), "serial": str(serial), "eventos": 0,
+                "ultimo_disparo": pd.NaT, "peak_max": {}, "rms_max": {}, "por_dia": {},
+            }
+        atual["eventos"] += int(linha["eventos"])
+        if pd.notna(linha["ultimo_disparo"]) and not linha["ultimo_disparo"] <= atual["ultimo_disparo"]:
+            atual["ultimo_disparo"] = linha["ultimo_disparo"]
+    for (serial, direcao), linha in maximos.iterrows():
+        atual = estatisticas[str(serial)]
+        for coluna in ("peak", "rms"):
+            if pd.notna(linha[coluna]):
+                valores = atual[coluna + "_max"]
+                valores[str(direcao)] = max(valores.get(str(direcao), -np.inf), float(linha[coluna]))
+    for (serial, dia), quantidade in por_dia.items():
+        dias = estatisticas[str(serial)]["por_dia"]
+        dias[dia.date()] = dias.get(dia.date(), 0) + int(quantidade)
+    return estatisticas
+
+
+def _atualizar_atividade(estatisticas):
+    # Eventos por dia nos DIAS_ATIVIDADE dias que terminam no disparo mais recente do índice
+    ultimos = [e["ultimo_disparo"] for e in estatisticas.values() if pd.notna(e["ultimo_disparo"])]
+    if not ultimos:
+        return
+    fim = max(ultimos).date()
+    dias = [fim - timedelta(days=n) for n in range(DIAS_ATIVIDADE - 1, -1, -1)]
+    for e in estatisticas.values():
+        e["dias"] = dias
+        e["atividade"] = [e["por_dia"].get(dia, 0) for dia in dias]
+
+
+_indice = None
+
+
+def configurar_indice(pasta, arquivo_indice=None, intervalo_atualizacao=5.0, limiares=None):
+    global _indice
+    _indice = IndiceEventos(pasta, arquivo_indice, intervalo_atualizacao, limiares)
+    _indice.atualizar(forcar=True)
+    return _indice
+
+
+def definir_padrao(pasta, arquivo_indice=None):
+    # Define onde obter_indice() vai montar o índice, sem ler nada ainda
+    global PASTA_EVENTOS, ARQUIVO_INDICE, _indice
+    if _indice is not None and (_indice.pasta != pasta or _indice.arquivo_indice != arquivo_indice):
+        _indice = None
+    PASTA_EVENTOS = pasta
+    ARQUIVO_INDICE = arquivo_indice
+
+
+def obter_indice():
+    # Devolve o índice compartilhado, criando-o na pasta padrão no primeiro uso.
+    # Não varre o disco: quem chama são os callbacks. Os JSONs novos entram pela
+    # thread de monitoramento (dados.iniciar_monitoramento) ou por atualizar().
+    if _indice is None:
+        return configurar_indice(PASTA_EVENTOS, ARQUIVO_INDICE)
+    return _indice
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Motor de ingestão compartilhado pelos scripts de consolidação e por
+# consolidate_events. Cada arquivo (um CSV ou JSON por estação/evento) é
+# lido de forma independente, então com workers > 1 os arquivos são
+# distribuídos num pool de processos. O resultado volta sempre na ordem da
+# lista de entrada, independente de qual processo terminou primeiro.
+
+
+def _ler_protegido(tarefa):
+    # Roda no processo filho: devolve o erro em vez de derrubar o pool
+    funcao, caminho = tarefa
+    try:
+        return funcao(caminho), None
+    except Exception as e:
+        return None, e
+
+
+def _mensagem_padrao(caminho, erro):
+    return f"Erro ao processar {caminho}: {erro}"
+
+
+def processar_arquivos(caminhos, funcao, workers=1, mensagem_erro=_mensagem_padrao):
+    # funcao precisa ser uma função de módulo (ou functools.partial) para
+    # poder ser enviada aos processos filhos
+    caminhos = list(caminhos)
+    tarefas = [(funcao, caminho) for caminho in caminhos]
+
+    if workers is None or workers <= 1 or len(caminhos) <= 1:
+        resultados = map(_ler_protegido, tarefas)
+        return _coletar(caminhos, resultados, mensagem_erro)
+
+    workers = min(workers, len(caminhos), os.cpu_count() or 1)
+    # Lotes maiores reduzem o custo de comunicação entre processos
+    chunksize = max(1, len(caminhos) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        resultados = executor.map(_ler_protegido, tarefas, chunksize=chunksize)
+        return _coletar(caminhos, resultados, mensagem_erro)
+
+
+def _coletar(caminhos, resultados, mensagem_erro):
+    lidos = []
+    for caminho, (resultado, erro) in zip(caminhos, resultados):
+        if erro is not None:
+            print(mensagem_erro(caminho, erro))
+            continue
+        lidos.append((caminho, resultado))
+    return lidos
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import numpy as np
+
+# Instrumentação opcional dos callbacks do Dash (APP_INSTRUMENTACAO=1 no
+# main.py). instrumentar(app) precisa ser chamado logo depois de criar o app,
+# antes dos @app.callback: cada callback registrado a partir daí passa a
+# medir, por chamada,
+#   total        - do início do callback até a resposta JSON pronta
+#   callback     - só a função do callback
+#   serializacao - o resto (montagem da resposta e to_json do Dash)
+#   etapas       - trechos marcados com `with etapa("carregar")` etc.
+#   bytes        - tamanho da resposta enviada ao navegador
+#   cache        - acertos e falhas dos Cache (cache.py) consultados na chamada
+#
+# As últimas JANELA chamadas de cada callback ficam em memória; GET /_metricas
+# (só de localhost) devolve p50/p95/p99 delas. Cada chamada também vira uma
+# linha JSON no log (arquivo ou, sem arquivo, a saída padrão). Com vários
+# workers cada processo tem as próprias métricas; o log pode ser o mesmo.
+#
+# Sem instrumentar(), etapa() e contar_cache() não fazem nada.
+
+JANELA = 1000             # chamadas guardadas por callback para os percentis
+PERCENTIS = (50, 95, 99)
+ENDERECOS_LOCAIS = {"127.0.0.1", "::1", "localhost"}
+
+_ativo = False
+_caminho_log = None
+_lock = threading.Lock()
+_janelas = {}             # nome do callback -> deque de registros
+_contagens = {}           # nome do callback -> chamadas desde o início
+_local = threading.local()  # registro da chamada em andamento nesta thread
+
+
+def medindo():
+    return _ativo and getattr(_local, "registro", None) is not None
+
+
+@contextmanager
+def etapa(nome):
+    # Soma o tempo do bloco na etapa `nome` da chamada em andamento (se houver)
+    registro = getattr(_local, "registro", None) if _ativo else None
+    if registro is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas = registro["etapas"]
+        etapas[nome] = etapas.get(nome, 0.0) + (time.perf_counter() - inicio) * 1000
+
+
+def contar_cache(acerto):
+    registro = getattr(_local, "registro", None) if _ativo else None
+    if registro is not None:
+        registro["cache_acertos" if acerto else "cache_falhas"] += 1
+
+
+def _medir_funcao(funcao):
+    # Envolve a função do usuário (antes do Dash): mede só o corpo do callback
+    @wraps(funcao)
+    def medida(*args, **kwargs):
+        registro = getattr(_local, "registro", None)
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            if registro is not None:
+                registro["callback_ms"] = (time.perf_counter() - inicio) * 1000
+    return medida
+
+
+def _medir_resposta(nome, despachar):
+    # Envolve o callback já preparado pelo Dash, que devolve a resposta serializada
+    @wraps(despachar)
+    def medido(*args, **kwargs):
+        registro = {"callback": nome, "etapas": {}, "cache_acertos": 0, "cache_falhas": 0,
+                    "callback_ms": 0.0, "bytes": 0, "status": "ok"}
+        anterior = getattr(_local, "registro", None)
+        _local.registro = registro
+        inicio = time.perf_counter()
+        try:
+            resposta = despachar(*args, **kwargs)
+            if isinstance(resposta, (str, bytes)):
+                registro["bytes"] = len(resposta.encode("utf-8") if isinstance(resposta, str) else resposta)
+            return resposta
+        except Exception as erro:
+            # PreventUpdate chega aqui como exceção, mas não é falha
+            registro["status"] = "sem_atualizacao" if type(erro).__name__ == "PreventUpdate" else "erro"
+            raise
+        finally:
+            total = (time.perf_counter() - inicio) * 1000
+            _local.registro = anterior
+            registro["total_ms"] = round(total, 3)
+            registro["serializacao_ms"] = round(max(0.0, total - registro["callback_ms"]), 3)
+            registro["callback_ms"] = round(registro["callback_ms"], 3)
+            registro["etapas"] = {nome: round(ms, 3) for nome, ms in registro["etapas"].items()}
+            _guardar(registro)
+    return medido
+
+
+def _guardar(registro):
+    registro["instante"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    registro["pid"] = os.getpid()
+    linha = json.dumps(registro, ensure_ascii=False)
+    with _lock:
+        janela = _janelas.get(registro["callback"])
+        if janela is None:
+            janela = _janelas[registro["callback"]] = deque(maxlen=JANELA)
+        janela.append(registro)
+        _contagens[registro["callback"]] = _contagens.get(registro["callback"], 0) + 1
+        if _caminho_log:
+            try:
+                with open(_caminho_log, "a", encoding="utf-8") as f:
+                    f.write(linha + "\n")
+            except OSError as erro:
+                print(f"Erro ao gravar log de métricas: {erro}")
+        else:
+            print(linha)
+
+
+def _percentis(valores):
+    if not valores:
+        return None
+    resultado = np.percentile(np.asarray(valores, dtype=np.float64), PERCENTIS)
+    return {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTIS, resultado)}
+
+
+def metricas():
+    # Resumo por callback das últimas JANELA chamadas
+    with _lock:
+        copias = {nome: list(janela) for nome, janela in _janelas.items()}
+        contagens = dict(_contagens)
+    resumo = {}
+    for nome, registros in sorted(copias.items()):
+        etapas = {}
+        for registro in registros:
+            for etapa_nome, ms in registro["etapas"].items():
+                etapas.setdefault(etapa_nome, []).append(ms)
+        acertos = sum(r["cache_acertos"] for r in registros)
+        consultas = acertos + sum(r["cache_falhas"] for r in registros)
+        resumo[nome] = {
+            "chamadas": contagens.get(nome, 0),
+            "janela": len(registros),
+            "erros": sum(r["status"] == "erro" for r in registros),
+            "total_ms": _percentis([r["total_ms"] for r in registros]),
+            "callback_ms": _percentis([r["callback_ms"] for r in registros]),
+            "serializacao_ms": _percentis([r["serializacao_ms"] for r in registros]),
+            "etapas_ms": {etapa_nome: _percentis(ms) for etapa_nome, ms in etapas.items()},
+            "bytes": _percentis([r["bytes"] for r in registros]),
+            "cache_taxa_acerto": acertos / consultas if consultas else None,
+        }
+    return {"pid": os.getpid(), "callbacks": resumo}
+
+
+def instrumentar(app, caminho_log=None, rota="/_metricas"):
+    # Passa a medir todo callback registrado com app.callback daqui em diante
+    global _ativo, _caminho_log
+    from flask import request, jsonify, abort
+
+    _ativo = True
+    _caminho_log = caminho_log
+    registrar_original = app.callback
+
+    def callback(*args, **kwargs):
+        # O Dash cria a entrada no callback_map já aqui; a função só entra nela no decorador
+        antes = set(app.callback_map)
+        decorador = registrar_original(*args, **kwargs)
+        novas = set(app.callback_map) - antes
+
+        def registrar(funcao):
+            resultado = decorador(_medir_funcao(funcao))
+            for chave in novas:
+                entrada = app.callback_map[chave]
+                entrada["callback"] = _medir_resposta(funcao.__name__, entrada["callback"])
+            return resultado
+        return registrar
+
+    app.callback = callback
+
+    @app.server.route(rota)
+    def _rota_metricas():
+        if request.remote_addr not in ENDERECOS_LOCAIS:
+            abort(403)
+        return jsonify(metricas())
+
+    print(f"Instrumentação dos callbacks ligada: métricas em {rota}, log em {caminho_log or 'stdout'}")
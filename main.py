@@ -1,225 +1,405 @@
-from dash import Dash, html, dcc, dash_table, callback, Output, Input, State, ALL, no_update
-import os
-import pandas as pd
-import dash_bootstrap_components as dbc
-from consolidate_events import carregar_eventos
-from datetime import datetime, timedelta
-import numpy as np
-import plotly.graph_objects as go
-from dash import callback_context
-import pdfkit
-import tempfile
-from dash.dcc import Download
-from dash.exceptions import PreventUpdate
-from functools import lru_cache
-from mapa_barragem import layout as layout_mapa_barragem, register_callbacks as register_map_callbacks
-from home import layout as layout_home, registrar_callbacks as register_home_callbacks
-
-# Inicializa o app Dash
-app = Dash(__name__, external_stylesheets=[dbc.themes.FLATLY], suppress_callback_exceptions=True)
-
-# Configuração dos caminhos dos arquivos
-base_path = r'C:\Users\mathe\Desktop\Estágio\Final'
-freq_path = os.path.join(base_path, 'freq_consolidado.csv')
-data_path = os.path.join(base_path, 'data_consolidado.csv')
-
-# Mapeamento de códigos de estação
-STATION_MAPPING = {
-    'S-01-1': '20160005',
-    'S-06-1': '20160004',
-    'S-01-2': '20160008',
-    'S-07-1': '20160003',
-    'S-09-1': '20160007',
-    'S-10-1': '20160006'
-}
-
-# Carrega os dados com tratamento de erros
-try:
-    df_freq_consolidated = pd.read_csv(freq_path)
-    print("Dados de frequência carregados. Colunas:", df_freq_consolidated.columns.tolist())
-except Exception as error:
-    print(f"Erro ao carregar freq_consolidado.csv: {error}")
-    df_freq_consolidated = pd.DataFrame()
-
-try:
-    df_data_consolidated = pd.read_csv(data_path)
-    print("Dados temporais carregados. Colunas:", df_data_consolidated.columns.tolist())
-except Exception as error:
-    print(f"Erro ao carregar data_consolidado.csv: {error}")
-    df_data_consolidated = pd.DataFrame()
-
-# Carrega dados de eventos
-try:
-    events_path = os.path.join(base_path, "events", "2025", "2025")
-    df_events = carregar_eventos(events_path)
-    unique_stations = df_events["estacao"].unique()
-    unique_events = df_events["evento"].unique()
-    print("Estações carregadas:", unique_stations)
-    print("Eventos carregados:", unique_events)
-except Exception as error:
-    print(f"Erro ao carregar eventos: {error}")
-    df_events = pd.DataFrame()
-    unique_stations = []
-    unique_events = []
-
-def classificar_evento(evento, df):
-    dados_evento = df[df["evento"] == evento]
-    estacoes_acionadas = dados_evento[dados_evento["valor"] > 10]["estacao"].nunique()
-    total_estacoes = dados_evento["estacao"].nunique()
-    
-    if total_estacoes == 0:
-        return "Sem dados", 0
-    
-    proporcao = estacoes_acionadas / total_estacoes
-    
-    if proporcao < 0.10:
-        classificacao = "Ruído"
-    elif proporcao <= 0.75:
-        classificacao = "Evento Local"
-    else:
-        classificacao = "Evento Global"
-    
-    return classificacao, proporcao
-
-@lru_cache(maxsize=None)
-def obter_classificacao(evento):
-    return classificar_evento(evento, df_events)[0]
-
-def encontrar_picos(serie_frequencia, serie_amplitude, num_picos=5):
-    indices_picos = np.argsort(serie_amplitude)[-num_picos:]
-    indices_picos_ordenados = indices_picos[np.argsort(serie_frequencia[indices_picos])]
-    return [(serie_frequencia[i], serie_amplitude[i]) for i in indices_picos_ordenados]
-
-# Layout da página de relatórios
-reports_layout = html.Div([
-    html.Div(
-        dbc.DropdownMenu(
-            children=[
-                dbc.DropdownMenuItem("Top", id="button-top"),
-                dbc.DropdownMenuItem("Séries de Aceleração", id="button-series"),
-                dbc.DropdownMenuItem("Espectros de Frequência", id="button-spectra"),
-            ],
-            label="Menu",
-            nav=True,
-            in_navbar=True,
-            style={
-                "position": "fixed",
-                "top": "20px",
-                "right": "20px",
-                "zIndex": "1000",
-            },
-        ),
-    ),
-    
-    html.Div(
-        dbc.Button(
-            "Selecionar Evento",
-            id="button-select-event",
-            color="primary",
-            className="mb-3",
-            style={
-                "position": "fixed",
-                "top": "60px",
-                "right": "20px",
-                "zIndex": "1000",
-            },
-        ),
-    ),
-    
-    html.Div(
-        dbc.DropdownMenu(
-            id="dropdown-events",
-            label="Eventos Disponíveis",
-            style={
-                "position": "fixed",
-                "top": "100px",
-                "right": "20px",
-                "zIndex": "1000",
-                "display": "none",
-            },
-        ),
-    ),
-    
-    html.Div(id='dummy-div', style={'display': 'none'}),
-    dcc.Download(id="download-pdf"),
-    html.H3('RELATÓRIO DE MONITORAMENTO DA BARRAGEM DAIVÕES', style={"textAlign": "center", "marginTop": "30px"}),
-
-    dbc.Tabs(
-        id="station-tabs",
-        active_tab=unique_stations[0] if len(unique_stations) > 0 else None,
-        children=[dbc.Tab(label=estacao, tab_id=estacao) for estacao in unique_stations]
-    ),
-    html.Div(id="tab-content", style={"padding": "20px"})
-])
-
-# Layout principal do app
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    dcc.Store(id='filters-store'),
-    dcc.Store(id='selected-event-store'),
-    
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H4("Menu Principal", style={"padding": "10px", "borderBottom": "1px solid #ddd", "marginBottom": "10px"}),
-                
-                html.Div([
-                    html.H6("OPÇÕES PRINCIPAIS", style={"color": "#555", "padding": "5px 10px", "marginTop": "15px"}),
-                    dbc.Nav([
-                        dbc.NavLink("Início", href="/home", active="exact", style={"padding": "8px 15px"}),
-                        dbc.NavLink("Relatórios", href="/reports", active="exact", style={"padding": "8px 15px"}),
-                        dbc.NavLink("Mapa da Barragem", href="/dam-map", active="exact", style={"padding": "8px 15px"}),
-                    ], vertical=True, pills=True),
-                ]),
-                
-                html.Div([
-                    html.H6("OUTRAS OPÇÕES", style={"color": "#555", "padding": "5px 10px", "marginTop": "20px"}),
-                    dbc.Nav([
-                        dbc.NavLink("Opção 4", href="#", style={"padding": "8px 15px"}),
-                        dbc.NavLink("Opção 5", href="#", style={"padding": "8px 15px"}),
-                    ], vertical=True, pills=True),
-                ]),
-                
-                html.Div([
-                    html.H6("OUTRAS OPÇÕES 2", style={"color": "#555", "padding": "5px 10px", "marginTop": "20px"}),
-                    dbc.Nav([
-                        dbc.NavLink("Opção 6", href="#", style={"padding": "8px 15px"}),
-                        dbc.NavLink("Opção 7", href="#", style={"padding": "8px 15px"}),
-                    ], vertical=True, pills=True),
-                ]),
-            ], style={
-                "position": "fixed",
-                "width": "16.666%",
-                "height": "100vh",
-                "overflowY": "auto",
-                "backgroundColor": "#f8f9fa",
-                "borderRight": "1px solid #dee2e6",
-                "padding": "10px",
-                "zIndex": "100"
-            })
-        ], width=2, style={"padding": "0"}),
-        
-        dbc.Col([
-            html.Div(id='page-content')
-        ], width=10, style={"marginLeft": "16.666%"})
-    ])
-])
-
-@app.callback(
-    Output('page-content', 'children'),
-    Input('url', 'pathname')
-)
-def render_page_content(pathname):
-    if pathname == "/dam-map":
-        return layout_mapa_barragem
-    elif pathname == "/reports":
-        return reports_layout
-    else:
-        return layout_home
-
-# Registra os callbacks
-register_map_callbacks(app)
-register_home_callbacks(app)
-
-if __name__ == '__main__':
+import time
+_inicio_importacao = time.perf_counter()
+
+from dash import Dash, html, dcc, dash_table, callback, Output, Input, State, ALL, no_update
+import os
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+import dados
+from classificacao import classificar_eventos
+from amostragem import reduzir, recortar, LARGURA_PADRAO
+from picos import picos_em_lote, picos_de_espectros
+from espectros import espectro_calculado
+from relatorios_pdf import FilaRelatorios, PRONTO, ERRO
+from datetime import datetime, timedelta
+from dash import callback_context
+from dash.dcc import Download
+from dash.exceptions import PreventUpdate
+from mapa_barragem import layout as layout_mapa_barragem, register_callbacks as register_map_callbacks
+from home import layout as layout_home, registrar_callbacks as register_home_callbacks
+from instrumentacao import instrumentar, etapa
+
+# Inicializa o app Dash
+app = Dash(__name__, external_stylesheets=[dbc.themes.FLATLY], suppress_callback_exceptions=True)
+server = app.server  # Ponto de entrada WSGI (gunicorn main:server)
+
+# Com APP_INSTRUMENTACAO=1 cada callback mede tempos, etapas e tamanho da resposta
+# (p50/p95/p99 em /_metricas, uma linha JSON por chamada em APP_INSTRUMENTACAO_LOG)
+if os.environ.get("APP_INSTRUMENTACAO") == "1":
+    instrumentar(app, os.environ.get("APP_INSTRUMENTACAO_LOG"))
+
+# Configuração dos caminhos dos arquivos
+# Os consolidados ficam em <base_path>/freq_consolidado e <base_path>/data_consolidado
+# (store Parquet particionado) ou nos CSVs de mesmo nome quando o store não existe.
+# Os dados só são lidos no primeiro uso (ver dados.py).
+# Com vários workers (ex.: APP_COMPARTILHADO=1 gunicorn -w 4 main:server) os
+# caches de resultados ficam numa cópia só em disco e os consolidados são lidos
+# do store Parquet por evento, sem uma cópia inteira em cada worker.
+base_path = r'C:\Users\mathe\Desktop\Estágio\Final'
+dados.configurar(base_path, compartilhado_entre_processos=os.environ.get("APP_COMPARTILHADO") == "1")
+
+# PDFs gerados em segundo plano e guardados em <base_path>/relatorios (ver relatorios_pdf.py)
+fila_relatorios = FilaRelatorios(os.path.join(base_path, "relatorios"))
+
+# Mapeamento de códigos de estação
+STATION_MAPPING = {
+    'S-01-1': '20160005',
+    'S-06-1': '20160004',
+    'S-01-2': '20160008',
+    'S-07-1': '20160003',
+    'S-09-1': '20160007',
+    'S-10-1': '20160006'
+}
+
+def classificar_evento(evento, df=None):
+    # Sem df usa a tabela de classificação do índice, calculada de uma vez para todos os eventos
+    with etapa("classificar"):
+        if df is None:
+            tabela = dados.indice().classificacoes()
+        else:
+            tabela = classificar_eventos(df)
+    
+    if evento not in tabela.index:
+        return "Sem dados", 0
+    
+    linha = tabela.loc[evento]
+    return linha["classificacao"], linha["proporcao"]
+
+def obter_classificacao(evento):
+    # A tabela do índice é refeita quando chegam eventos novos, então não há cache para invalidar
+    return classificar_evento(evento)[0]
+
+def encontrar_picos(serie_frequencia, serie_amplitude, num_picos=5):
+    # Máximos locais mais altos de uma série, ordenados por frequência (ver picos.py)
+    picos = picos_em_lote(serie_frequencia, serie_amplitude, num_picos)
+    return [(pico["frequencia"], pico["amplitude"]) for pico in picos]
+
+def encontrar_picos_evento(evento, num_picos=5):
+    # Picos de todas as estações e canais do evento numa única chamada em lote
+    df = dados.espectro(evento, colunas=['Freq.'] + CANAIS + ['evento', 'estacao'])
+    return picos_de_espectros(df, 'Freq.', CANAIS, num_picos=num_picos)
+
+# Canais gravados em cada estação
+CANAIS = ['T', 'R', 'V']
+
+def _figura_reduzida(x, canais, evento, estacao, titulo, eixo_x, eixo_y, inicio=None, fim=None):
+    # x ordenado e {canal: valores}: recorta o trecho visível em resolução total
+    # e reduz cada canal a ~LARGURA_PADRAO pontos
+    fig = go.Figure()
+    if len(x):
+        with etapa("filtrar"):
+            trecho = recortar(x, *[canais[canal] for canal in CANAIS], inicio=inicio, fim=fim)
+            reduzidos = [reduzir(trecho[0], valores, LARGURA_PADRAO) for valores in trecho[1:]]
+        with etapa("renderizar"):
+            for canal, (x_reduzido, y_reduzido) in zip(CANAIS, reduzidos):
+                fig.add_trace(go.Scatter(x=x_reduzido, y=y_reduzido, mode='lines', name=canal))
+    with etapa("renderizar"):
+        fig.update_layout(
+            title=f"{titulo} - {estacao} - {evento}",
+            xaxis_title=eixo_x,
+            yaxis_title=eixo_y,
+            uirevision=f"{evento}-{estacao}",  # Mantém o zoom do usuário entre atualizações
+        )
+        if inicio is not None and fim is not None:
+            fig.update_xaxes(range=[inicio, fim])
+    return fig
+
+def _colunas_ordenadas(df, eixo):
+    df = df.sort_values(eixo)
+    return df[eixo].to_numpy(), {canal: df[canal].to_numpy() for canal in CANAIS}
+
+def figura_series(evento, estacao, inicio=None, fim=None):
+    serial = STATION_MAPPING.get(estacao, estacao)
+    # Store binário (amostras/): vistas do np.memmap, já ordenadas por tempo
+    with etapa("carregar"):
+        colunas = dados.amostras(evento, serial)
+        if colunas is not None:
+            x = colunas['Time']
+        else:
+            x, colunas = _colunas_ordenadas(dados.serie(evento, serial, colunas=['Time'] + CANAIS), 'Time')
+    return _figura_reduzida(x, colunas, evento, estacao, "Séries de Aceleração", "Tempo (s)", "Aceleração", inicio, fim)
+
+# Fonte do espectro: o _freq.csv do gravador ou calculado das amostras (ver espectros.py)
+# fonte -> (rótulo, eixo y, eixo y com a unidade das amostras)
+FONTES_ESPECTRO = {
+    'gravador': ("Gravador", "Amplitude", None),
+    'welch': ("Welch (PSD)", "PSD", "PSD (({})²/Hz)"),
+    'rfft': ("FFT da série", "Amplitude", "Amplitude ({})"),
+}
+
+def figura_espectro(evento, estacao, inicio=None, fim=None, fonte='gravador'):
+    serial = STATION_MAPPING.get(estacao, estacao)
+    with etapa("carregar"):
+        if fonte == 'gravador':
+            df = dados.espectro(evento, serial, colunas=['Freq.'] + CANAIS)
+        else:
+            df = espectro_calculado(evento, serial, metodo=fonte)
+        x, colunas = _colunas_ordenadas(df, 'Freq.')
+    _, eixo_y, eixo_com_unidade = FONTES_ESPECTRO[fonte]
+    # Unidade das amostras (sensorUnit do JSON), que o espectro calculado traz em attrs
+    unidade = df.attrs.get("unidade")
+    if eixo_com_unidade and unidade:
+        eixo_y = eixo_com_unidade.format(unidade)
+    return _figura_reduzida(x, colunas, evento, estacao, "Espectros de Frequência", "Frequência (Hz)",
+                            eixo_y, inicio, fim)
+
+def intervalo_zoom(relayout):
+    # Traduz o relayoutData do Plotly em (inicio, fim); (None, None) volta à vista completa
+    if not relayout:
+        raise PreventUpdate
+    if relayout.get('xaxis.autorange'):
+        return None, None
+    if 'xaxis.range[0]' in relayout:
+        return relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    if 'xaxis.range' in relayout:
+        return tuple(relayout['xaxis.range'])
+    raise PreventUpdate
+
+# Layout da página de relatórios (montado a cada visita, com as estações carregadas até o momento)
+def reports_layout():
+    with etapa("carregar"):
+        unique_stations = dados.estacoes_unicas()
+    return html.Div([
+    html.Div(
+        dbc.DropdownMenu(
+            children=[
+                dbc.DropdownMenuItem("Top", id="button-top"),
+                dbc.DropdownMenuItem("Séries de Aceleração", id="button-series"),
+                dbc.DropdownMenuItem("Espectros de Frequência", id="button-spectra"),
+            ],
+            label="Menu",
+            nav=True,
+            in_navbar=True,
+            style={
+                "position": "fixed",
+                "top": "20px",
+                "right": "20px",
+                "zIndex": "1000",
+            },
+        ),
+    ),
+    
+    html.Div(
+        dbc.Button(
+            "Selecionar Evento",
+            id="button-select-event",
+            color="primary",
+            className="mb-3",
+            style={
+                "position": "fixed",
+                "top": "60px",
+                "right": "20px",
+                "zIndex": "1000",
+            },
+        ),
+    ),
+    
+    html.Div(
+        dbc.DropdownMenu(
+            id="dropdown-events",
+            label="Eventos Disponíveis",
+            style={
+                "position": "fixed",
+                "top": "100px",
+                "right": "20px",
+                "zIndex": "1000",
+                "display": "none",
+            },
+        ),
+    ),
+    
+    html.Div(id='dummy-div', style={'display': 'none'}),
+    dcc.Download(id="download-pdf"),
+    html.Div([
+        dbc.Button("Gerar PDF", id="button-gerar-pdf", color="secondary", size="sm"),
+        html.Small(id="estado-pdf", style={"marginLeft": "10px", "color": "#6c757d"}),
+    ], style={"position": "fixed", "top": "140px", "right": "20px", "zIndex": "1000"}),
+    dcc.Store(id='trabalho-pdf'),
+    dcc.Interval(id='intervalo-pdf', interval=2000, disabled=True),
+    html.H3('RELATÓRIO DE MONITORAMENTO DA BARRAGEM DAIVÕES', style={"textAlign": "center", "marginTop": "30px"}),
+
+    dbc.Tabs(
+        id="station-tabs",
+        active_tab=unique_stations[0] if len(unique_stations) > 0 else None,
+        children=[dbc.Tab(label=estacao, tab_id=estacao) for estacao in unique_stations]
+    ),
+    html.Div(id="tab-content", style={"padding": "20px"})
+])
+
+# Layout principal do app
+app.layout = html.Div([
+    dcc.Location(id='url', refresh=False),
+    dcc.Store(id='filters-store'),
+    dcc.Store(id='selected-event-store'),
+    
+    dbc.Row([
+        dbc.Col([
+            html.Div([
+                html.H4("Menu Principal", style={"padding": "10px", "borderBottom": "1px solid #ddd", "marginBottom": "10px"}),
+                
+                html.Div([
+                    html.H6("OPÇÕES PRINCIPAIS", style={"color": "#555", "padding": "5px 10px", "marginTop": "15px"}),
+                    dbc.Nav([
+                        dbc.NavLink("Início", href="/home", active="exact", style={"padding": "8px 15px"}),
+                        dbc.NavLink("Relatórios", href="/reports", active="exact", style={"padding": "8px 15px"}),
+                        dbc.NavLink("Mapa da Barragem", href="/dam-map", active="exact", style={"padding": "8px 15px"}),
+                    ], vertical=True, pills=True),
+                ]),
+                
+                html.Div([
+                    html.H6("OUTRAS OPÇÕES", style={"color": "#555", "padding": "5px 10px", "marginTop": "20px"}),
+                    dbc.Nav([
+                        dbc.NavLink("Opção 4", href="#", style={"padding": "8px 15px"}),
+                        dbc.NavLink("Opção 5", href="#", style={"padding": "8px 15px"}),
+                    ], vertical=True, pills=True),
+                ]),
+                
+                html.Div([
+                    html.H6("OUTRAS OPÇÕES 2", style={"color": "#555", "padding": "5px 10px", "marginTop": "20px"}),
+                    dbc.Nav([
+                        dbc.NavLink("Opção 6", href="#", style={"padding": "8px 15px"}),
+                        dbc.NavLink("Opção 7", href="#", style={"padding": "8px 15px"}),
+                    ], vertical=True, pills=True),
+                ]),
+            ], style={
+                "position": "fixed",
+                "width": "16.666%",
+                "height": "100vh",
+                "overflowY": "auto",
+                "backgroundColor": "#f8f9fa",
+                "borderRight": "1px solid #dee2e6",
+                "padding": "10px",
+                "zIndex": "100"
+            })
+        ], width=2, style={"padding": "0"}),
+        
+        dbc.Col([
+            html.Div(id='page-content')
+        ], width=10, style={"marginLeft": "16.666%"})
+    ])
+])
+
+@app.callback(
+    Output('page-content', 'children'),
+    Input('url', 'pathname')
+)
+def render_page_content(pathname):
+    if pathname == "/dam-map":
+        return layout_mapa_barragem
+    elif pathname == "/reports":
+        return reports_layout()
+    else:
+        return layout_home
+
+@app.callback(
+    Output('tab-content', 'children'),
+    Input('station-tabs', 'active_tab'),
+    State('selected-event-store', 'data')
+)
+def render_tab_content(estacao, evento_selecionado):
+    with etapa("carregar"):
+        unique_events = dados.eventos_unicos()
+    if not estacao or len(unique_events) == 0:
+        raise PreventUpdate
+    evento = evento_selecionado or unique_events[0]
+    
+    return html.Div([
+        dcc.Store(id='serie-atual', data={'evento': evento, 'estacao': estacao}),
+        dcc.Graph(id='grafico-series', figure=figura_series(evento, estacao)),
+        dbc.RadioItems(
+            id='fonte-espectro',
+            options=[{'label': rotulo, 'value': fonte} for fonte, (rotulo, *_) in FONTES_ESPECTRO.items()],
+            value='gravador',
+            inline=True,
+        ),
+        dcc.Graph(id='grafico-espectro', figure=figura_espectro(evento, estacao)),
+    ])
+
+# No zoom, busca de novo só o trecho visível em resolução total
+@app.callback(
+    Output('grafico-series', 'figure'),
+    Input('grafico-series', 'relayoutData'),
+    State('serie-atual', 'data'),
+    prevent_initial_call=True
+)
+def zoom_series(relayout, atual):
+    inicio, fim = intervalo_zoom(relayout)
+    return figura_series(atual['evento'], atual['estacao'], inicio, fim)
+
+@app.callback(
+    Output('grafico-espectro', 'figure'),
+    Input('grafico-espectro', 'relayoutData'),
+    State('serie-atual', 'data'),
+    State('fonte-espectro', 'value'),
+    prevent_initial_call=True
+)
+def zoom_espectro(relayout, atual, fonte):
+    inicio, fim = intervalo_zoom(relayout)
+    return figura_espectro(atual['evento'], atual['estacao'], inicio, fim, fonte or 'gravador')
+
+@app.callback(
+    Output('grafico-espectro', 'figure', allow_duplicate=True),
+    Input('fonte-espectro', 'value'),
+    State('serie-atual', 'data'),
+    prevent_initial_call=True
+)
+def trocar_fonte_espectro(fonte, atual):
+    if not fonte or not atual:
+        raise PreventUpdate
+    return figura_espectro(atual['evento'], atual['estacao'], fonte=fonte)
+
+# Relatório PDF: o clique só enfileira; o intervalo acompanha e baixa quando fica pronto
+@app.callback(
+    Output('trabalho-pdf', 'data'),
+    Output('intervalo-pdf', 'disabled'),
+    Output('estado-pdf', 'children'),
+    Input('button-gerar-pdf', 'n_clicks'),
+    State('selected-event-store', 'data'),
+    prevent_initial_call=True
+)
+def pedir_pdf(n_clicks, evento_selecionado):
+    unique_events = dados.eventos_unicos()
+    if not n_clicks or len(unique_events) == 0:
+        raise PreventUpdate
+    evento = evento_selecionado or unique_events[0]
+    return fila_relatorios.pedir(evento), False, f"Gerando relatório de {evento}..."
+
+@app.callback(
+    Output('download-pdf', 'data'),
+    Output('intervalo-pdf', 'disabled', allow_duplicate=True),
+    Output('estado-pdf', 'children', allow_duplicate=True),
+    Input('intervalo-pdf', 'n_intervals'),
+    State('trabalho-pdf', 'data'),
+    prevent_initial_call=True
+)
+def acompanhar_pdf(n_intervals, id_trabalho):
+    if not id_trabalho:
+        raise PreventUpdate
+    estado = fila_relatorios.estado(id_trabalho)
+    if estado["estado"] == PRONTO:
+        return dcc.send_file(estado["arquivo"], filename="relatorio.pdf"), True, "Relatório pronto"
+    if estado["estado"] == ERRO:
+        return no_update, True, f"Erro ao gerar relatório: {estado['erro']}"
+    return no_update, False, f"Relatório {estado['estado']}..."
+
+# Registra os callbacks
+register_map_callbacks(app)
+register_home_callbacks(app)
+
+print(f"main.py importado em {(time.perf_counter() - _inicio_importacao) * 1000:.0f} ms")
+
+@server.before_request
+def _iniciar_monitoramento():
+    # Eventos novos em events/ entram sem reiniciar o servidor. Liga na primeira
+    # requisição do processo que atende: no gunicorn cada worker (já depois do fork,
+    # onde uma thread do processo mestre não existiria), e no app.run(debug=True)
+    # só o filho do reloader, nunca o processo que apenas vigia o código.
+    # Entre os processos, só um grava os consolidados (ver dados.iniciar_monitoramento).
+    dados.iniciar_monitoramento(intervalo=5.0)
+
+if __name__ == '__main__':
+    # O índice de eventos carrega em segundo plano enquanto o servidor sobe
+    # (no reloader, só no processo que vai atender as requisições)
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        dados.aquecer()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Detecção de picos espectrais em lote. Em vez de ordenar cada espectro
+# inteiro (np.argsort, O(n log n) por série), todas as séries de um evento
+# (ou de um período) são empilhadas numa matriz e processadas de uma vez:
+# máximos da vizinhança + filtro de proeminência + np.argpartition para os N maiores.
+
+# Resultado: um registro por pico, ordenado por série e frequência
+DTYPE_PICO = np.dtype([
+    ("serie", np.int64),          # linha da matriz de amplitudes
+    ("frequencia", np.float64),
+    ("amplitude", np.float64),
+    ("prominencia", np.float64),
+])
+
+JANELA_PICO = 25  # bins de cada lado: distância mínima entre picos e alcance da proeminência
+
+
+def picos_em_lote(frequencias, amplitudes, num_picos=5, prominencia_minima=0.0,
+                  janela=JANELA_PICO):
+    # frequencias: 1D (eixo comum) ou 2D com o mesmo formato de amplitudes
+    # amplitudes: 2D (n_series, n_bins); posições NaN são ignoradas (preenchimento)
+    amplitudes = np.atleast_2d(np.asarray(amplitudes, dtype=np.float64))
+    n_series, n_bins = amplitudes.shape
+    frequencias = np.asarray(frequencias, dtype=np.float64)
+    if frequencias.ndim == 1:
+        frequencias = np.broadcast_to(frequencias, amplitudes.shape)
+    if n_bins < 3 or num_picos <= 0:
+        return np.empty(0, dtype=DTYPE_PICO)
+
+    a = np.where(np.isnan(amplitudes), -np.inf, amplitudes)
+
+    # Vizinhança de `janela` bins de cada lado: janelas deslizantes à esquerda e à direita de cada bin
+    def _lados(preenchimento, reduzir):
+        preenchido = np.pad(a, ((0, 0), (janela, janela)), constant_values=preenchimento)
+        janelas = reduzir(sliding_window_view(preenchido, janela, axis=1), axis=2)
+        return janelas[:, :n_bins], janelas[:, janela + 1:janela + 1 + n_bins]
+
+    # Pico = o maior valor da própria vizinhança (platôs contam uma vez só, no primeiro bin).
+    # Isso elimina os bins vizinhos do mesmo pico, que o argsort devolvia como picos separados.
+    max_esquerda, max_direita = _lados(-np.inf, np.max)
+    maximo_local = (a > max_esquerda) & (a >= max_direita) & np.isfinite(a)
+
+    # Proeminência limitada à janela: altura acima do maior dos dois vales, com cada
+    # vale procurado só nos `janela` bins daquele lado. Para picos mais largos que a
+    # janela o vale verdadeiro fica de fora e o valor sai maior que a proeminência
+    # da definição clássica (que segue até encontrar um ponto mais alto).
+    min_esquerda, min_direita = _lados(np.inf, np.min)
+    vale = np.maximum(min_esquerda, min_direita)
+    vale = np.where(np.isfinite(vale), vale, np.minimum(min_esquerda, min_direita))
+    # Só nos bins válidos: nas posições de preenchimento (-inf) a conta seria -inf - -inf
+    prominencia = np.subtract(a, vale, out=np.full_like(a, -np.inf), where=np.isfinite(a))
+
+    pontuacao = np.where(maximo_local & (prominencia >= prominencia_minima), a, -np.inf)
+
+    # N maiores de cada linha sem ordenar a linha inteira
+    k = min(num_picos, n_bins)
+    escolhidos = np.argpartition(-pontuacao, k - 1, axis=1)[:, :k]
+    linhas = np.repeat(np.arange(n_series), k)
+    colunas = escolhidos.ravel()
+    validos = np.isfinite(pontuacao[linhas, colunas])
+    linhas, colunas = linhas[validos], colunas[validos]
+
+    resultado = np.empty(len(linhas), dtype=DTYPE_PICO)
+    resultado["serie"] = linhas
+    resultado["frequencia"] = frequencias[linhas, colunas]
+    resultado["amplitude"] = amplitudes[linhas, colunas]
+    resultado["prominencia"] = prominencia[linhas, colunas]
+    return np.sort(resultado, order=["serie", "frequencia"])
+
+
+def empilhar_espectros(df, coluna_freq, canais, chaves=("evento", "estacao")):
+    # Transforma o formato longo do freq_consolidado (uma linha por bin) em
+    # matrizes (uma linha por chave x canal). Espectros de tamanhos diferentes
+    # são completados com NaN.
+    df = df.sort_values(list(chaves) + [coluna_freq], kind="stable")
+    grupos = df.groupby(list(chaves), sort=False, observed=True)
+    codigos = grupos.ngroup().to_numpy()
+    tamanhos = np.bincount(codigos)
+    n_grupos, n_bins = len(tamanhos), int(tamanhos.max()) if len(tamanhos) else 0
+
+    # Posição de cada linha dentro do seu grupo (as linhas já estão agrupadas e ordenadas)
+    inicio_grupo = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+    posicao = np.arange(len(df)) - inicio_grupo[codigos]
+
+    frequencias = np.full((n_grupos, n_bins), np.nan)
+    frequencias[codigos, posicao] = df[coluna_freq].to_numpy()
+    amplitudes = np.full((n_grupos * len(canais), n_bins), np.nan)
+    for i, canal in enumerate(canais):
+        amplitudes[codigos * len(canais) + i, posicao] = df[canal].to_numpy()
+
+    chaves_df = grupos.size().reset_index()[list(chaves)]
+    return chaves_df, np.repeat(frequencias, len(canais), axis=0), amplitudes
+
+
+def picos_de_espectros(df, coluna_freq="Freq.", canais=("T", "R", "V"), chaves=("evento", "estacao"),
+                       num_picos=5, prominencia_minima=0.0):
+    # Picos de todos os espectros de df numa chamada só. Devolve um DataFrame com
+    # as chaves, o canal e frequencia/amplitude/prominencia de cada pico.
+    colunas = list(chaves) + ["canal", "frequencia", "amplitude", "prominencia"]
+    if df.empty:
+        return pd.DataFrame(columns=colunas)
+
+    chaves_df, frequencias, amplitudes = empilhar_espectros(df, coluna_freq, list(canais), chaves)
+    picos = picos_em_lote(frequencias, amplitudes, num_picos, prominencia_minima)
+
+    grupo = picos["serie"] // len(canais)
+    resultado = chaves_df.iloc[grupo].reset_index(drop=True)
+    resultado["canal"] = np.asarray(canais)[picos["serie"] % len(canais)]
+    resultado["frequencia"] = picos["frequencia"]
+    resultado["amplitude"] = picos["amplitude"]
+    resultado["prominencia"] = picos["prominencia"]
+    return resultado[colunas]
@@ -0,0 +1,260 @@
+import os
+import re
+import time
+import html
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import dados
+from amostragem import reduzir
+from picos import picos_de_espectros
+
+# Geração dos relatórios PDF fora dos callbacks do Dash. O callback só pede o
+# relatório (FilaRelatorios.pedir) e depois consulta o estado a cada poucos
+# segundos; o wkhtmltopdf roda num pool pequeno de processos com prioridade
+# baixa, então uma rajada de relatórios não trava os gráficos interativos.
+#
+# Cada PDF pronto fica em <base_path>/relatorios/<id>.pdf, onde o id vem do
+# evento, das estações e das assinaturas dos arquivos do próprio evento (JSON,
+# _data.csv e _freq.csv): eventos novos não invalidam os relatórios dos outros.
+# Pedir de novo o mesmo relatório devolve o arquivo na hora. Quando os
+# arquivos de um evento mudam, o PDF novo substitui o antigo na pasta.
+# Enquanto um PDF está sendo gerado existe um <id>.lock ao lado: pedidos
+# iguais (inclusive de outros workers) esperam por ele em vez de gerar outra vez.
+
+CANAIS = ['T', 'R', 'V']
+CORES_CANAIS = {'T': '#1f77b4', 'R': '#ff7f0e', 'V': '#2ca02c'}
+PONTOS_GRAFICO = 600      # pontos por canal nos gráficos do PDF
+VALIDADE_LOCK = 600.0     # segundos; um lock mais velho que isso é de um processo que morreu
+
+NA_FILA = "na fila"
+GERANDO = "gerando"
+PRONTO = "pronto"
+ERRO = "erro"
+
+
+def _svg_linhas(x, canais, largura=700, altura=160):
+    # Gráfico de linhas simples em SVG (o wkhtmltopdf desenha SVG embutido sem dependências extras)
+    if len(x) < 2:
+        return "<p><em>Sem dados</em></p>"
+    x = np.asarray(x, dtype=np.float64)
+    todos = np.concatenate([np.asarray(v, dtype=np.float64) for v in canais.values()])
+    y_min, y_max = float(np.nanmin(todos)), float(np.nanmax(todos))
+    if y_max == y_min:
+        y_max = y_min + 1.0
+    escala_x = (largura - 10) / (x[-1] - x[0] or 1.0)
+    escala_y = (altura - 10) / (y_max - y_min)
+
+    linhas = []
+    for canal, valores in canais.items():
+        # minmax é vetorizado (o LTTB tem um laço por bucket) e no papel o resultado é o mesmo
+        xr, yr = reduzir(x, valores, PONTOS_GRAFICO, metodo="minmax")
+        px = (5 + (xr - x[0]) * escala_x).tolist()
+        py = (altura - 5 - (np.asarray(yr, dtype=np.float64) - y_min) * escala_y).tolist()
+        pontos = " ".join(map("{:.1f},{:.1f}".format, px, py))
+        linhas.append(f'<polyline fill="none" stroke="{CORES_CANAIS.get(canal, "#333")}" stroke-width="1" points="{pontos}"/>')
+    legenda = " ".join(f'<span style="color:{CORES_CANAIS.get(c, "#333")}">■ {c}</span>' for c in canais)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura}" height="{altura}" '
+        f'style="border:1px solid #ddd">{"".join(linhas)}</svg><div>{legenda}</div>'
+    )
+
+
+def montar_html(evento, estacoes=None):
+    # HTML do relatório de um evento: classificação, estações, picos e gráficos de cada estação
+    indice = dados.indice()
+    linhas = indice.estacoes()
+    linhas = linhas[linhas['evento'] == evento]
+    if estacoes:
+        linhas = linhas[linhas['estacao'].isin(estacoes)]
+    classificacao = indice.classificacao(evento)
+
+    partes = [
+        "<html><head><meta charset='utf-8'><style>",
+        "body{font-family:Arial,sans-serif;font-size:11px} table{border-collapse:collapse;margin-bottom:10px}",
+        "td,th{border:1px solid #ccc;padding:3px 6px} h2{page-break-before:always}",
+        "</style></head><body>",
+        "<h1>RELATÓRIO DE MONITORAMENTO DA BARRAGEM DAIVÕES</h1>",
+        f"<p><strong>Evento:</strong> {html.escape(evento)} &nbsp; "
+        f"<strong>Classificação:</strong> {html.escape(str(classificacao))}</p>",
+        "<table><tr><th>Estação</th><th>Serial</th><th>Disparo</th><th>Pico (m/s²)</th></tr>",
+    ]
+    for linha in linhas.itertuples():
+        partes.append(
+            f"<tr><td>{html.escape(str(linha.estacao))}</td><td>{linha.serial}</td>"
+            f"<td>{html.escape(str(linha.trigger))}</td><td>{linha.valor:.2f}</td></tr>"
+        )
+    partes.append("</table>")
+
+    # Picos de todas as estações numa chamada em lote
+    espectros = dados.espectro(evento, colunas=['Freq.'] + CANAIS + ['evento', 'estacao'])
+    picos = picos_de_espectros(espectros, 'Freq.', CANAIS)
+
+    for linha in linhas.itertuples():
+        serial = str(linha.serial)
+        partes.append(f"<h2>{html.escape(str(linha.estacao))} ({serial})</h2>")
+
+        amostras = dados.amostras(evento, serial)
+        if amostras is None:
+            df = dados.serie(evento, serial, colunas=['Time'] + CANAIS).sort_values('Time')
+            amostras = {coluna: df[coluna].to_numpy() for coluna in ['Time'] + CANAIS}
+        partes.append("<h3>Séries de Aceleração</h3>")
+        partes.append(_svg_linhas(amostras['Time'], {c: amostras[c] for c in CANAIS}))
+
+        espectro = espectros[espectros['estacao'].astype(str) == serial].sort_values('Freq.')
+        partes.append("<h3>Espectros de Frequência</h3>")
+        partes.append(_svg_linhas(espectro['Freq.'].to_numpy(), {c: espectro[c].to_numpy() for c in CANAIS}))
+
+        picos_estacao = picos[picos['estacao'].astype(str) == serial]
+        if not picos_estacao.empty:
+            partes.append("<table><tr><th>Canal</th><th>Frequência (Hz)</th><th>Amplitude</th></tr>")
+            for pico in picos_estacao.itertuples():
+                partes.append(f"<tr><td>{pico.canal}</td><td>{pico.frequencia:.2f}</td><td>{pico.amplitude:.4f}</td></tr>")
+            partes.append("</table>")
+
+    partes.append("</body></html>")
+    return "".join(partes)
+
+
+def _baixar_prioridade():
+    # Inicializador dos processos do pool: cede CPU aos callbacks interativos
+    if hasattr(os, "nice"):
+        try:
+            os.nice(10)
+        except OSError:
+            pass
+
+
+def gerar_relatorio(base_path, evento, estacoes, arquivo, formato="pdf"):
+    # Roda no processo do pool: monta o HTML e grava o PDF (ou o próprio HTML) de forma atômica
+    if dados.base_path != base_path:
+        dados.configurar(base_path)
+    temporario = f"{arquivo}.{os.getpid()}.tmp"
+    try:
+        conteudo = montar_html(evento, estacoes)
+        if formato == "html":
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.write(conteudo)
+        else:
+            import pdfkit  # Só os processos que geram PDF precisam do pdfkit/wkhtmltopdf
+            pdfkit.from_string(conteudo, temporario, options={"encoding": "UTF-8", "quiet": ""})
+        os.replace(temporario, arquivo)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    _remover_versoes_antigas(arquivo)
+    return arquivo
+
+
+def _assinaturas_evento(evento):
+    # (nome, tamanho, mtime) do JSON do evento e dos _data.csv/_freq.csv ao lado dele
+    caminho = dados.caminho_evento(evento)
+    if caminho is None:
+        return []
+    pasta = os.path.dirname(caminho)
+    nomes = [os.path.basename(caminho)] + [
+        nome for nome in os.listdir(pasta)
+        if nome.startswith(evento + "_") and nome.endswith(("_data.csv", "_freq.csv"))
+    ]
+    assinaturas = []
+    for nome in sorted(nomes):
+        try:
+            info = os.stat(os.path.join(pasta, nome))
+        except OSError:
+            continue
+        assinaturas.append((nome, info.st_size, info.st_mtime_ns))
+    return assinaturas
+
+
+def identificador(evento, estacoes=None):
+    # Mesmo evento, estações e arquivos do evento -> mesmo id (e mesmo arquivo no cache).
+    # O id é <evento>_<estações>_<dados>: o começo é fixo para o mesmo pedido, o
+    # fim muda quando os arquivos do evento ou a classificação dele mudam.
+    pedido = repr((evento, sorted(estacoes or [])))
+    versao = repr((_assinaturas_evento(evento), dados.indice().classificacao(evento)))
+    return "_".join([
+        re.sub(r"[^0-9A-Za-z-]", "-", evento),
+        hashlib.sha1(pedido.encode("utf-8")).hexdigest()[:8],
+        hashlib.sha1(versao.encode("utf-8")).hexdigest()[:12],
+    ])
+
+
+def _remover_versoes_antigas(arquivo):
+    # Apaga os relatórios do mesmo pedido (mesmo começo de id e formato) feitos com dados antigos
+    pasta = os.path.dirname(arquivo)
+    nome = os.path.basename(arquivo)
+    id_trabalho, extensao = os.path.splitext(nome)
+    prefixo = id_trabalho.rsplit("_", 1)[0] + "_"
+    for outro in os.listdir(pasta):
+        antigo = re.fullmatch(r"[0-9a-f]{20}" + re.escape(extensao), outro)  # ids do formato anterior
+        if outro != nome and (outro.startswith(prefixo) and outro.endswith(extensao) or antigo):
+            _remover(os.path.join(pasta, outro))
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+class FilaRelatorios:
+    def __init__(self, pasta, max_processos=2):
+        self.pasta = pasta
+        self.max_processos = max_processos
+        self._executor = None
+        self._trabalhos = {}  # id -> Future deste processo
+        self._lock = threading.Lock()
+
+    def _arquivos(self, id_trabalho):
+        base = os.path.join(self.pasta, id_trabalho)
+        return base + ".pdf", base + ".lock"
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: o processo filho não herda por fork as threads e locks do servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_processos,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_baixar_prioridade,
+            )
+        return self._executor
+
+    def pedir(self, evento, estacoes=None):
+        # Devolve o id do relatório; só enfileira se ele não existe nem está sendo gerado
+        os.makedirs(self.pasta, exist_ok=True)
+        id_trabalho = identificador(evento, estacoes)
+        arquivo, lock = self._arquivos(id_trabalho)
+        with self._lock:
+            if os.path.exists(arquivo) or id_trabalho in self._trabalhos and not self._trabalhos[id_trabalho].done():
+                return id_trabalho
+            try:
+                # O lock em disco evita que outro worker gere o mesmo PDF ao mesmo tempo
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                if time.time() - os.path.getmtime(lock) < VALIDADE_LOCK:
+                    return id_trabalho
+                os.utime(lock)  # Lock abandonado: assume a geração
+
+            futuro = self._pool().submit(gerar_relatorio, dados.base_path, evento, list(estacoes or []), arquivo)
+            futuro.add_done_callback(lambda _: _remover(lock))
+            self._trabalhos[id_trabalho] = futuro
+        return id_trabalho
+
+    def estado(self, id_trabalho):
+        # {"estado": ..., "arquivo": caminho do PDF quando pronto, "erro": mensagem quando falhou}
+        arquivo, lock = self._arquivos(id_trabalho)
+        if os.path.exists(arquivo):
+            return {"estado": PRONTO, "arquivo": arquivo}
+        futuro = self._trabalhos.get(id_trabalho)
+        if futuro is None:
+            # Pedido feito por outro worker: só o lock em disco diz se ainda está em andamento
+            if os.path.exists(lock):
+                return {"estado": GERANDO}
+            return {"estado": ERRO, "erro": "Relatório desconhecido"}
+        if futuro.done():
+            erro = futuro.exception()
+            return {"estado": ERRO, "erro": str(erro) if erro else "PDF não foi gravado"}
+        return {"estado": GERANDO if futuro.running() else NA_FILA}
@@ -0,0 +1,41 @@
+import os
+import numpy as np
+import pandas as pd
+import amostras
+from amostras import atualizar_amostras, LeitorAmostras
+
+
+def _gravar(pasta, evento, estacao, linhas, semente):
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({"Time": np.arange(linhas) * 0.0025, "T": rng.normal(size=linhas),
+                       "R": rng.normal(size=linhas), "V": rng.normal(size=linhas)})
+    df.to_csv(os.path.join(pasta, f"{evento}_{estacao}_data.csv"), index=False)
+    return df
+
+
+def _conferir(destino, esperados):
+    leitor = LeitorAmostras(destino)
+    for (evento, estacao), df in esperados.items():
+        colunas = leitor.ler(evento, estacao)
+        for coluna in amostras.COLUNAS_AMOSTRAS:
+            np.testing.assert_array_equal(colunas[coluna], df[coluna].to_numpy(dtype=np.float32))
+
+
+def test_lock_ocupado_nao_grava(tmp_path):
+    eventos = tmp_path / "events"
+    os.makedirs(eventos)
+    destino = str(tmp_path / "amostras")
+    esperados = {("10h00m00s", "20160003"): _gravar(str(eventos), "10h00m00s", "20160003", 300, 0)}
+    assert atualizar_amostras(str(eventos), destino, verboso=False)
+
+    esperados[("11h00m00s", "20160005")] = _gravar(str(eventos), "11h00m00s", "20160005", 200, 1)
+    # Outro processo gravando: sem esperar, nada muda (nem o índice nem o .f32)
+    assert amostras._travar(destino)
+    tamanhos = {nome: os.path.getsize(os.path.join(destino, nome)) for nome in os.listdir(destino)}
+    assert not atualizar_amostras(str(eventos), destino, verboso=False, esperar=False)
+    assert tamanhos == {nome: os.path.getsize(os.path.join(destino, nome)) for nome in os.listdir(destino)}
+    amostras._destravar(destino)
+
+    assert atualizar_amostras(str(eventos), destino, verboso=False, esperar=False)
+    assert not os.path.exists(amostras.caminho_lock(destino))
+    _conferir(destino, esperados)
@@ -0,0 +1,169 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import armazenamento
+from consolidacao import consolidar
+
+SUFIXO = "_data.csv"
+FORMATOS = ["csv", pytest.param("parquet", marks=pytest.mark.skipif(
+    not armazenamento.PARQUET_DISPONIVEL, reason="pyarrow não instalado"))]
+
+
+def _gravar(pasta, evento, estacao, linhas, semente, mtime):
+    # _data.csv sintético; mtime explícito para a mudança não depender da resolução do relógio
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({"Time": np.arange(linhas) * 0.0025, "T": rng.normal(size=linhas),
+                       "R": rng.normal(size=linhas), "V": rng.normal(size=linhas)})
+    caminho = os.path.join(pasta, f"{evento}_{estacao}{SUFIXO}")
+    df.to_csv(caminho, index=False)
+    os.utime(caminho, ns=(mtime, mtime))
+    return caminho
+
+
+def _arvore(base):
+    arquivos = {}
+    for dia, eventos in (("01", ["10h00m00s", "11h00m00s"]), ("02", ["09h30m00s"])):
+        pasta = os.path.join(base, "2025", "01", dia)
+        os.makedirs(pasta)
+        for n, evento in enumerate(eventos):
+            for m, estacao in enumerate(["20160003", "20160005"]):
+                semente = len(arquivos)
+                arquivos[(evento, estacao)] = _gravar(pasta, evento, estacao, 200 + 10 * n + m, semente,
+                                                      1_700_000_000_000_000_000 + semente)
+    return arquivos
+
+
+def _ler(raiz, nome):
+    # Ordem das linhas não importa (o incremental acrescenta no fim): compara ordenado
+    df = armazenamento.ler_consolidado(raiz, nome)
+    df = df.astype({"evento": str, "estacao": str})
+    return df.sort_values(["evento", "estacao", "Time"], ignore_index=True)[["Time", "T", "R", "V", "evento", "estacao"]]
+
+
+@pytest.mark.parametrize("formato", FORMATOS)
+@pytest.mark.parametrize("memoria_mb", [None, 1])
+def test_incremental_igual_a_consolidacao_completa(tmp_path, formato, memoria_mb):
+    eventos = tmp_path / "events"
+    arquivos = _arvore(str(eventos))
+    extensao = ".csv" if formato == "csv" else ""
+    incremental = str(tmp_path / ("incremental" + extensao))
+    completo = str(tmp_path / ("completo" + extensao))
+
+    def conferir():
+        consolidar(str(eventos), SUFIXO, incremental, incremental=True, formato=formato, memoria_mb=memoria_mb)
+        consolidar(str(eventos), SUFIXO, completo, formato=formato, memoria_mb=memoria_mb)
+        pd.testing.assert_frame_equal(_ler(str(tmp_path), "incremental"), _ler(str(tmp_path), "completo"))
+
+    conferir()
+
+    # Arquivo novo
+    pasta = os.path.dirname(arquivos[("09h30m00s", "20160003")])
+    _gravar(pasta, "09h30m00s", "20160007", 150, 100, 1_700_000_000_500_000_000)
+    conferir()
+
+    # Arquivo alterado (outro conteúdo e outro tamanho)
+    caminho = arquivos[("10h00m00s", "20160005")]
+    _gravar(os.path.dirname(caminho), "10h00m00s", "20160005", 260, 200, 1_700_000_001_000_000_000)
+    conferir()
+
+    # Arquivo removido
+    os.remove(arquivos[("11h00m00s", "20160003")])
+    conferir()
+    assert "11h00m00s" in set(_ler(str(tmp_path), "incremental")["evento"])
+    assert len(_ler(str(tmp_path), "incremental").query("evento == '11h00m00s' and estacao == '20160003'")) == 0
+
+
+@pytest.mark.parametrize("memoria_mb", [None, 1])
+def test_incremental_com_colunas_novas_refaz_tudo(tmp_path, memoria_mb):
+    eventos = tmp_path / "events"
+    arquivos = _arvore(str(eventos))
+    saida = str(tmp_path / "incremental")
+    consolidar(str(eventos), SUFIXO, saida, incremental=True, formato="parquet", memoria_mb=memoria_mb)
+
+    # Arquivo novo com um canal a mais: o incremental refaz a consolidação em vez de pular o arquivo
+    pasta = os.path.dirname(arquivos[("09h30m00s", "20160003")])
+    caminho = _gravar(pasta, "09h30m00s", "20160007", 150, 100, 1_700_000_000_500_000_000)
+    pd.read_csv(caminho).assign(X=1.0).to_csv(caminho, index=False)
+    consolidar(str(eventos), SUFIXO, saida, incremental=True, formato="parquet", memoria_mb=memoria_mb)
+    consolidar(str(eventos), SUFIXO, str(tmp_path / "completo"), formato="parquet", memoria_mb=memoria_mb)
+    pd.testing.assert_frame_equal(_ler(str(tmp_path), "incremental"), _ler(str(tmp_path), "completo"))
+    assert "20160007" in set(_ler(str(tmp_path), "incremental")["estacao"])
+
+
+def test_csv_em_blocos_recusa_colunas_diferentes(tmp_path):
+    eventos = tmp_path / "events"
+    arquivos = _arvore(str(eventos))
+    saida = str(tmp_path / "incremental.csv")
+    consolidar(str(eventos), SUFIXO, saida, incremental=True, memoria_mb=1)
+
+    pasta = os.path.dirname(arquivos[("09h30m00s", "20160003")])
+    caminho = _gravar(pasta, "09h30m00s", "20160007", 150, 100, 1_700_000_000_500_000_000)
+    pd.read_csv(caminho).assign(X=1.0).to_csv(caminho, index=False)
+    # Em memória a saída teria a coluna X (com NaN nos outros arquivos); em blocos não dá para
+    # reproduzir isso, então para em vez de gravar outra coisa
+    with open(saida, "rb") as f:
+        antes = f.read()
+    with pytest.raises(ValueError):
+        consolidar(str(eventos), SUFIXO, saida, incremental=True, memoria_mb=1)
+    with open(saida, "rb") as f:
+        assert f.read() == antes
+
+
+def test_csv_em_blocos_identico_ao_em_memoria(tmp_path):
+    eventos = tmp_path / "events"
+    arquivos = _arvore(str(eventos))
+    # Um arquivo maior que o bloco mínimo (1000 linhas), para a escrita ser feita em vários pedaços
+    pasta = os.path.dirname(arquivos[("10h00m00s", "20160003")])
+    _gravar(pasta, "10h00m00s", "20160009", 3500, 300, 1_700_000_002_000_000_000)
+    em_memoria = str(tmp_path / "memoria.csv")
+    em_blocos = str(tmp_path / "blocos.csv")
+    df = consolidar(str(eventos), SUFIXO, em_memoria)
+    consolidar(str(eventos), SUFIXO, em_blocos, memoria_mb=0.01)
+    with open(em_memoria, "rb") as a, open(em_blocos, "rb") as b:
+        assert a.read() == b.read()
+    # Chaves continuam categoria no frame em memória (sem uma string por linha)
+    assert isinstance(df["evento"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["estacao"].dtype, pd.CategoricalDtype)
+
+
+def test_csv_lido_uma_vez_e_recarregado_quando_muda(tmp_path, monkeypatch):
+    eventos = tmp_path / "events"
+    arquivos = _arvore(str(eventos))
+    saida = str(tmp_path / "data_consolidado.csv")
+    consolidar(str(eventos), SUFIXO, saida, incremental=True, formato="csv")
+
+    leituras = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(armazenamento.pd, "read_csv",
+                        lambda caminho, *a, **k: (caminho == saida and leituras.append(caminho)) or read_csv(caminho, *a, **k))
+    completo = read_csv(saida, dtype={"evento": "category", "estacao": "category"})
+    for evento, estacao in [("10h00m00s", "20160005"), ("09h30m00s", None)]:
+        df = armazenamento.ler_consolidado(str(tmp_path), "data_consolidado", colunas=["Time", "V"],
+                                           eventos=[evento], estacoes=None if estacao is None else [estacao])
+        esperado = completo[(completo["evento"] == evento) & ((estacao is None) | (completo["estacao"] == estacao))]
+        pd.testing.assert_frame_equal(df, esperado[["Time", "V"]].reset_index(drop=True))
+    assert len(leituras) == 1
+
+    # Arquivo novo: o consolidado muda em disco e a próxima leitura já o vê
+    pasta = os.path.dirname(arquivos[("09h30m00s", "20160003")])
+    _gravar(pasta, "09h30m00s", "20160007", 150, 100, 1_700_000_000_500_000_000)
+    consolidar(str(eventos), SUFIXO, saida, incremental=True, formato="csv")
+    df = armazenamento.ler_consolidado(str(tmp_path), "data_consolidado", eventos=["09h30m00s"], estacoes=["20160007"])
+    assert len(df) == 150 and len(leituras) == 2
+
+
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_incremental_silencioso_sem_verboso(tmp_path, formato, capsys):
+    # O monitoramento do dados.py chama com verboso=False a cada poucos segundos
+    eventos = tmp_path / "events"
+    arquivos = _arvore(str(eventos))
+    saida = str(tmp_path / ("saida.csv" if formato == "csv" else "saida"))
+    consolidar(str(eventos), SUFIXO, saida, incremental=True, formato=formato)
+    capsys.readouterr()
+
+    pasta = os.path.dirname(arquivos[("09h30m00s", "20160003")])
+    _gravar(pasta, "09h30m00s", "20160007", 150, 100, 1_700_000_000_500_000_000)
+    consolidar(str(eventos), SUFIXO, saida, incremental=True, formato=formato, verboso=False)
+    consolidar(str(eventos), SUFIXO, saida, incremental=True, formato=formato, verboso=False)
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,86 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from correlacao import correlacionar, tempos_chegada, _correlacionar_em_cache
+
+TAXA = 200.0
+N = 2000
+
+
+def _pulso(atraso, rng):
+    # Ruído filtrado sob uma envoltória gaussiana, centrado em 3 s + atraso
+    t = np.arange(N) / TAXA
+    ruido = np.convolve(rng.normal(size=N + 20), np.hanning(21), mode="valid")[:N]
+    return ruido * np.exp(-0.5 * ((t - 3.0 - atraso) / 0.4) ** 2)
+
+
+def _matriz(atrasos, semente=0):
+    # Mesma forma de onda em todas as estações, deslocada por um número inteiro de amostras
+    rng = np.random.default_rng(semente)
+    base = _pulso(0.0, rng)
+    matriz = np.zeros((len(atrasos), 3, N))
+    for s, atraso in enumerate(atrasos):
+        deslocamento = int(round(atraso * TAXA))
+        for c in range(3):
+            matriz[s, c] = np.roll(base * (1 + 0.2 * c), deslocamento)
+    return matriz - matriz.mean(axis=2, keepdims=True)
+
+
+def test_atraso_e_sinal_recuperados():
+    atrasos = np.array([0.0, 0.35, -0.2])  # estação 1 recebe depois da 0, estação 2 antes
+    i, j, obtidos, pico = correlacionar(_matriz(atrasos), TAXA, max_atraso=1.0)
+    esperados = atrasos[i] - atrasos[j]  # atraso > 0: a onda chega em i depois de j
+    np.testing.assert_allclose(obtidos, np.repeat(esperados[:, None], 4, axis=1), atol=1e-6)
+    np.testing.assert_allclose(pico, 1.0, atol=1e-2)
+
+
+def test_inicios_diferentes_entram_no_atraso():
+    # Gravadores que começaram em instantes diferentes: mesma amostra, tempos absolutos diferentes
+    matriz = _matriz([0.0, 0.0])
+    inicios = np.array([0.0, 0.5])
+    _, _, obtidos, _ = correlacionar(matriz, TAXA, inicios, max_atraso=1.0)
+    np.testing.assert_allclose(obtidos, -0.5, atol=1e-6)
+
+
+def test_tempos_de_chegada():
+    atrasos = np.array([0.1, 0.45, -0.2, 0.0])
+    i, j, obtidos, pico = correlacionar(_matriz(atrasos, semente=1), TAXA, max_atraso=1.0)
+    chegadas = tempos_chegada(len(atrasos), i, j, obtidos[:, -1], pico[:, -1])
+    np.testing.assert_allclose(chegadas, atrasos - atrasos.min(), atol=1e-6)
+
+
+def test_atraso_fora_da_janela_nao_e_procurado():
+    # Com max_atraso menor que o deslocamento real, o resultado fica limitado à janela
+    i, j, obtidos, _ = correlacionar(_matriz([0.0, 0.6]), TAXA, max_atraso=0.25)
+    assert np.all(np.abs(obtidos) <= 0.25 + 1e-9)
+
+
+@pytest.mark.parametrize("n_estacoes", [0, 1])
+def test_sem_pares(n_estacoes):
+    i, j, obtidos, pico = correlacionar(np.zeros((n_estacoes, 3, 100)), TAXA)
+    assert len(i) == len(j) == len(obtidos) == len(pico) == 0
+
+
+def test_cache_refeito_quando_chegam_amostras(tmp_path):
+    # O JSON chega antes dos _data.csv: o resultado guardado com uma estação só não pode voltar
+    matriz = _matriz(np.array([0.0, 0.35]))
+    estacoes = {serial: {"recorderName": nome, "startEvent": "2025-01-01T00:00:00", "acquisRate": TAXA}
+                for serial, nome in (("20160003", "S-01-1"), ("20160005", "S-10-1"))}
+    caminho_json = tmp_path / "10h00m00s.json"
+    caminho_json.write_text(json.dumps({"eventFiles": estacoes}), encoding="utf-8")
+    cache = tmp_path / "correlacoes"
+    os.makedirs(cache)
+
+    def gravar_amostras(s, serial):
+        pd.DataFrame({"Time": np.arange(N) / TAXA, "T": matriz[s, 0], "R": matriz[s, 1], "V": matriz[s, 2]}).to_csv(
+            tmp_path / f"10h00m00s_{serial}_data.csv", index=False)
+
+    gravar_amostras(0, "20160003")
+    assert _correlacionar_em_cache(str(caminho_json), str(cache))["pares"].empty
+
+    gravar_amostras(1, "20160005")
+    pares = _correlacionar_em_cache(str(caminho_json), str(cache))["pares"]
+    atraso = pares.loc[pares["canal"] == "todos", "atraso"].iloc[0]
+    assert atraso == pytest.approx(-0.35, abs=1.0 / TAXA)  # S-10-1 recebe depois de S-01-1
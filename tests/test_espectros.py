@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from espectros import welch, amplitude_rfft, calcular_lote, parametros, JANELAS
+
+TAXA = 100.0
+
+
+def _seno(amplitude, frequencia, n):
+    t = np.arange(n) / TAXA
+    return amplitude * np.sin(2 * np.pi * frequencia * t)
+
+
+@pytest.mark.parametrize("janela", list(JANELAS))
+def test_rfft_devolve_a_amplitude_do_seno(janela):
+    # 5 Hz cai exatamente num bin (resolução 0.1 Hz com 1000 amostras)
+    freqs, amplitudes = amplitude_rfft(_seno(3.0, 5.0, 1000), TAXA, janela, resolucao=0.1)
+    pico = np.argmax(amplitudes[0])
+    assert freqs[pico] == pytest.approx(5.0)
+    assert amplitudes[0, pico] == pytest.approx(3.0, rel=1e-9)
+
+
+def test_rfft_completa_com_zeros_para_a_resolucao_pedida():
+    freqs, _ = amplitude_rfft(_seno(1.0, 5.0, 500), TAXA, resolucao=0.05)
+    assert freqs[1] - freqs[0] == pytest.approx(0.05)
+
+
+@pytest.mark.parametrize("janela", list(JANELAS))
+def test_welch_integra_a_potencia_do_seno(janela):
+    # Parseval: a integral da PSD unilateral é a potência média, A²/2 para um seno
+    freqs, psd = welch(_seno(2.0, 12.5, 20000), TAXA, janela, resolucao=0.5, sobreposicao=0.5)
+    df = freqs[1] - freqs[0]
+    assert df == pytest.approx(0.5)
+    assert psd[0].sum() * df == pytest.approx(2.0 ** 2 / 2, rel=1e-2)
+    assert freqs[np.argmax(psd[0])] == pytest.approx(12.5)
+
+
+def test_welch_de_ruido_branco_tem_a_variancia_e_nivel_plano():
+    sigma = 1.5
+    ruido = np.random.default_rng(0).normal(scale=sigma, size=200_000)
+    freqs, psd = welch(ruido, TAXA, "hann", resolucao=0.5, sobreposicao=0.5)
+    df = freqs[1] - freqs[0]
+    assert psd[0].sum() * df == pytest.approx(sigma ** 2, rel=2e-2)
+    # Nível unilateral esperado: 2σ²/taxa (fora do DC e de Nyquist)
+    assert np.median(psd[0, 1:-1]) == pytest.approx(2 * sigma ** 2 / TAXA, rel=5e-2)
+
+
+def test_lote_igual_as_chamadas_individuais():
+    rng = np.random.default_rng(1)
+    estacoes = []
+    for serial in ("20160003", "20160005"):
+        amostras = np.vstack([np.arange(4000) / TAXA] + [rng.normal(size=4000) for _ in range(3)])
+        estacoes.append({"serial": serial, "taxa": TAXA, "unidade": "mg", "amostras": amostras})
+    params = parametros(metodo="welch", resolucao=0.5, f_max=20.0)
+    lote = calcular_lote(estacoes, params)
+    for estacao in estacoes:
+        freqs, psd = welch(estacao["amostras"][1:], TAXA, "hann", 0.5, 0.5)
+        faixa = freqs <= 20.0
+        df = lote[estacao["serial"]]
+        np.testing.assert_allclose(df["Freq."], freqs[faixa])
+        np.testing.assert_allclose(df[["T", "R", "V"]].to_numpy().T, psd[:, faixa])
+        assert df.attrs["unidade"] == "mg"
@@ -0,0 +1,98 @@
+import json
+import pandas as pd
+import pytest
+import consolidate_events
+
+
+def _estacao(nome, trigger, valores):
+    return {
+        "recorderName": nome,
+        "triggerStart": trigger,
+        "df": {"cf": [{"chName": canal, "peak": v, "rms": v / 3, "value": v * 1.5}
+                      for canal, v in zip(["V", "T", "R"], valores)]},
+    }
+
+
+@pytest.fixture
+def pasta_eventos(tmp_path):
+    # Estações e canais fora de ordem alfabética, para a ordem das categorias fazer diferença
+    eventos = {
+        "12h00m00s": {"20160006": _estacao("S-10-1", "2025-01-02T12:00:01.5", [1.0, 2.0, 3.0]),
+                      "20160005": _estacao("S-01-1", "2025-01-02T12:00:00.25", [0.5, 0.1, 0.2])},
+        "08h00m00s": {"20160004": _estacao("S-06-1", None, [0.3, 0.4, 0.5]),
+                      "20160005": _estacao("S-01-1", "2025-01-01T08:00:00", [2.5, 1.5, 0.5])},
+    }
+    for evento, estacoes in eventos.items():
+        (tmp_path / f"{evento}.json").write_text(json.dumps({"eventFiles": estacoes}), encoding="utf-8")
+    (tmp_path / "vazio.json").write_text(json.dumps({"eventFiles": {}}), encoding="utf-8")
+    (tmp_path / "sem_chave.json").write_text(json.dumps({"outro": 1}), encoding="utf-8")
+    # Quebrado depois da primeira estação: nada dele (nem o nome S-99-1) pode sobrar no resultado
+    quebrado = json.dumps({"eventFiles": {"20160099": _estacao("S-99-1", "2025-01-03T00:00:00", [9.0, 9.0, 9.0]),
+                                          "20160098": _estacao("S-98-1", None, [1.0, 1.0, 1.0])}})
+    (tmp_path / "quebrado.json").write_text(quebrado[:quebrado.index('"20160098"') + 20], encoding="utf-8")
+    return str(tmp_path)
+
+
+def _ordenado(df):
+    return df.sort_values(["evento", "estacao", "direcao"], ignore_index=True)
+
+
+@pytest.mark.parametrize("backend", ["ijson", "orjson", "json"])
+def test_streaming_igual_ao_carregamento_completo(pasta_eventos, backend, monkeypatch, capsys):
+    if backend == "ijson" and consolidate_events.ijson is None:
+        pytest.skip("ijson não instalado")
+    if backend == "orjson" and consolidate_events.orjson is None:
+        pytest.skip("orjson não instalado")
+    if backend != "ijson":
+        monkeypatch.setattr(consolidate_events, "ijson", None)
+    if backend == "json":
+        monkeypatch.setattr(consolidate_events, "orjson", None)
+
+    completo = consolidate_events.carregar_eventos(pasta_eventos)
+    avisos_completo = capsys.readouterr().out
+    streaming = consolidate_events.carregar_eventos_streaming(pasta_eventos)
+    avisos_streaming = capsys.readouterr().out
+
+    # Mesmos dtypes, inclusive a ordem das categorias
+    pd.testing.assert_frame_equal(_ordenado(completo), _ordenado(streaming))
+    for coluna in ["evento", "estacao", "direcao"]:
+        assert list(streaming[coluna].cat.categories) == sorted(streaming[coluna].cat.categories)
+
+    assert "S-99-1" not in streaming["estacao"].cat.categories
+
+    # Só o JSON sem "eventFiles" gera aviso, nos dois modos, e o quebrado gera erro
+    assert avisos_completo.count("Ignorando JSON sem") == avisos_streaming.count("Ignorando JSON sem") == 1
+    assert "sem_chave.json" in avisos_streaming
+    assert avisos_completo.count("[ERRO]") == avisos_streaming.count("[ERRO]") == 1
+    # Sem o ijson a leitura não é streaming, e isso é avisado
+    assert ("sem streaming" in avisos_streaming) == (backend != "ijson")
+
+
+def test_indice_recarregado_sem_varrer(tmp_path, monkeypatch):
+    # Só o dono varre a pasta; o outro processo adota o índice salvo sem listar os JSONs
+    import indice_eventos
+    pasta = tmp_path / "eventos"
+    pasta.mkdir()
+    arquivo = str(tmp_path / "indice.pkl")
+    (pasta / "08h00m00s.json").write_text(json.dumps({"eventFiles": {
+        "20160005": _estacao("S-01-1", "2025-01-01T08:00:00", [2.5, 1.5, 0.5])}}), encoding="utf-8")
+    dono = indice_eventos.IndiceEventos(str(pasta), arquivo)
+    dono.atualizar(forcar=True)
+    outro = indice_eventos.IndiceEventos(str(pasta), arquivo)
+    assert outro.instantaneo().assinatura == dono.instantaneo().assinatura
+    assert not outro.recarregar()
+
+    (pasta / "12h00m00s.json").write_text(json.dumps({"eventFiles": {
+        "20160006": _estacao("S-10-1", "2025-01-02T12:00:01.5", [1.0, 2.0, 3.0])}}), encoding="utf-8")
+    assert dono.atualizar(forcar=True)
+
+    def _varreu(*args, **kwargs):
+        raise AssertionError("recarregar não deve listar a pasta")
+    monkeypatch.setattr(indice_eventos, "listar_jsons", _varreu)
+    versao = outro.versao
+    assert outro.recarregar()
+    assert outro.versao > versao
+    assert list(outro.resumo().index) == ["08h00m00s", "12h00m00s"]
+    pd.testing.assert_frame_equal(outro.resumo(), dono.resumo())
+    assert outro.estatisticas_estacoes() == dono.estatisticas_estacoes()
+    assert not outro.recarregar()